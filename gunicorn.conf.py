@@ -0,0 +1,45 @@
+'''Gunicorn configuration for Quizly.
+
+Usage:
+    pip install gunicorn
+    gunicorn quizly_core.wsgi -c gunicorn.conf.py
+    # ASGI: gunicorn quizly_core.asgi -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker
+
+With WHISPER_SHARE_WEIGHTS=fork|shm the Django app is loaded once in the
+master before the workers are forked. With QUIZ_ASYNC_JOBS=False, when web
+workers transcribe, loading the app also preloads the Whisper model (see
+quizly_core/wsgi.py), so all workers share one physical copy of the weights
+(see quiz_app/api/memory.py). With background jobs (the default) Whisper
+runs in `run_quiz_worker --processes N` instead, which shares the weights
+the same way. `uvicorn --workers` starts its workers with spawn instead of
+fork and cannot share them; run uvicorn workers under gunicorn as shown
+above.
+
+Every worker logs its RSS and PSS once it has booted; with shared weights
+the PSS of each worker is well below its RSS.
+
+Environment:
+- GUNICORN_BIND (default 0.0.0.0:8000), GUNICORN_WORKERS (default 2),
+  GUNICORN_TIMEOUT (default 120).
+'''
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+preload_app = os.getenv('WHISPER_SHARE_WEIGHTS', '').lower() in ('fork', 'shm')
+
+def when_ready(server):
+    '''Master, after the app is loaded: freeze the heap so workers keep sharing it.'''
+
+    if preload_app:
+        from quiz_app.api.memory import freeze_for_fork, log_memory
+        freeze_for_fork()
+        log_memory('Gunicorn master ready:')
+
+def post_worker_init(worker):
+    '''Worker, after boot: report memory so the sharing can be verified.'''
+
+    from quiz_app.api.memory import log_memory
+    log_memory(f"Gunicorn worker {worker.age} booted:")
@@ -0,0 +1,130 @@
+'''Audio format selection and streaming ingestion (stream URL → ffmpeg → 16 kHz PCM).
+
+Format selection:
+- Whisper only needs 16 kHz mono, so pick_audio_format() takes the smallest
+  audio-only stream that still meets QUIZ_AUDIO_MIN_ABR instead of
+  'bestaudio', which often means 160 kbit/s Opus or a muxed video.
+
+Streaming:
+- Instead of writing the audio to QUIZ_TMP_DIR and letting Whisper decode
+  the file again, the selected stream is fed into one ffmpeg process that
+  outputs mono float32 PCM at Whisper's sample rate on stdout.
+- The PCM is read in blocks, so callers can start working on the first part
+  of the audio while the rest is still being downloaded.
+- Only progressive (http/https) streams can be piped this way; fragmented
+  DASH or HLS formats return None from select_audio_stream() and the caller
+  falls back to download_audio().
+'''
+
+import subprocess
+from collections.abc import Iterator
+
+import numpy as np
+
+from .transcription import SAMPLE_RATE
+
+STREAMABLE_PROTOCOLS = ('https', 'http')
+
+def _is_audio_only(fmt: dict) -> bool:
+    return fmt.get('vcodec') == 'none' and fmt.get('acodec') not in (None, 'none')
+
+def _bitrate(fmt: dict) -> float:
+    return fmt.get('abr') or fmt.get('tbr') or 0
+
+def _size(fmt: dict) -> tuple[float, float]:
+    '''Sort key approximating download size: bitrate first (same duration), then file size.'''
+
+    return _bitrate(fmt) or float('inf'), fmt.get('filesize') or fmt.get('filesize_approx') or 0
+
+def pick_audio_format(formats: list[dict], min_abr: float = 0, protocols: tuple[str, ...] | None = None) -> dict | None:
+    '''Pick the smallest audio-only format whose bitrate is at least `min_abr`.
+
+    Whisper resamples everything to 16 kHz mono, so anything above a modest
+    bitrate is wasted bandwidth. If no audio-only format reaches `min_abr`,
+    the highest-bitrate audio-only format is used; if there are no audio-only
+    formats at all, the smallest format that carries audio.
+
+    Args:
+        formats: The 'formats' list of a yt-dlp info dict.
+        min_abr: Minimum audio bitrate in kbit/s.
+        protocols: If given, only formats with one of these protocols qualify.
+
+    Returns:
+        The chosen format dict, or None if no format carries audio.
+    '''
+
+    usable = [
+        f for f in formats
+        if f.get('acodec') not in (None, 'none') and (protocols is None or f.get('protocol') in protocols)
+    ]
+    audio_only = [f for f in usable if _is_audio_only(f)]
+    if audio_only:
+        good = [f for f in audio_only if _bitrate(f) >= min_abr]
+        if good:
+            return min(good, key=_size)
+        return max(audio_only, key=_bitrate)
+    return min(usable, key=_size) if usable else None
+
+def audio_format_selector(min_abr: float):
+    '''Return a yt-dlp 'format' callable that applies pick_audio_format().'''
+
+    def selector(ctx):
+        fmt = pick_audio_format(ctx.get('formats') or [], min_abr)
+        if fmt is not None:
+            yield fmt
+    return selector
+
+def select_audio_stream(info: dict, min_abr: float = 0) -> dict | None:
+    '''Pick the progressive audio format to pipe through ffmpeg.
+
+    Returns:
+        The format dict (with 'url' and 'http_headers'), or None if the video
+        has no audio-only stream that ffmpeg can read directly.
+    '''
+
+    return pick_audio_format(
+        [f for f in info.get('formats') or [] if f.get('url') and _is_audio_only(f)],
+        min_abr, protocols=STREAMABLE_PROTOCOLS,
+    )
+
+def _ffmpeg_command(fmt: dict) -> list[str]:
+    cmd = ['ffmpeg', '-nostdin', '-loglevel', 'error']
+    headers = fmt.get('http_headers') or {}
+    if headers:
+        cmd += ['-headers', ''.join(f"{k}: {v}\r\n" for k, v in headers.items())]
+    return cmd + ['-i', fmt['url'], '-vn', '-f', 'f32le', '-ac', '1', '-ar', str(SAMPLE_RATE), '-']
+
+def iter_pcm(fmt: dict, block_sec: float = 30.0) -> Iterator[np.ndarray]:
+    '''Stream a format through ffmpeg and yield float32 PCM blocks.
+
+    Args:
+        fmt: A format dict as returned by select_audio_stream().
+        block_sec: Approximate length of each yielded block in seconds.
+
+    Yields:
+        Mono float32 arrays at 16 kHz, in stream order.
+
+    Raises:
+        RuntimeError: If ffmpeg exits with an error.
+    '''
+
+    block_bytes = int(block_sec * SAMPLE_RATE) * 4
+    proc = subprocess.Popen(_ffmpeg_command(fmt), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        pending = b''
+        while True:
+            data = proc.stdout.read(block_bytes)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % 4
+            pending = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype=np.float32)
+        stderr = proc.stderr.read().decode('utf-8', errors='replace')
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.strip() or proc.returncode}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
@@ -0,0 +1,136 @@
+'''Persistent caches shared across users and workers.
+
+Transcripts:
+- Stored in the Transcript model, keyed by (video id, model name, options
+  key). The options key is a stable hash of everything that changes the text,
+  so different decoding options never share an entry.
+- Entries older than QUIZ_TRANSCRIPT_CACHE_MAX_AGE_SEC are dropped, and the
+  least recently used entries are evicted once the total stored text exceeds
+  QUIZ_TRANSCRIPT_CACHE_MAX_CHARS.
+
+Generated quizzes (optional, QUIZ_REUSE_GENERATED):
+- LLM payloads are stored in the GeneratedQuiz model, keyed by (video id,
+  number of questions, prompt version, transcript key), and reused for
+  QUIZ_REUSE_TTL_SEC.
+- The prompt version is a hash of the prompt template and model, so editing
+  build_quiz_prompt() invalidates old payloads without a migration.
+- The transcript key names the Whisper model and options hash of the active
+  decoding preset, so quizzes built from different transcripts stay apart.
+
+Video metadata:
+- yt-dlp probe results (sanitized info dicts) live in Django's cache for
+  QUIZ_METADATA_CACHE_TTL_SEC, keyed by video id. Stream URLs in the info
+  dict expire after a few hours, so the TTL should stay short. Configure a
+  shared cache backend (Redis, Memcached) to share probes across workers.
+'''
+
+import hashlib, json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ..models import GeneratedQuiz, Transcript
+
+def options_key(options: dict | None) -> str:
+    '''Return a stable hash for a dict of transcription options.'''
+
+    payload = json.dumps(options or {}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _max_age() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, 'QUIZ_TRANSCRIPT_CACHE_MAX_AGE_SEC', 30 * 24 * 3600)))
+
+def get_cached_transcript(video_id: str, model_name: str, options: dict | None = None) -> str | None:
+    '''Return a cached transcript or None, refreshing its LRU timestamp.'''
+
+    now = timezone.now()
+    entry = (
+        Transcript.objects
+        .filter(video_id=video_id, model_name=model_name, options_key=options_key(options),
+                created_at__gte=now - _max_age())
+        .only('id', 'text')
+        .first()
+    )
+    if entry is None:
+        return None
+    Transcript.objects.filter(pk=entry.pk).update(last_used_at=now)
+    return entry.text
+
+def store_transcript(video_id: str, model_name: str, text: str, options: dict | None = None):
+    '''Insert or replace a cached transcript, then enforce the eviction limits.'''
+
+    key = options_key(options)
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            Transcript.objects.update_or_create(
+                video_id=video_id, model_name=model_name, options_key=key,
+                defaults={'text': text, 'size': len(text), 'created_at': now, 'last_used_at': now},
+            )
+    except IntegrityError:
+        pass
+    evict_transcripts()
+
+def evict_transcripts() -> int:
+    '''Apply age- and size-based eviction. Returns the number of deleted entries.'''
+
+    deleted, _ = Transcript.objects.filter(created_at__lt=timezone.now() - _max_age()).delete()
+
+    max_chars = int(getattr(settings, 'QUIZ_TRANSCRIPT_CACHE_MAX_CHARS', 200_000_000))
+    total = Transcript.objects.aggregate(total=Sum('size'))['total'] or 0
+    if total <= max_chars:
+        return deleted
+
+    victims = []
+    for pk, size in Transcript.objects.order_by('last_used_at').values_list('pk', 'size').iterator():
+        if total <= max_chars:
+            break
+        victims.append(pk)
+        total -= size
+    deleted += Transcript.objects.filter(pk__in=victims).delete()[0]
+    return deleted
+
+def _reuse_ttl() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, 'QUIZ_REUSE_TTL_SEC', 7 * 24 * 3600)))
+
+def get_generated_quiz(video_id: str, num_questions: int, prompt_version: str, transcript_key: str = '',
+                       since=None) -> dict | None:
+    '''Return the newest fresh quiz payload for the key, or None.
+
+    `since` restricts the lookup to payloads created at or after that time,
+    which lets concurrent requests share a result without reusing old ones.
+    '''
+
+    entries = GeneratedQuiz.objects.filter(
+        video_id=video_id, num_questions=num_questions, prompt_version=prompt_version,
+        transcript_key=transcript_key, created_at__gte=since or timezone.now() - _reuse_ttl(),
+    )
+    entry = entries.order_by('-created_at').first()
+    return entry.payload if entry else None
+
+def store_generated_quiz(video_id: str, num_questions: int, prompt_version: str, payload: dict,
+                         transcript_key: str = ''):
+    '''Store a quiz payload for reuse and drop expired payloads.'''
+
+    GeneratedQuiz.objects.create(video_id=video_id, num_questions=num_questions, prompt_version=prompt_version,
+                                 transcript_key=transcript_key, payload=payload)
+    GeneratedQuiz.objects.filter(created_at__lt=timezone.now() - _reuse_ttl()).delete()
+
+def _info_cache_key(video_id: str) -> str:
+    return f"quiz:video-info:{video_id}"
+
+def get_cached_video_info(video_id: str) -> dict | None:
+    '''Return a cached yt-dlp info dict for the video, or None.'''
+
+    return cache.get(_info_cache_key(video_id))
+
+def store_video_info(video_id: str, info: dict):
+    '''Cache a sanitized yt-dlp info dict for QUIZ_METADATA_CACHE_TTL_SEC.'''
+
+    ttl = int(getattr(settings, 'QUIZ_METADATA_CACHE_TTL_SEC', 300))
+    if ttl > 0:
+        cache.set(_info_cache_key(video_id), info, ttl)
@@ -0,0 +1,124 @@
+'''Caption-first transcript source for YouTube videos.
+
+Many videos already carry uploaded or auto-generated subtitles, which the
+yt-dlp info dict lists under 'subtitles' and 'automatic_captions'. Fetching
+one of those tracks takes a single small HTTP request, so the pipeline tries
+it before downloading audio and running Whisper.
+
+Track choice:
+- Uploaded subtitles win over automatic captions.
+- Languages are tried in QUIZ_CAPTION_LANGUAGES order, then the video's own
+  language. Machine-translated automatic tracks are ignored.
+- VTT is preferred, then YouTube's srv3/srv2/srv1 XML formats.
+
+Any failure (no track, network error, unparsable payload, too little text)
+returns None so the caller falls back to Whisper.
+'''
+
+import html, re
+import xml.etree.ElementTree as ET
+
+import yt_dlp
+from django.conf import settings
+
+CAPTION_FORMATS = ('vtt', 'srv3', 'srv2', 'srv1')
+
+_VTT_TIMING = re.compile(r'^\d{2}:\d{2}(:\d{2})?\.\d{3}\s+-->')
+_VTT_TAG = re.compile(r'<[^>]+>')
+
+def _caption_languages(info: dict) -> list[str]:
+    langs = list(getattr(settings, 'QUIZ_CAPTION_LANGUAGES', ['en']))
+    if info.get('language') and info['language'] not in langs:
+        langs.append(info['language'])
+    return langs
+
+def _matches(track_lang: str, lang: str) -> bool:
+    return track_lang == lang or track_lang.startswith(f"{lang}-")
+
+def pick_caption_track(info: dict) -> dict | None:
+    '''Select the best subtitle track from a yt-dlp info dict.
+
+    Args:
+        info: The yt-dlp metadata dict for a single video.
+
+    Returns:
+        The chosen track dict (with 'url' and 'ext'), or None if nothing usable exists.
+    '''
+
+    for source in ('subtitles', 'automatic_captions'):
+        tracks = info.get(source) or {}
+        for lang in _caption_languages(info):
+            for track_lang in sorted(t for t in tracks if _matches(t, lang)):
+                formats = [f for f in tracks[track_lang] if f.get('url') and 'tlang=' not in f['url']]
+                for ext in CAPTION_FORMATS:
+                    for fmt in formats:
+                        if fmt.get('ext') == ext:
+                            return fmt
+    return None
+
+def vtt_to_text(raw: str) -> str:
+    '''Convert a WebVTT payload to plain text.
+
+    Drops the header, cue identifiers, timings and inline tags, and collapses
+    the rolling duplicate lines YouTube emits in automatic captions.
+    '''
+
+    lines: list[str] = []
+    for block in re.split(r'\n\s*\n', raw.replace('\r\n', '\n')):
+        block_lines = block.strip().splitlines()
+        if not block_lines or block_lines[0].startswith(('WEBVTT', 'NOTE', 'STYLE', 'REGION')):
+            continue
+        timed = False
+        for line in block_lines:
+            if _VTT_TIMING.match(line):
+                timed = True
+                continue
+            if not timed:
+                continue
+            text = html.unescape(_VTT_TAG.sub('', line)).strip()
+            if text and (not lines or lines[-1] != text):
+                lines.append(text)
+    return ' '.join(lines)
+
+def srv_to_text(raw: str) -> str:
+    '''Convert a YouTube srv1/srv2/srv3 XML payload to plain text.'''
+
+    root = ET.fromstring(raw)
+    lines: list[str] = []
+    for node in root.iter():
+        if node.tag not in ('text', 'p'):
+            continue
+        text = html.unescape(' '.join(''.join(node.itertext()).split()))
+        if text and (not lines or lines[-1] != text):
+            lines.append(text)
+    return ' '.join(lines)
+
+def captions_to_text(raw: str, ext: str) -> str:
+    '''Dispatch to the converter for the given caption format.'''
+
+    if ext == 'vtt':
+        return vtt_to_text(raw)
+    return srv_to_text(raw)
+
+def fetch_captions(info: dict) -> str | None:
+    '''Fetch and convert the best caption track for a video.
+
+    Args:
+        info: The yt-dlp metadata dict returned by ensure_video_available().
+
+    Returns:
+        The caption text, or None when no good captions are available.
+    '''
+
+    track = pick_caption_track(info)
+    if not track:
+        return None
+    try:
+        with yt_dlp.YoutubeDL({'quiet': True, 'noplaylist': True}) as ydl:
+            raw = ydl.urlopen(track['url']).read().decode('utf-8', errors='replace')
+        text = captions_to_text(raw, track['ext'])
+    except Exception:
+        return None
+    if len(text.split()) < int(getattr(settings, 'QUIZ_CAPTION_MIN_WORDS', 50)):
+        return None
+    return text
@@ -0,0 +1,133 @@
+'''Per-job checkpoints, so retried jobs resume after their last completed stage.
+
+When Gemini fails after a long transcription, the retry should not download
+and transcribe again. A quiz job saves the output of each stage as a
+JobCheckpoint row:
+
+- probe: the sanitized yt-dlp info dict.
+- audio: the path of the downloaded audio file, until it is transcribed.
+  A failed transcription keeps the file for the next attempt.
+- transcript: the transcript text.
+- llm: the quiz payload returned by Gemini.
+
+The pipeline (services.create_quiz_from_youtube, stages.py) loads these
+first and skips every stage that already has one. This covers a job that is
+requeued after an unexpected error or picked up again after its worker
+crashed; a user who retries a failed job creates a new job, which adopts
+the checkpoints of the failed one (see adopt()).
+
+Checkpoints are an optimization: one that cannot be read or written (e.g.
+a locked SQLite table) counts as missing, and the stage simply runs.
+
+Garbage collection:
+- A job's checkpoints are deleted (and its audio file removed) once it
+  succeeds or is cancelled.
+- All others expire after QUIZ_CHECKPOINT_TTL_SEC. Probe results contain
+  stream URLs that expire after a few hours, so the TTL should stay below
+  that. Expired checkpoints are collected whenever a job finishes.
+'''
+
+import contextlib, logging, pathlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+
+from ..models import JobCheckpoint, QuizJob
+from .metrics import inc
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('probe', 'audio', 'transcript', 'llm')
+
+def _ttl() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, 'QUIZ_CHECKPOINT_TTL_SEC', 3 * 3600)))
+
+def _remove_audio(checkpoints) -> None:
+    for checkpoint in checkpoints:
+        if checkpoint.stage == 'audio':
+            with contextlib.suppress(Exception):
+                pathlib.Path(checkpoint.data.get('path', '')).unlink(missing_ok=True)
+
+class JobCheckpoints:
+    '''Stage outputs saved for one job.
+
+    Args:
+        job: The QuizJob the checkpoints belong to.
+    '''
+
+    def __init__(self, job: QuizJob):
+        self.job = job
+
+    def load(self, stage: str) -> dict | None:
+        '''Return the saved output of `stage`, or None (also once expired).'''
+
+        try:
+            checkpoint = (
+                JobCheckpoint.objects
+                .filter(job=self.job, stage=stage, created_at__gte=timezone.now() - _ttl())
+                .first()
+            )
+        except OperationalError as e:
+            logger.warning('Could not load the %s checkpoint of job #%s: %s', stage, self.job.pk, e)
+            return None
+        if checkpoint is None:
+            return None
+        if stage == 'audio' and not pathlib.Path(checkpoint.data.get('path', '')).is_file():
+            checkpoint.delete()
+            return None
+        inc('quiz_checkpoint_hits_total', stage=stage)
+        return checkpoint.data
+
+    def save(self, stage: str, data: dict):
+        '''Store the output of a completed stage (replacing an older one).'''
+
+        try:
+            with transaction.atomic():
+                JobCheckpoint.objects.update_or_create(job=self.job, stage=stage, defaults={'data': data})
+        except IntegrityError:
+            pass
+        except OperationalError as e:
+            logger.warning('Could not save the %s checkpoint of job #%s: %s', stage, self.job.pk, e)
+
+    def discard(self, stage: str):
+        '''Drop the checkpoint of `stage` (the audio file stays).'''
+
+        JobCheckpoint.objects.filter(job=self.job, stage=stage).delete()
+
+    def clear(self):
+        '''Drop all checkpoints of the job and remove its audio file.'''
+
+        checkpoints = list(JobCheckpoint.objects.filter(job=self.job))
+        _remove_audio(checkpoints)
+        JobCheckpoint.objects.filter(pk__in=[c.pk for c in checkpoints]).delete()
+
+def adopt(job: QuizJob) -> int:
+    '''Move the checkpoints of the owner's latest failed attempt at the same quiz to `job`.
+
+    Returns:
+        The number of adopted checkpoints.
+    '''
+
+    previous = (
+        QuizJob.objects
+        .filter(owner=job.owner, kind=job.kind, video_url=job.video_url, num_questions=job.num_questions,
+                preset=job.preset, status=QuizJob.STATUS_FAILED, checkpoints__isnull=False)
+        .exclude(pk=job.pk)
+        .order_by('-finished_at')
+        .first()
+    )
+    if previous is None:
+        return 0
+    return JobCheckpoint.objects.filter(job=previous, created_at__gte=timezone.now() - _ttl()).update(job=job)
+
+def collect_garbage() -> int:
+    '''Delete checkpoints of succeeded or cancelled jobs and expired ones. Returns the number deleted.'''
+
+    done = JobCheckpoint.objects.filter(job__status__in=(QuizJob.STATUS_SUCCEEDED, QuizJob.STATUS_CANCELLED))
+    expired = JobCheckpoint.objects.filter(created_at__lt=timezone.now() - _ttl())
+    victims = list(done | expired)
+    _remove_audio(victims)
+    deleted, _ = JobCheckpoint.objects.filter(pk__in=[c.pk for c in victims]).delete()
+    return deleted
@@ -0,0 +1,25 @@
+'''Database helpers shared by the job worker and the pipeline stages.'''
+
+import logging, time
+
+from django.db import OperationalError
+
+logger = logging.getLogger(__name__)
+
+def retry_locked(fn, *args, tries: int = 5, **kwargs):
+    '''Call a database write, retrying briefly while the database reports a lock.
+
+    Pipelined workers write from several threads at once; SQLite answers
+    some of those writes with "database table is locked" instead of waiting.
+    `fn` must be safe to repeat after a failed attempt (a single statement
+    or an atomic block).
+    '''
+
+    for attempt in range(tries):
+        try:
+            return fn(*args, **kwargs)
+        except OperationalError as e:
+            if attempt == tries - 1:
+                raise
+            logger.warning('Database write failed, retrying: %s', e)
+            time.sleep(0.05 * 2 ** attempt)
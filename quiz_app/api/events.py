@@ -0,0 +1,138 @@
+'''Server-Sent Events stream of quiz job progress.
+
+GET /api/jobs/<id>/events/ keeps one response open and pushes the job state
+whenever it changes, instead of clients polling GET /api/jobs/<id>/.
+
+Events (each `data:` line is the QuizJobSerializer JSON of the job):
+- stage: the job entered a new pipeline stage (or was leased or requeued).
+- progress: progress within the current stage (download percent, seconds
+  of audio transcribed).
+- llm_started / llm_done: the Gemini request started / finished.
+- downloaded: the audio download finished (with its size).
+- vad: silence was skipped before Whisper.
+- succeeded / failed / cancelled: the job is finished; the stream ends
+  afterwards.
+
+Workers append every progress write and status change to the job's event
+log (QuizJobEvent, see record_event()), so short stages and one-off events
+are never lost between two polls. Each message carries the event's id:
+- A new stream starts with the job's current state (id of the latest
+  event) and then sends newer events from the log.
+- A reconnecting EventSource sends `Last-Event-ID`; the stream then replays
+  every event after that id instead of the snapshot.
+
+The log is polled every QUIZ_SSE_POLL_SEC seconds. Comment lines are sent
+every QUIZ_SSE_KEEPALIVE_SEC seconds to keep proxies from closing an idle
+connection, and the response ends after QUIZ_SSE_MAX_SEC seconds;
+EventSource clients reconnect on their own. Events older than
+QUIZ_JOB_EVENTS_TTL_SEC are deleted whenever a job finishes.
+
+Each open stream holds a server thread (WSGI) for its lifetime, so size the
+server's thread pool accordingly or serve the API with an ASGI server.
+'''
+
+import json, time
+from collections.abc import Iterator
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+from ..models import QuizJob, QuizJobEvent
+from .serializers import QuizJobSerializer
+
+RECONNECT_MS = 2000
+
+class EventStreamRenderer(BaseRenderer):
+    '''Lets DRF negotiate `Accept: text/event-stream`; errors are sent as JSON.'''
+
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode('utf-8')
+
+def format_event(event: str, data: dict, event_id: int | None = None) -> str:
+    '''Encode one SSE message.'''
+
+    head = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{head}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+FINISHED = (QuizJob.STATUS_SUCCEEDED, QuizJob.STATUS_FAILED, QuizJob.STATUS_CANCELLED)
+
+def record_event(job: QuizJob, event: str):
+    '''Append `event` with the job's current JSON to the job's event log.'''
+
+    QuizJobEvent.objects.create(job_id=job.pk, event=event, data=QuizJobSerializer(job).data)
+
+def status_event(job: QuizJob) -> str:
+    '''Event name for a status change: the final status, else 'stage'.'''
+
+    return job.status if job.status in FINISHED else 'stage'
+
+def prune_events() -> int:
+    '''Delete events older than QUIZ_JOB_EVENTS_TTL_SEC. Returns the number deleted.'''
+
+    ttl = timedelta(seconds=int(getattr(settings, 'QUIZ_JOB_EVENTS_TTL_SEC', 86400)))
+    deleted, _ = QuizJobEvent.objects.filter(created_at__lt=timezone.now() - ttl).delete()
+    return deleted
+
+def parse_event_id(value) -> int | None:
+    '''The id from a `Last-Event-ID` header, or None if missing or malformed.'''
+
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+def iter_job_events(job_id: int, last_event_id: int | None = None, sleep=time.sleep) -> Iterator[str]:
+    '''Yield SSE messages for a job until it finishes or the stream times out.
+
+    Args:
+        job_id: Primary key of the QuizJob to follow.
+        last_event_id: Id of the last event the client received
+            (`Last-Event-ID`); None starts with a snapshot of the job.
+        sleep: Sleep function between polls (replaced in tests).
+
+    Yields:
+        Encoded SSE messages (events and keep-alive comments).
+    '''
+
+    poll = float(getattr(settings, 'QUIZ_SSE_POLL_SEC', 0.5))
+    keepalive = float(getattr(settings, 'QUIZ_SSE_KEEPALIVE_SEC', 15))
+    deadline = time.monotonic() + float(getattr(settings, 'QUIZ_SSE_MAX_SEC', 300))
+    last_sent = time.monotonic()
+
+    yield f"retry: {RECONNECT_MS}\n\n"
+    if last_event_id is None:
+        last_event_id = QuizJobEvent.objects.filter(job_id=job_id).aggregate(last=Max('id'))['last'] or 0
+        job = QuizJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return
+        yield format_event(status_event(job), QuizJobSerializer(job).data, last_event_id)
+        if job.status in FINISHED:
+            return
+    while True:
+        events = list(QuizJobEvent.objects.filter(job_id=job_id, pk__gt=last_event_id).order_by('pk'))
+        for event in events:
+            yield format_event(event.event, event.data, event.pk)
+            last_event_id, last_sent = event.pk, time.monotonic()
+            if event.event in FINISHED:
+                return
+        if not events:
+            job = QuizJob.objects.filter(pk=job_id).first()
+            if job is None:
+                return
+            if job.status in FINISHED:
+                # Finished without a logged final event (e.g. changed in the admin).
+                yield format_event(job.status, QuizJobSerializer(job).data, last_event_id)
+                return
+        if time.monotonic() >= deadline:
+            return
+        if time.monotonic() - last_sent >= keepalive:
+            yield ': keep-alive\n\n'
+            last_sent = time.monotonic()
+        sleep(poll)
@@ -0,0 +1,113 @@
+'''Process-wide Gemini client with pooled keep-alive connections.
+
+- get_client() builds one `genai.Client` per API key and reuses it for every
+  request in the process. Its httpx clients keep up to
+  QUIZ_GEMINI_MAX_CONNECTIONS connections alive for QUIZ_GEMINI_KEEPALIVE_SEC
+  seconds, so repeated calls skip client setup and the TLS handshake.
+- json_config() switches a call to structured JSON output with a response
+  schema, so responses need no fence stripping.
+- Quiz calls are async (the SDK's `client.aio` interface). Synchronous
+  callers run them with run() on one background event loop per process, so
+  all threads share its connection pool. httpx binds an async connection
+  pool to the loop it was opened on, so get_async_client() hands every
+  other event loop a client of its own.
+- concurrency_slot() bounds the number of in-flight async calls to
+  QUIZ_GEMINI_CONCURRENCY per event loop.
+- Cached clients and the background loop are dropped in forked children:
+  open sockets must not be shared between processes.
+'''
+
+import asyncio, contextlib, os, threading, weakref
+
+import httpx
+from django.conf import settings
+from google import genai
+from google.genai import types
+
+_clients: dict[str, genai.Client] = {}
+_clients_lock = threading.Lock()
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+def _http_options() -> types.HttpOptions:
+    max_connections = int(getattr(settings, 'QUIZ_GEMINI_MAX_CONNECTIONS', 10))
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=float(getattr(settings, 'QUIZ_GEMINI_KEEPALIVE_SEC', 60)),
+    )
+    return types.HttpOptions(client_args={'limits': limits}, async_client_args={'limits': limits})
+
+def get_client(api_key: str) -> genai.Client:
+    '''Return the shared Gemini client for `api_key`, creating it on first use.'''
+
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = genai.Client(api_key=api_key, http_options=_http_options())
+        return client
+
+def get_async_client(api_key: str):
+    '''Return the async interface (`client.aio`) for `api_key` to use on the running event loop.
+
+    The background loop of run() uses the shared client from get_client();
+    any other loop gets a client of its own, kept while the loop exists.
+    '''
+
+    loop = asyncio.get_running_loop()
+    if loop is _loop:
+        return get_client(api_key).aio
+    with _clients_lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            clients = _async_clients[loop] = {}
+        if api_key not in clients:
+            clients[api_key] = genai.Client(api_key=api_key, http_options=_http_options()).aio
+        return clients[api_key]
+
+def run(coro):
+    '''Run `coro` on the process's background event loop and wait for its result.'''
+
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='gemini-aio', daemon=True).start()
+        loop = _loop
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+def json_config(schema: dict | None = None) -> types.GenerateContentConfig:
+    '''Request config for JSON-mode output, constrained by `schema` if given (see schemas.py).'''
+
+    return types.GenerateContentConfig(response_mime_type='application/json', response_schema=schema)
+
+def reset_clients():
+    '''Forget all cached clients (after fork, or in tests).'''
+
+    with _clients_lock:
+        _clients.clear()
+        _async_clients.clear()
+    _semaphores.clear()
+
+@contextlib.asynccontextmanager
+async def concurrency_slot():
+    '''Hold one of the QUIZ_GEMINI_CONCURRENCY async call slots of the running loop.'''
+
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(int(getattr(settings, 'QUIZ_GEMINI_CONCURRENCY', 8)))
+    async with semaphore:
+        yield
+
+def _after_fork():
+    global _clients_lock, _loop, _loop_lock
+    _clients_lock, _loop, _loop_lock = threading.Lock(), None, threading.Lock()
+    _clients.clear()
+    _async_clients.clear()
+    _semaphores.clear()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,87 @@
+'''Hedged Gemini requests: cut tail latency with a duplicate call.
+
+Gemini latency for a full quiz prompt has a long tail (p99 several times
+p50). With QUIZ_GEMINI_HEDGE enabled, generate_quiz_with_gemini() sends the
+prompt once and, if no answer has arrived after the
+QUIZ_GEMINI_HEDGE_PERCENTILE-th percentile of recently observed latencies,
+sends it again. The first response that passes validate_quiz_dict() wins;
+the other request is cancelled (see services._hedged_quiz()).
+
+- LatencyTracker keeps the last QUIZ_GEMINI_HEDGE_WINDOW latencies of
+  quiz calls in this process. Until QUIZ_GEMINI_HEDGE_MIN_SAMPLES have been
+  observed, no hedge is sent. A first request that loses to its hedge is
+  cancelled before it completes; it is recorded with its start-to-cancel
+  time, a lower bound of its latency (a censored sample). Leaving these
+  slowest requests out would pull the percentile down and make hedges ever
+  more frequent.
+- At most QUIZ_GEMINI_HEDGE_MAX_PER_MIN hedges are sent per minute, counted
+  in Django's cache (shared by all processes with a shared cache backend),
+  so a slow Gemini cannot double the bill.
+- Quiz calls use the SDK's async interface (see gemini.py), so the losing
+  request can be cancelled mid-flight.
+'''
+
+import collections, threading, time
+
+from django.conf import settings
+from django.core.cache import cache
+
+class LatencyTracker:
+    '''Rolling window of observed latencies with percentile lookup.
+
+    Args:
+        size: Number of most recent observations kept.
+    '''
+
+    def __init__(self, size: int = 200):
+        self._samples: collections.deque = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float, min_samples: int = 1) -> float | None:
+        '''The `p`-th percentile (nearest rank), or None with fewer than `min_samples` observations.'''
+
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples or len(samples) < min_samples:
+            return None
+        rank = min(len(samples) - 1, max(0, int(round(p / 100 * len(samples))) - 1))
+        return samples[rank]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+tracker = LatencyTracker(int(getattr(settings, 'QUIZ_GEMINI_HEDGE_WINDOW', 200)))
+
+def enabled() -> bool:
+    return bool(getattr(settings, 'QUIZ_GEMINI_HEDGE', False))
+
+def hedge_delay() -> float | None:
+    '''Seconds to wait for the first response before hedging, or None if there is too little data.'''
+
+    return tracker.percentile(
+        float(getattr(settings, 'QUIZ_GEMINI_HEDGE_PERCENTILE', 95)),
+        min_samples=int(getattr(settings, 'QUIZ_GEMINI_HEDGE_MIN_SAMPLES', 20)),
+    )
+
+def acquire_hedge() -> bool:
+    '''Take one hedge from this minute's QUIZ_GEMINI_HEDGE_MAX_PER_MIN budget.'''
+
+    limit = int(getattr(settings, 'QUIZ_GEMINI_HEDGE_MAX_PER_MIN', 10))
+    if limit <= 0:
+        return False
+    key = f"quiz:hedges:{int(time.time() // 60)}"
+    cache.add(key, 0, timeout=120)
+    try:
+        return cache.incr(key) <= limit
+    except ValueError:
+        cache.set(key, 1, timeout=120)
+        return True
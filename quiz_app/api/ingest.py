@@ -0,0 +1,125 @@
+'''Offline bulk ingestion of many videos (used by `manage.py ingest_videos`).
+
+Videos run through the staged pipeline from stages.py: probing and
+downloads, Whisper, and Gemini each have their own pool, connected by
+bounded queues. While Gemini works on video N-1 and Whisper on video N, the
+audio of video N+1 is already downloading:
+
+- prepare: probe the video, reuse a cached transcript or its captions,
+  otherwise download the audio file.
+- transcribe: run Whisper on downloaded audio in worker processes.
+- generate: call Gemini and persist the quiz for the owner.
+
+Bounded queues keep a fast stage from running far ahead of a slow one (and
+from filling the temp directory with audio).
+
+Resuming:
+- Videos that already have a quiz for the owner are skipped.
+- Transcripts are written to the shared transcript cache as soon as they
+  exist, so a rerun after an interruption only repeats unfinished work.
+'''
+
+import logging, pathlib, re
+
+import yt_dlp
+
+from .pipeline import STATUS_FAILED, STATUS_INTERRUPTED, STATUS_OK, STATUS_SKIPPED, Pipeline, PipelineReport, Task
+from .services import YOUTUBE_CANONICAL, extract_youtube_id
+from .stages import QuizRun, build_stages
+
+logger = logging.getLogger(__name__)
+
+_PLAYLIST_ID = re.compile(r'^(PL|UU|LL|FL|OL|RD)[\w-]{10,}$')
+
+def summary(report: PipelineReport) -> str:
+    '''Human-readable summary of an ingestion run: outcomes, throughput and stage utilization.'''
+
+    done = report.count(STATUS_OK)
+    audio_hours = sum(task.item.duration for task in report.tasks if task.status == STATUS_OK) / 3600
+    hours = max(report.elapsed, 1e-9) / 3600
+    lines = [
+        f"Videos: {len(report.tasks)} total, {done} created, {report.count(STATUS_SKIPPED)} skipped, "
+        f"{report.count(STATUS_FAILED)} failed, {report.count(STATUS_INTERRUPTED)} not started",
+        f"Wall time: {report.elapsed:.1f}s, {done / hours:.1f} videos/hour, "
+        f"{audio_hours:.2f} h of audio ({audio_hours / hours:.1f}x real time)",
+    ]
+    for stage, workers in report.workers.items():
+        lines.append(f"  {stage:<10} {workers} worker(s), busy {report.busy(stage):.1f}s, "
+                     f"utilization {report.utilization(stage):.0%}")
+    return '\n'.join(lines)
+
+def read_sources(path: str) -> list[str]:
+    '''Read video URLs, video ids or playlist URLs/ids from a file (one per line, '#' comments).'''
+
+    lines = pathlib.Path(path).read_text(encoding='utf-8').splitlines()
+    return [line.split('#', 1)[0].strip() for line in lines if line.split('#', 1)[0].strip()]
+
+def _is_playlist(source: str) -> bool:
+    if _PLAYLIST_ID.match(source):
+        return True
+    return 'list=' in source and 'v=' not in source and 'youtu.be/' not in source
+
+def expand_sources(sources: list[str]) -> list[str]:
+    '''Resolve playlists to their videos and return unique canonical watch URLs.
+
+    Raises:
+        ValueError: If a line is neither a YouTube video nor a playlist.
+    '''
+
+    urls: list[str] = []
+    for source in sources:
+        if _is_playlist(source):
+            url = source if '://' in source else f"https://www.youtube.com/playlist?list={source}"
+            with yt_dlp.YoutubeDL({'quiet': True, 'extract_flat': 'in_playlist'}) as ydl:
+                entries = (ydl.extract_info(url, download=False) or {}).get('entries') or []
+            urls += [YOUTUBE_CANONICAL.format(vid=e['id']) for e in entries if e and e.get('id')]
+        elif re.fullmatch(r'[\w-]{11}', source):
+            urls.append(YOUTUBE_CANONICAL.format(vid=source))
+        else:
+            urls.append(YOUTUBE_CANONICAL.format(vid=extract_youtube_id(source)))
+    return list(dict.fromkeys(urls))
+
+def run_ingest(urls: list[str], owner, num_questions: int = 10, workers: dict[str, int] | None = None,
+               queue_size: int = 4, on_item=None, should_stop=lambda: False,
+               whisper_processes: bool = True, preset: str = '') -> PipelineReport:
+    '''Run the staged pipeline over `urls` and return a report.
+
+    Args:
+        urls: Canonical watch URLs (see expand_sources()).
+        owner: The User who will own the created quizzes.
+        num_questions: Questions per quiz.
+        workers: Pool size per stage, e.g. {'prepare': 2, 'transcribe': 1,
+            'generate': 2}; missing stages get one worker.
+        queue_size: Capacity of each queue between stages.
+        on_item: Optional callable invoked with each finished pipeline Task
+            (its `item` is the QuizRun).
+        should_stop: Polled before each unit of work; once true, remaining
+            videos are marked 'interrupted' and the run winds down.
+        whisper_processes: Run Whisper in worker processes (see
+            stages.build_stages()).
+        preset: Transcription preset for every video (see presets.py).
+
+    Returns:
+        The pipeline's report, covering every input URL (see summary()).
+    '''
+
+    stages = build_stages(workers, whisper_processes=whisper_processes)
+
+    def finished(task: Task):
+        task.item.discard_audio()
+        if task.status == STATUS_FAILED and not isinstance(task.exception, ValueError):
+            logger.error('Ingestion of %s failed', task.item.url, exc_info=task.exception)
+            task.error = f"Internal error: {task.error}"
+        if on_item is not None:
+            on_item(task)
+
+    runs = (QuizRun(url, owner, num_questions, skip_existing=True, preset=preset) for url in urls)
+    result = Pipeline(stages, queue_size=queue_size).run(runs, on_done=finished, should_stop=should_stop)
+    started = {task.item.url for task in result.tasks}
+    for url in urls:
+        if url not in started:
+            task = Task(QuizRun(url, owner, num_questions))
+            task.status = STATUS_INTERRUPTED
+            result.tasks.append(task)
+            finished(task)
+    return result
@@ -0,0 +1,457 @@
+'''Durable background jobs for quiz creation.
+
+The web tier only validates the URL and inserts a QuizJob row; worker
+processes started with `manage.py run_quiz_worker` lease queued jobs and run
+the yt-dlp → Whisper → Gemini pipeline outside the request cycle.
+
+Leasing:
+- A lease is taken with a conditional UPDATE (compare-and-swap on status and
+  lease expiry), so it works on every database backend, SQLite included.
+- Running jobs renew their lease on each progress report, and a heartbeat
+  thread (LeaseHeartbeat) renews it while a phase reports nothing for a
+  long time (Gemini retries, single-flight waits, a Whisper pass). If a
+  worker dies, the lease expires and another worker picks the job up again,
+  up to QUIZ_JOB_MAX_ATTEMPTS attempts.
+
+Error handling:
+- ValueError from the pipeline is an expected, user-facing failure: the job
+  fails immediately with the message in `error`.
+- DependencyUnavailable (Gemini or YouTube down, see resilience.py) is a
+  ValueError too, but the job is requeued instead: it is not leased again
+  before the dependency's circuit breaker lets calls through, and the
+  attempt does not count.
+- Any other exception is retried until the attempts are exhausted.
+- Quiz jobs checkpoint each completed stage (see checkpoints.py), so a
+  retried or re-leased job resumes where the last attempt stopped, and a new
+  job for the same quiz adopts the checkpoints of the owner's failed one.
+
+Prefetch jobs (POST /api/prefetch/):
+- Run probe, download and transcription into the transcript cache only, so
+  a later quiz request just calls Gemini. Quiz jobs are leased first.
+- At most QUIZ_PREFETCH_MAX_ACTIVE queued or running prefetches per user;
+  a second prefetch of the same video returns the active one.
+- cancel_job() marks a job cancelled and drops its lease; the worker stops
+  at its next progress report (JobCancelled), and its outcome is discarded.
+
+Pipelined workers (work_pipelined, `run_quiz_worker --pipelined`):
+- Jobs flow through the per-stage pools of stages.py, so one worker
+  downloads, transcribes and calls Gemini for different jobs at once.
+- A job is only leased when the first stage has room; a heartbeat thread
+  renews the leases of jobs waiting in the stage queues.
+'''
+
+import logging, os, socket, threading, time, uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from ..models import QuizJob
+from . import checkpoints
+from .db import retry_locked
+from .events import prune_events, record_event, status_event
+from .metrics import inc, publish_snapshot
+from .pipeline import STATUS_INTERRUPTED, Pipeline, Task
+from .presets import validate_preset
+from .resilience import DependencyUnavailable
+from .services import YOUTUBE_CANONICAL, create_quiz_from_youtube, extract_youtube_id, prefetch_transcript
+from .singleflight import Abandoned
+from .stages import QuizRun, build_stages
+
+logger = logging.getLogger(__name__)
+
+class JobCancelled(Abandoned):
+    '''Raised from a progress report once the job was cancelled.
+
+    Jobs waiting on the same coalesced work carry on without it (see
+    singleflight.Abandoned).
+    '''
+
+class PrefetchLimitExceeded(ValueError):
+    '''The user already has QUIZ_PREFETCH_MAX_ACTIVE active prefetches.'''
+
+STAGE_RANGES = {
+    'queued': (0.0, 0.0),
+    'probe': (0.0, 0.05),
+    'download': (0.05, 0.25),
+    'transcribe': (0.25, 0.7),
+    'generate': (0.7, 0.95),
+    'persist': (0.95, 1.0),
+    'done': (1.0, 1.0),
+}
+
+def default_worker_id() -> str:
+    '''Return an identifier unique to this worker process.'''
+
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def _lease_duration() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, 'QUIZ_JOB_LEASE_SEC', 120)))
+
+def _max_attempts() -> int:
+    return int(getattr(settings, 'QUIZ_JOB_MAX_ATTEMPTS', 3))
+
+def enqueue_quiz_job(url: str, owner, num_questions: int = 10, preset: str = '') -> QuizJob:
+    '''Validate a YouTube URL and queue a quiz-creation job for it.
+
+    Raises:
+        ValueError: If the URL is not a supported YouTube URL or the preset
+            is unknown.
+    '''
+
+    canonical_url = YOUTUBE_CANONICAL.format(vid=extract_youtube_id(url))
+    job = QuizJob.objects.create(owner=owner, video_url=canonical_url, num_questions=num_questions,
+                                 preset=validate_preset(preset))
+    checkpoints.adopt(job)
+    return job
+
+def enqueue_prefetch_job(url: str, owner, preset: str = '') -> tuple[QuizJob, bool]:
+    '''Queue a prefetch job, or return the owner's active prefetch of the same video.
+
+    Returns:
+        (job, created).
+
+    Raises:
+        ValueError: If the URL is not a supported YouTube URL or the preset
+            is unknown.
+        PrefetchLimitExceeded: If the owner has too many active prefetches.
+    '''
+
+    canonical_url = YOUTUBE_CANONICAL.format(vid=extract_youtube_id(url))
+    preset = validate_preset(preset)
+    active = QuizJob.objects.filter(owner=owner, kind=QuizJob.KIND_PREFETCH, status__in=QuizJob.ACTIVE_STATUSES)
+    existing = active.filter(video_url=canonical_url, preset=preset).first()
+    if existing is not None:
+        return existing, False
+    limit = int(getattr(settings, 'QUIZ_PREFETCH_MAX_ACTIVE', 3))
+    if active.count() >= limit:
+        raise PrefetchLimitExceeded(f"At most {limit} prefetches can be active at a time.")
+    job = QuizJob.objects.create(owner=owner, kind=QuizJob.KIND_PREFETCH, video_url=canonical_url, preset=preset)
+    return job, True
+
+def cancel_job(job: QuizJob) -> bool:
+    '''Cancel a queued or running job. Returns False if it had already finished.
+
+    A running job loses its lease at once; its worker stops at the next
+    progress report.
+    '''
+
+    now = timezone.now()
+    with transaction.atomic():
+        cancelled = QuizJob.objects.filter(pk=job.pk, status__in=QuizJob.ACTIVE_STATUSES).update(
+            status=QuizJob.STATUS_CANCELLED, lease_owner='', lease_expires_at=None, finished_at=now, updated_at=now,
+        )
+        job.refresh_from_db()
+        if cancelled:
+            record_event(job, QuizJob.STATUS_CANCELLED)
+    if cancelled:
+        inc('quiz_jobs_cancelled_total', kind=job.kind)
+    return job.status == QuizJob.STATUS_CANCELLED
+
+def lease_next_job(worker_id: str) -> QuizJob | None:
+    '''Atomically lease the oldest runnable job, or return None if there is none.
+
+    Runnable means queued (and past `not_before`), or running with an
+    expired lease (crashed worker), with attempts left. Quiz jobs go before
+    prefetch jobs.
+    '''
+
+    now = timezone.now()
+    queued = Q(status=QuizJob.STATUS_QUEUED) & (Q(not_before__isnull=True) | Q(not_before__lte=now))
+    runnable = (
+        QuizJob.objects
+        .filter(queued | Q(status=QuizJob.STATUS_RUNNING, lease_expires_at__lt=now))
+        .filter(attempts__lt=_max_attempts())
+        .order_by(Case(When(kind=QuizJob.KIND_PREFETCH, then=1), default=0), 'created_at')
+    )
+    for job in runnable[:10]:
+        with transaction.atomic():
+            claimed = QuizJob.objects.filter(
+                pk=job.pk, status=job.status, lease_expires_at=job.lease_expires_at,
+            ).update(
+                status=QuizJob.STATUS_RUNNING,
+                lease_owner=worker_id,
+                lease_expires_at=now + _lease_duration(),
+                attempts=F('attempts') + 1,
+                updated_at=now,
+            )
+            if claimed:
+                job.refresh_from_db()
+                record_event(job, 'stage')
+                return job
+    return None
+
+def fail_exhausted_jobs() -> int:
+    '''Mark jobs whose lease expired on their last attempt as failed.'''
+
+    now = timezone.now()
+    exhausted = QuizJob.objects.filter(
+        status=QuizJob.STATUS_RUNNING, lease_expires_at__lt=now, attempts__gte=_max_attempts(),
+    )
+    failed = 0
+    for job in exhausted:
+        with transaction.atomic():
+            if QuizJob.objects.filter(pk=job.pk, status=job.status, lease_expires_at=job.lease_expires_at).update(
+                status=QuizJob.STATUS_FAILED, error='Job did not finish (worker lost).', finished_at=now, updated_at=now,
+            ):
+                job.refresh_from_db()
+                record_event(job, QuizJob.STATUS_FAILED)
+                failed += 1
+    return failed
+
+class JobReporter:
+    '''Progress callback that writes stage/progress to the job and renews its lease.
+
+    Keyword arguments (downloaded bytes, transcribed seconds, LLM events) are
+    stored in `QuizJob.detail`, and every write is appended to the job's event
+    log for the progress stream (see events.py); a reported
+    `skipped_fraction` (VAD) is also kept in `QuizJob.skipped_audio_fraction`
+    and `downloaded_bytes` in `QuizJob.downloaded_bytes` beyond the current
+    stage. Once the job has been cancelled, the next write
+    raises JobCancelled to stop the pipeline. Writes are throttled
+    to one per `min_interval` seconds unless the stage changes or an `event`
+    is reported, so fine-grained progress does not hammer the database.
+    '''
+
+    def __init__(self, job: QuizJob, worker_id: str, min_interval: float = 1.0):
+        self.job = job
+        self.worker_id = worker_id
+        self.min_interval = min_interval
+        self._last_write = 0.0
+
+    def __call__(self, stage: str, fraction: float = 0.0, **detail):
+        start, end = STAGE_RANGES.get(stage, (self.job.progress, self.job.progress))
+        progress = round(start + (end - start) * min(max(fraction, 0.0), 1.0), 4)
+        now = time.monotonic()
+        if stage == self.job.stage and 'event' not in detail and now - self._last_write < self.min_interval:
+            return
+        self._last_write = now
+        event = detail.get('event') or ('stage' if stage != self.job.stage else 'progress')
+        self.job.stage, self.job.progress, self.job.detail = stage, progress, detail
+        fields = {}
+        if 'skipped_fraction' in detail:
+            fields['skipped_audio_fraction'] = self.job.skipped_audio_fraction = detail['skipped_fraction']
+        if 'downloaded_bytes' in detail:
+            fields['downloaded_bytes'] = self.job.downloaded_bytes = detail['downloaded_bytes']
+        updated = retry_locked(
+            QuizJob.objects.filter(pk=self.job.pk, lease_owner=self.worker_id).update,
+            stage=stage, progress=progress, detail=detail,
+            lease_expires_at=timezone.now() + _lease_duration(), updated_at=timezone.now(), **fields,
+        )
+        if updated:
+            retry_locked(record_event, self.job, event)
+        elif QuizJob.objects.filter(pk=self.job.pk, status=QuizJob.STATUS_CANCELLED).exists():
+            raise JobCancelled(f"Job #{self.job.pk} was cancelled.")
+
+class LeaseHeartbeat:
+    '''Context manager whose thread renews the leases of a worker's running jobs.
+
+    Progress reports renew a lease too, but some phases report nothing for
+    longer than QUIZ_JOB_LEASE_SEC; without the heartbeat another worker
+    would lease the job and run it a second time. Renewals happen every
+    third of the lease duration.
+
+    Args:
+        worker_id: The worker holding the leases.
+        job_ids: Jobs to keep alive from the start; see add() / discard().
+    '''
+
+    def __init__(self, worker_id: str, job_ids=()):
+        self.worker_id = worker_id
+        self._ids = set(job_ids)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, job_id: int):
+        with self._lock:
+            self._ids.add(job_id)
+
+    def discard(self, job_id: int):
+        with self._lock:
+            self._ids.discard(job_id)
+
+    def _run(self):
+        interval = _lease_duration().total_seconds() / 3
+        try:
+            while not self._stopped.wait(interval):
+                with self._lock:
+                    ids = list(self._ids)
+                if not ids:
+                    continue
+                try:
+                    QuizJob.objects.filter(pk__in=ids, lease_owner=self.worker_id).update(
+                        lease_expires_at=timezone.now() + _lease_duration(),
+                    )
+                except OperationalError as e:
+                    logger.warning('Renewing job leases failed, retrying: %s', e)
+        finally:
+            connection.close()
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self._thread = threading.Thread(target=self._run, name='lease-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+def _finish(job: QuizJob, worker_id: str, **fields):
+    now = timezone.now()
+    fields.update(lease_owner='', lease_expires_at=None, updated_at=now)
+    if fields.get('status') in (QuizJob.STATUS_SUCCEEDED, QuizJob.STATUS_FAILED):
+        fields['finished_at'] = now
+    with transaction.atomic():
+        finished = QuizJob.objects.filter(pk=job.pk, lease_owner=worker_id).update(**fields)
+        job.refresh_from_db()
+        if finished:
+            record_event(job, status_event(job))
+
+def run_job(job: QuizJob, worker_id: str) -> QuizJob:
+    '''Run the quiz pipeline (or the prefetch) for a leased job and record the outcome.
+
+    A LeaseHeartbeat keeps the lease alive for the whole run.
+    '''
+
+    try:
+        with LeaseHeartbeat(worker_id, [job.pk]):
+            if job.kind == QuizJob.KIND_PREFETCH:
+                quiz = None
+                prefetch_transcript(job.video_url, progress=JobReporter(job, worker_id), preset=job.preset)
+            else:
+                quiz = create_quiz_from_youtube(
+                    job.video_url, owner=job.owner, num_questions=job.num_questions,
+                    progress=JobReporter(job, worker_id), preset=job.preset,
+                    checkpoints=checkpoints.JobCheckpoints(job),
+                )
+    except Exception as e:
+        _record_outcome(job, worker_id, error=e)
+    else:
+        _record_outcome(job, worker_id, quiz=quiz)
+    return job
+
+def _record_outcome(job: QuizJob, worker_id: str, quiz=None, error: BaseException | None = None):
+    '''Finish a job as succeeded, failed (ValueError, last attempt) or requeued.
+
+    Jobs hit by a dependency outage are requeued for after its cooldown
+    without using up the attempt.
+
+    Nothing is recorded for cancelled jobs: they no longer hold the lease.
+    Checkpoints of finished jobs and expired job events are collected
+    afterwards.
+    '''
+
+    if isinstance(error, JobCancelled):
+        job.refresh_from_db()
+    elif error is None:
+        _finish(job, worker_id, status=QuizJob.STATUS_SUCCEEDED, stage='done', progress=1.0, detail={}, quiz=quiz, error='')
+        checkpoints.JobCheckpoints(job).clear()
+    elif isinstance(error, DependencyUnavailable):
+        inc('quiz_jobs_deferred_total', dependency=error.dependency)
+        _finish(job, worker_id, status=QuizJob.STATUS_QUEUED, stage='queued', progress=0.0, detail={},
+                error=str(error), attempts=F('attempts') - 1,
+                not_before=timezone.now() + timedelta(seconds=error.retry_after))
+    elif isinstance(error, ValueError):
+        _finish(job, worker_id, status=QuizJob.STATUS_FAILED, error=str(error))
+    elif job.attempts >= _max_attempts():
+        _finish(job, worker_id, status=QuizJob.STATUS_FAILED, error=f"Internal error: {error}")
+    else:
+        inc('quiz_retries_total', operation='job')
+        _finish(job, worker_id, status=QuizJob.STATUS_QUEUED, stage='queued', progress=0.0, detail={}, error=str(error))
+    checkpoints.collect_garbage()
+    prune_events()
+
+def work(worker_id: str, poll_interval: float = 2.0, once: bool = False, should_stop=lambda: False) -> int:
+    '''Lease and run jobs until `should_stop()` is true. Returns the number of jobs run.
+
+    With `once=True` the loop exits as soon as the queue is empty.
+    '''
+
+    processed = 0
+    while not should_stop():
+        close_old_connections()
+        fail_exhausted_jobs()
+        job = lease_next_job(worker_id)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job, worker_id)
+        publish_snapshot(worker_id)
+        processed += 1
+    return processed
+
+def pipeline_stages():
+    '''Stages for pipelined workers, sized from the QUIZ_STAGE_* settings.'''
+
+    workers = {
+        'prepare': getattr(settings, 'QUIZ_STAGE_PREPARE_WORKERS', 2),
+        'transcribe': getattr(settings, 'QUIZ_STAGE_TRANSCRIBE_WORKERS', 1),
+        'generate': getattr(settings, 'QUIZ_STAGE_GENERATE_WORKERS', 4),
+    }
+    return build_stages(workers, whisper_processes=getattr(settings, 'QUIZ_STAGE_WHISPER_PROCESSES', True))
+
+def work_pipelined(worker_id: str, poll_interval: float = 2.0, once: bool = False, should_stop=lambda: False,
+                   stages=None) -> int:
+    '''Like work(), but with several jobs in flight across per-stage pools.
+
+    Jobs are leased lazily, only while the first stage queue has room. On a
+    stop request no new jobs are leased, jobs that are mid-stage finish
+    their current stage, and jobs still waiting in a queue are released for
+    other workers without using up an attempt.
+
+    Args:
+        stages: Pipeline stages (defaults to pipeline_stages()).
+
+    Returns:
+        The number of jobs that finished (succeeded, failed or requeued).
+    '''
+
+    processed = [0]
+    lock = threading.Lock()
+    heartbeat = LeaseHeartbeat(worker_id)
+
+    def leased():
+        while not should_stop():
+            close_old_connections()
+            try:
+                fail_exhausted_jobs()
+                job = lease_next_job(worker_id)
+            except OperationalError as e:
+                # Runs next to the stage threads' writes; a locked database must not end the feed.
+                logger.warning('Leasing a job failed, retrying: %s', e)
+                time.sleep(min(poll_interval, 0.5))
+                continue
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+            heartbeat.add(job.pk)
+            yield QuizRun(job.video_url, job.owner, job.num_questions, progress=JobReporter(job, worker_id),
+                          preset=job.preset, transcript_only=job.kind == QuizJob.KIND_PREFETCH,
+                          checkpoints=checkpoints.JobCheckpoints(job) if job.kind == QuizJob.KIND_QUIZ else None)
+
+    def finished(task: Task):
+        run = task.item
+        job = run.report.job
+        run.discard_audio()
+        if task.status == STATUS_INTERRUPTED:
+            retry_locked(_finish, job, worker_id, status=QuizJob.STATUS_QUEUED, stage='queued', progress=0.0,
+                          detail={}, attempts=F('attempts') - 1)
+        else:
+            retry_locked(_record_outcome, job, worker_id, quiz=run.quiz, error=task.exception)
+            publish_snapshot(worker_id)
+        heartbeat.discard(job.pk)
+        with lock:
+            processed[0] += task.status != STATUS_INTERRUPTED
+
+    with heartbeat:
+        Pipeline(stages or pipeline_stages(), queue_size=getattr(settings, 'QUIZ_STAGE_QUEUE_SIZE', 2)).run(
+            leased(), on_done=finished, should_stop=should_stop,
+        )
+    return processed[0]
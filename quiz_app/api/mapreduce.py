@@ -0,0 +1,181 @@
+'''Token budgeting and map-reduce helpers for long transcripts.
+
+A single prompt holding a multi-hour transcript is slow, expensive and may
+exceed the model's input limit. Transcripts above QUIZ_PROMPT_TOKEN_BUDGET
+tokens are therefore processed in two passes (see
+services.agenerate_quiz_map_reduce):
+
+- Map: the transcript is split on sentence boundaries into chunks of at most
+  QUIZ_MAP_CHUNK_TOKENS tokens, and candidate questions are generated for
+  every chunk in parallel.
+- Reduce: duplicate candidates are dropped and one final call picks exactly
+  `num_questions` of them (by index) and writes the quiz title and
+  description. The chosen questions are taken verbatim from the candidates,
+  so the reduce call cannot break their format.
+
+Token counts use tiktoken (QUIZ_TOKEN_ENCODING). It is only an
+approximation of Gemini's tokenizer, which is fine for budgeting. If the
+encoding cannot be loaded (e.g. no network to fetch the BPE file), counting
+falls back to roughly four characters per token.
+'''
+
+import functools, json, logging, math, re
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+@functools.lru_cache(maxsize=4)
+def _encoding(name: str):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning('tiktoken encoding %s unavailable, estimating tokens from length: %s', name, e)
+        return None
+
+def count_tokens(text: str) -> int:
+    '''Return the (approximate) number of tokens in `text`.'''
+
+    encoding = _encoding(getattr(settings, 'QUIZ_TOKEN_ENCODING', 'cl100k_base'))
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _pieces(text: str, max_tokens: int) -> list[tuple[str, int]]:
+    '''Split text into sentences (or word runs for overlong sentences) with token counts.'''
+
+    pieces = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        tokens = count_tokens(sentence)
+        if tokens <= max_tokens:
+            pieces.append((sentence, tokens))
+            continue
+        run, run_tokens = [], 0
+        for word in sentence.split():
+            word_tokens = count_tokens(' ' + word)
+            if run and run_tokens + word_tokens > max_tokens:
+                pieces.append((' '.join(run), run_tokens))
+                run, run_tokens = [], 0
+            run.append(word)
+            run_tokens += word_tokens
+        if run:
+            pieces.append((' '.join(run), run_tokens))
+    return pieces
+
+def split_by_tokens(text: str, max_tokens: int) -> list[str]:
+    '''Split text into chunks of at most `max_tokens` tokens, on sentence boundaries where possible.'''
+
+    chunks, current, used = [], [], 0
+    for piece, tokens in _pieces(text, max_tokens):
+        if current and used + tokens + 1 > max_tokens:
+            chunks.append(' '.join(current))
+            current, used = [], 0
+        current.append(piece)
+        used += tokens + 1
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+def candidates_per_chunk(num_questions: int, num_chunks: int, oversample: float = 2.0) -> int:
+    '''Number of candidate questions to request from each chunk.'''
+
+    return max(2, math.ceil(num_questions * oversample / max(num_chunks, 1)))
+
+def build_map_prompt(chunk: str, num_candidates: int, part: int, parts: int) -> str:
+    '''Prompt asking for candidate questions about one transcript chunk.'''
+
+    return f"""
+The following text is part {part} of {parts} of a video transcript.
+Write {num_candidates} quiz questions that test understanding of this part only.
+
+Return valid JSON with this exact structure:
+
+{{
+  "questions": [
+    {{
+      "question_title": "The question goes here.",
+      "question_options": ["Option A", "Option B", "Option C", "Option D"],
+      "answer": "The correct answer from the above options"
+    }}
+  ]
+}}
+
+Requirements:
+- Each question must have exactly 4 distinct answer options.
+- Only one correct answer per question, and it must be present in "question_options".
+- The output must be valid JSON and parsable as-is. Do NOT include markdown fences or explanations.
+
+Transcript part:
+\"\"\"{chunk}\"\"\"
+""".strip()
+
+def build_reduce_prompt(candidates: list[dict], num_questions: int) -> str:
+    '''Prompt asking to pick `num_questions` candidates and title the quiz.'''
+
+    listing = '\n'.join(
+        f"{i}. {q['question_title']} (answer: {q['answer']})" for i, q in enumerate(candidates)
+    )
+    return f"""
+Below are numbered candidate quiz questions generated from consecutive parts of one video transcript.
+Select exactly {num_questions} of them that together cover the whole video, avoid overlapping
+questions, and prefer questions about central ideas over trivia.
+
+Return valid JSON with this exact structure:
+
+{{
+  "title": "A concise quiz title based on the topic of the video.",
+  "description": "A summary of the video in no more than 150 characters, without quiz questions or answers.",
+  "selected": [0, 3, 5]
+}}
+
+"selected" must contain exactly {num_questions} distinct candidate numbers.
+The output must be valid JSON and parsable as-is. Do NOT include markdown fences or explanations.
+
+Candidates:
+{listing}
+""".strip()
+
+def _question_key(question: dict) -> frozenset:
+    return frozenset(re.findall(r'\w+', question['question_title'].lower()))
+
+def dedupe_questions(questions: list[dict], threshold: float = 0.8) -> list[dict]:
+    '''Drop questions whose title words overlap an earlier question's by at least `threshold` (Jaccard).'''
+
+    kept, keys = [], []
+    for question in questions:
+        key = _question_key(question)
+        if any(len(key & other) / max(len(key | other), 1) >= threshold for other in keys):
+            continue
+        kept.append(question)
+        keys.append(key)
+    return kept
+
+def interleave(groups: list[list[dict]]) -> list[dict]:
+    '''Round-robin merge of per-chunk lists, so early indices cover the whole video.'''
+
+    merged = []
+    for i in range(max((len(g) for g in groups), default=0)):
+        merged.extend(g[i] for g in groups if i < len(g))
+    return merged
+
+def select_questions(candidates: list[dict], selected, num_questions: int) -> list[dict]:
+    '''Return exactly `num_questions` candidates: the valid selected indices first, then the rest in order.'''
+
+    chosen: list[int] = []
+    for index in selected if isinstance(selected, list) else []:
+        if isinstance(index, int) and 0 <= index < len(candidates) and index not in chosen:
+            chosen.append(index)
+    chosen += [i for i in range(len(candidates)) if i not in chosen]
+    return [candidates[i] for i in chosen[:num_questions]]
+
+def template_fingerprint(num_questions: int) -> str:
+    '''Stable text of the map and reduce prompt templates, for prompt versioning.'''
+
+    sample = {'question_title': '{question}', 'question_options': [], 'answer': '{answer}'}
+    return build_map_prompt('{chunk}', 0, 0, 0) + '\n' + build_reduce_prompt([sample], num_questions) + json.dumps(
+        {'budget': getattr(settings, 'QUIZ_PROMPT_TOKEN_BUDGET', 12000),
+         'chunk': getattr(settings, 'QUIZ_MAP_CHUNK_TOKENS', 6000)},
+    )
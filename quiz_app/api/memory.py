@@ -0,0 +1,82 @@
+'''Process memory reporting and copy-on-write preparation for forked workers.
+
+With several web workers per host, every worker that loads Whisper holds its
+own copy of the weights. When WHISPER_SHARE_WEIGHTS is set, the model is
+loaded once in the gunicorn master before it forks (see gunicorn.conf.py),
+and workers share those pages:
+
+- 'fork': rely on copy-on-write. Tensor data lives in its own allocations
+  that inference never writes, so those pages stay shared. gc.freeze()
+  moves the master's objects out of the collector's generations, so the
+  workers' garbage collections do not touch (and copy) their pages.
+- 'shm': additionally move the weights into shared memory
+  (`model.share_memory()`), so they stay shared even if a page is written.
+
+process_memory() reads RSS and PSS from /proc: RSS counts shared pages in
+every worker, while PSS splits them between the processes that share them.
+So the saving shows up as a PSS well below RSS. Each worker logs both at
+startup.
+'''
+
+import gc, logging, os, resource
+
+logger = logging.getLogger(__name__)
+
+SHARE_MODES = ('fork', 'shm')
+
+def _proc_fields(path: str, names: tuple[str, ...]) -> dict[str, int]:
+    '''Read "Name:  123 kB" lines from a /proc file, in bytes.'''
+
+    values = {}
+    try:
+        with open(path, encoding='ascii') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in names:
+                    values[name] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+def process_memory(pid: int | str = 'self') -> dict[str, int]:
+    '''Return memory figures of a process in bytes.
+
+    Keys: 'rss' (resident), 'pss' (proportional share), 'shared' (clean and
+    dirty pages shared with other processes) and 'private'. Only 'rss' is
+    available where /proc is missing (then from getrusage, as peak RSS).
+    '''
+
+    status = _proc_fields(f"/proc/{pid}/status", ('VmRSS',))
+    rollup = _proc_fields(f"/proc/{pid}/smaps_rollup",
+                          ('Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'))
+    if 'VmRSS' not in status:
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    memory = {'rss': status['VmRSS']}
+    if rollup:
+        memory.update(
+            pss=rollup.get('Pss', 0),
+            shared=rollup.get('Shared_Clean', 0) + rollup.get('Shared_Dirty', 0),
+            private=rollup.get('Private_Clean', 0) + rollup.get('Private_Dirty', 0),
+        )
+    return memory
+
+def format_memory(memory: dict[str, int]) -> str:
+    '''Render process_memory() as "rss=812.3MiB pss=301.0MiB ...".'''
+
+    return ' '.join(f"{key}={value / 2 ** 20:.1f}MiB" for key, value in memory.items())
+
+def log_memory(context: str) -> dict[str, int]:
+    '''Log this process's memory figures with a context label and return them.'''
+
+    memory = process_memory()
+    logger.info('%s pid=%s %s', context, os.getpid(), format_memory(memory))
+    return memory
+
+def freeze_for_fork():
+    '''Collect garbage, then exclude all surviving objects from future collections.
+
+    Call in the master after preloading and before forking workers.
+    '''
+
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,176 @@
+'''In-process pipeline metrics with a Prometheus-style text exposition.
+
+Each pipeline stage (probe, captions, download, ffmpeg, whisper, gemini,
+json_repair, persist) is timed with `stage_timer()`, which records a
+duration histogram and an outcome counter labelled by stage (and model where
+relevant). Counters track bytes downloaded, audio seconds, transcript
+characters and retries, so real-time factor and p95 stage latency per Whisper
+model can be derived from the exposed series.
+
+Quiz jobs run in separate worker processes, so each process periodically
+saves a snapshot of its registry to the MetricsSnapshot table
+(`publish_snapshot()`); the metrics endpoint renders the local registry
+merged with all recent snapshots.
+'''
+
+import contextlib, json, threading, time
+from datetime import timedelta
+
+from django.utils import timezone
+
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4)
+
+HELP = {
+    'quiz_stage_duration_seconds': 'Wall-clock duration of pipeline stages.',
+    'quiz_stage_total': 'Pipeline stage executions by outcome.',
+    'quiz_download_bytes_total': 'Audio bytes downloaded from YouTube.',
+    'quiz_audio_seconds_total': 'Seconds of audio transcribed by Whisper.',
+    'quiz_transcript_chars_total': 'Characters of transcript produced, by source.',
+    'quiz_retries_total': 'Retried operations, by operation.',
+    'quiz_breaker_opened_total': 'Circuit breaker trips, by dependency.',
+    'quiz_breaker_rejected_total': 'Calls rejected by an open circuit breaker, by dependency.',
+    'quiz_jobs_deferred_total': 'Jobs requeued because a dependency was unavailable.',
+    'quiz_gemini_hedges_total': 'Hedged Gemini quiz requests, by outcome (sent, capped, hedge_won, primary_won).',
+    'quiz_repaired_questions_total': 'Generated questions replaced by a targeted repair call.',
+    'quiz_pipeline_busy_seconds': 'Time items spent being processed in a staged-pipeline stage.',
+    'quiz_pipeline_wait_seconds': 'Time items waited in the queue in front of a staged-pipeline stage.',
+    'quiz_pipeline_pool_restarts_total': 'Process pools of a staged-pipeline stage rebuilt after a child process died.',
+    'quiz_whisper_rtf': 'Whisper real-time factor (processing seconds per audio second).',
+}
+
+_lock = threading.Lock()
+_counters: dict[str, dict[str, float]] = {}
+_histograms: dict[str, dict[str, dict]] = {}
+_buckets: dict[str, tuple] = {'quiz_whisper_rtf': RTF_BUCKETS}
+
+def _labels_key(labels: dict) -> str:
+    return json.dumps({k: str(v) for k, v in sorted(labels.items())}, separators=(',', ':'))
+
+def inc(name: str, value: float = 1, **labels):
+    '''Add `value` to the counter `name` with the given labels.'''
+
+    key = _labels_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+def observe(name: str, value: float, **labels):
+    '''Record one observation in the histogram `name`.'''
+
+    buckets = _buckets.get(name, DEFAULT_BUCKETS)
+    key = _labels_key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        h = series.setdefault(key, {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                h['buckets'][i] += 1
+        h['sum'] += value
+        h['count'] += 1
+
+def histogram_mean(name: str, **labels) -> tuple[float, int]:
+    '''Mean and count of this process's `name` observations whose labels include `labels`.'''
+
+    wanted = {k: str(v) for k, v in labels.items()}
+    total, count = 0.0, 0
+    with _lock:
+        for key, h in _histograms.get(name, {}).items():
+            series = json.loads(key)
+            if all(series.get(k) == v for k, v in wanted.items()):
+                total += h['sum']
+                count += h['count']
+    return (total / count if count else 0.0), count
+
+@contextlib.contextmanager
+def stage_timer(stage: str, **labels):
+    '''Time a pipeline stage and count its outcome ('ok' or 'error').'''
+
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        observe('quiz_stage_duration_seconds', elapsed, stage=stage, outcome=outcome, **labels)
+        inc('quiz_stage_total', stage=stage, outcome=outcome, **labels)
+
+def snapshot() -> dict:
+    '''Return a JSON-serializable copy of the registry.'''
+
+    with _lock:
+        return json.loads(json.dumps({'counters': _counters, 'histograms': _histograms}))
+
+def reset():
+    '''Clear all metrics (used by tests).'''
+
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def _merge(into: dict, other: dict):
+    for name, series in other.get('counters', {}).items():
+        target = into['counters'].setdefault(name, {})
+        for key, value in series.items():
+            target[key] = target.get(key, 0) + value
+    for name, series in other.get('histograms', {}).items():
+        target = into['histograms'].setdefault(name, {})
+        for key, h in series.items():
+            t = target.setdefault(key, {'buckets': [0] * len(h['buckets']), 'sum': 0.0, 'count': 0})
+            t['buckets'] = [a + b for a, b in zip(t['buckets'], h['buckets'])]
+            t['sum'] += h['sum']
+            t['count'] += h['count']
+
+def publish_snapshot(process_id: str):
+    '''Save this process's registry so other processes can expose it.'''
+
+    from ..models import MetricsSnapshot
+    MetricsSnapshot.objects.update_or_create(process_id=process_id, defaults={'payload': snapshot()})
+
+def collect(include_snapshots: bool = True, max_age: timedelta = timedelta(days=1)) -> dict:
+    '''Merge the local registry with recent snapshots from other processes.'''
+
+    merged = {'counters': {}, 'histograms': {}}
+    _merge(merged, snapshot())
+    if include_snapshots:
+        from ..models import MetricsSnapshot
+        recent = MetricsSnapshot.objects.filter(updated_at__gte=timezone.now() - max_age)
+        for snap in recent:
+            _merge(merged, snap.payload)
+    return merged
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(key: str, extra: dict | None = None) -> str:
+    labels = json.loads(key)
+    labels.update(extra or {})
+    if not labels:
+        return ''
+    body = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return '{' + body + '}'
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def render_prometheus(data: dict) -> str:
+    '''Render merged metrics in the Prometheus text exposition format.'''
+
+    lines: list[str] = []
+    for name, series in sorted(data['counters'].items()):
+        lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} counter"]
+        for key, value in sorted(series.items()):
+            lines.append(f"{name}{_format_labels(key)} {_fmt(value)}")
+    for name, series in sorted(data['histograms'].items()):
+        buckets = _buckets.get(name, DEFAULT_BUCKETS)
+        lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+        for key, h in sorted(series.items()):
+            for bound, count in zip(buckets, h['buckets']):
+                lines.append(f"{name}_bucket{_format_labels(key, {'le': _fmt(bound)})} {count}")
+            lines.append(f"{name}_bucket{_format_labels(key, {'le': '+Inf'})} {h['count']}")
+            lines.append(f"{name}_sum{_format_labels(key)} {_fmt(h['sum'])}")
+            lines.append(f"{name}_count{_format_labels(key)} {h['count']}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,283 @@
+'''Staged pipeline executor: per-stage worker pools joined by bounded queues.
+
+The quiz pipeline mixes very different workloads: downloads wait on the
+network, Whisper needs CPU and memory, and Gemini waits on a remote service.
+Running them one after another on a single thread leaves cores idle during
+downloads and blocks LLM calls behind transcriptions. Pipeline gives every
+stage its own pool instead:
+
+- Thread stages run `func(item)` on `workers` threads (I/O-bound work).
+- Process stages run `func(*select(item))` in a spawn process pool of
+  `workers` processes (CPU-bound work such as Whisper). Only the selected
+  arguments and the result cross the process boundary, so children never
+  need Django; `merge(item, result)` applies the result in the parent.
+  A `driver(item, submit)` can replace select/merge when the parent has
+  work around the child call (cache lookups, coalescing): it runs in the
+  stage thread and calls `submit(*args)` for each call into the pool.
+  When a child dies (e.g. killed for using too much memory) the pool is
+  broken for every later task, so it is rebuilt and the task is run again
+  once on the new pool; a task that breaks the pool twice fails.
+- Stages are joined by queues of configurable size. A full queue blocks
+  the stage before it, so a fast stage cannot run ahead of a slow one and
+  items are only taken from the source while there is room.
+
+Outcomes per item: 'ok' after the last stage, 'skipped' when a stage raises
+Skip, 'failed' when a stage raises, 'interrupted' when the run was asked to
+stop before the item's next stage started. Busy and queue-wait times per
+stage are recorded in the metrics registry.
+'''
+
+import multiprocessing, queue, threading, time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.db import connection
+
+from .metrics import inc, observe
+
+STATUS_OK = 'ok'
+STATUS_SKIPPED = 'skipped'
+STATUS_FAILED = 'failed'
+STATUS_INTERRUPTED = 'interrupted'
+
+_DONE = object()
+_PUT_TIMEOUT_SEC = 0.2
+_POOL_RETRIES = 1
+
+class Skip(Exception):
+    '''Raised by a stage to finish an item early without an error.'''
+
+class Task:
+    '''An item travelling through the pipeline, with its outcome and timings.'''
+
+    def __init__(self, item):
+        self.item = item
+        self.status = ''
+        self.error = ''
+        self.exception: BaseException | None = None
+        self.timings: dict[str, float] = {}
+        self.waits: dict[str, float] = {}
+        self._queued_at = time.perf_counter()
+
+class Stage:
+    '''One pipeline stage.
+
+    Args:
+        name: Stage name used in reports and metrics.
+        func: Work function. Thread stages call `func(item)`; a non-None
+            return value replaces the item. Process stages call
+            `func(*select(item))` in a child process; it must be a picklable
+            top-level function.
+        workers: Number of threads (or processes) for this stage.
+        processes: Run `func` in a spawn process pool instead of threads.
+        initializer, initargs: Process pool initializer (e.g. load a model).
+        select: Process stages only; returns the argument tuple for `func`,
+            or None to pass the item on without a process call.
+        merge: Process stages only; `merge(item, result)` stores the result.
+        driver: Process stages only, instead of select/merge;
+            `driver(item, submit)` runs in the stage thread, where
+            `submit(*args)` returns `func(*args)` computed in the pool.
+    '''
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, processes: bool = False,
+                 initializer: Callable | None = None, initargs: tuple = (),
+                 select: Callable | None = None, merge: Callable | None = None, driver: Callable | None = None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self.select = select or (lambda item: (item,))
+        self.merge = merge or (lambda item, result: None)
+        self.driver = driver or self._select_and_merge
+
+    def _select_and_merge(self, item, submit: Callable):
+        args = self.select(item)
+        if args is not None:
+            self.merge(item, submit(*args))
+
+class _StagePool:
+    '''The process pool of one stage, replaced when a child process dies.'''
+
+    def __init__(self, stage: Stage):
+        self.stage = stage
+        self._lock = threading.Lock()
+        self._executor = self._create()
+
+    def _create(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.stage.workers, mp_context=multiprocessing.get_context('spawn'),
+            initializer=self.stage.initializer, initargs=self.stage.initargs,
+        )
+
+    def _replace(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._create()
+                inc('quiz_pipeline_pool_restarts_total', stage=self.stage.name)
+
+    def run(self, *args):
+        '''Run the stage function with `args` in a child; retry on a fresh pool if the pool broke.'''
+
+        for attempt in range(_POOL_RETRIES + 1):
+            executor = self._executor
+            try:
+                return executor.submit(self.stage.func, *args).result()
+            except BrokenProcessPool:
+                self._replace(executor)
+                if attempt == _POOL_RETRIES:
+                    raise
+
+    def shutdown(self):
+        with self._lock:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+class PipelineReport:
+    '''Tasks handled by one Pipeline.run() call, with busy time per stage.'''
+
+    def __init__(self, tasks: list[Task], elapsed: float, workers: dict[str, int]):
+        self.tasks = tasks
+        self.elapsed = elapsed
+        self.workers = workers
+
+    def count(self, status: str) -> int:
+        return sum(1 for task in self.tasks if task.status == status)
+
+    def busy(self, stage: str) -> float:
+        return sum(task.timings.get(stage, 0.0) for task in self.tasks)
+
+    def utilization(self, stage: str) -> float:
+        return self.busy(stage) / max(self.elapsed * self.workers[stage], 1e-9)
+
+class Pipeline:
+    '''Run items through a sequence of stages with bounded queues between them.'''
+
+    def __init__(self, stages: list[Stage], queue_size: int = 2):
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+
+    def run(self, items: Iterable, on_done: Callable[[Task], None] | None = None,
+            should_stop: Callable[[], bool] = lambda: False) -> PipelineReport:
+        '''Feed `items` through all stages and wait until every item is finished.
+
+        Args:
+            items: Any iterable; it is consumed lazily, and only while the first
+                queue has room.
+            on_done: Called with each finished Task (from a worker thread).
+            should_stop: Polled between items; once true no new items are
+                taken and queued items are finished as 'interrupted'.
+
+        Returns:
+            A PipelineReport for the items that were taken from `items`.
+        '''
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        tasks: list[Task] = []
+        lock = threading.Lock()
+        pools = {stage.name: _StagePool(stage) for stage in self.stages if stage.processes}
+
+        def finish(task: Task):
+            with lock:
+                tasks.append(task)
+            if on_done is not None:
+                on_done(task)
+
+        def put(q: queue.Queue, value) -> bool:
+            while True:
+                try:
+                    q.put(value, timeout=_PUT_TIMEOUT_SEC)
+                    return True
+                except queue.Full:
+                    if value is not _DONE and should_stop():
+                        return False
+
+        def close(index: int):
+            for _ in range(self.stages[index].workers):
+                queues[index].put(_DONE)
+
+        def feed():
+            try:
+                for item in items:
+                    task = Task(item)
+                    if should_stop() or not put(queues[0], task):
+                        task.status = STATUS_INTERRUPTED
+                        finish(task)
+                        break
+            finally:
+                connection.close()
+                close(0)
+
+        remaining = [stage.workers for stage in self.stages]
+
+        def work(index: int):
+            stage = self.stages[index]
+            inbox = queues[index]
+            last_stage = index + 1 == len(self.stages)
+            try:
+                while True:
+                    task = inbox.get()
+                    if task is _DONE:
+                        break
+                    task.waits[stage.name] = time.perf_counter() - task._queued_at
+                    observe('quiz_pipeline_wait_seconds', task.waits[stage.name], stage=stage.name)
+                    if should_stop():
+                        task.status = STATUS_INTERRUPTED
+                        finish(task)
+                        continue
+                    self._run_stage(stage, task, pools.get(stage.name))
+                    if task.status:
+                        finish(task)
+                    elif last_stage:
+                        task.status = STATUS_OK
+                        finish(task)
+                    else:
+                        task._queued_at = time.perf_counter()
+                        if not put(queues[index + 1], task):
+                            task.status = STATUS_INTERRUPTED
+                            finish(task)
+            finally:
+                connection.close()
+                with lock:
+                    remaining[index] -= 1
+                    closing = remaining[index] == 0
+                if closing and not last_stage:
+                    close(index + 1)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=feed, name='pipeline-feed', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads += [
+                threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        finally:
+            for pool in pools.values():
+                pool.shutdown()
+        return PipelineReport(tasks, time.perf_counter() - started, {s.name: s.workers for s in self.stages})
+
+    @staticmethod
+    def _run_stage(stage: Stage, task: Task, pool: _StagePool | None):
+        started = time.perf_counter()
+        try:
+            if pool is None:
+                result = stage.func(task.item)
+                if result is not None:
+                    task.item = result
+            else:
+                stage.driver(task.item, pool.run)
+        except Skip as e:
+            task.status, task.error = STATUS_SKIPPED, str(e)
+        except Exception as e:
+            task.status, task.error, task.exception = STATUS_FAILED, str(e), e
+        finally:
+            task.timings[stage.name] = time.perf_counter() - started
+            observe('quiz_pipeline_busy_seconds', task.timings[stage.name], stage=stage.name)
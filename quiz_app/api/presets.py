@@ -0,0 +1,151 @@
+'''Transcription presets: Whisper model and decoding options by video duration.
+
+A preset maps the video duration (from the yt-dlp metadata) to a Whisper
+model and decoding options. Longer videos get smaller models and cheaper
+decoding, so processing time stays predictable:
+
+- fast: greedy decoding, no temperature fallback, no conditioning on the
+  previous window (avoids repetition loops); 'base' up to 10 minutes,
+  'tiny' beyond.
+- balanced: greedy with a short temperature fallback; 'small' up to 30
+  minutes, 'base' beyond.
+- accurate: beam search (5 beams) with the full temperature fallback and
+  conditioning on previous text; 'medium' up to 15 minutes, 'small' beyond.
+- auto: the most accurate of the above whose estimated Whisper time
+  (duration × real-time factor of its model) fits QUIZ_LATENCY_TARGET_SEC.
+  Real-time factors are the averages observed in this process
+  (quiz_whisper_rtf), or DEFAULT_RTF until enough runs were seen.
+
+All presets decode in fp32 (`fp16=False`): the workers are CPU-only, where
+Whisper would only try fp16, warn and fall back.
+
+Selection (see preset_for()): the preset named in the request, else the
+first group of the user listed in QUIZ_GROUP_PRESETS (per-tenant default),
+else QUIZ_DEFAULT_PRESET. An empty name keeps the legacy behaviour:
+WHISPER_MODEL with Whisper's default decoding.
+
+The chosen Decoding is activated for the current thread with use_decoding();
+services.whisper_model_name() and services.whisper_options() read it.
+'''
+
+import contextlib, contextvars
+
+from django.conf import settings
+
+from .metrics import histogram_mean
+
+_FP32 = {'fp16': False}
+FALLBACK = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+PRESETS: dict[str, list[tuple[float | None, str, dict]]] = {
+    'fast': [
+        (600, 'base', {**_FP32, 'temperature': 0.0, 'condition_on_previous_text': False}),
+        (None, 'tiny', {**_FP32, 'temperature': 0.0, 'condition_on_previous_text': False}),
+    ],
+    'balanced': [
+        (1800, 'small', {**_FP32, 'temperature': (0.0, 0.4, 0.8), 'condition_on_previous_text': False}),
+        (None, 'base', {**_FP32, 'temperature': (0.0, 0.4, 0.8), 'condition_on_previous_text': False}),
+    ],
+    'accurate': [
+        (900, 'medium', {**_FP32, 'beam_size': 5, 'best_of': 5, 'temperature': FALLBACK,
+                         'condition_on_previous_text': True}),
+        (None, 'small', {**_FP32, 'beam_size': 5, 'best_of': 5, 'temperature': FALLBACK,
+                         'condition_on_previous_text': True}),
+    ],
+}
+AUTO = 'auto'
+PRESET_NAMES = (*PRESETS, AUTO)
+
+DEFAULT_RTF = {'tiny': 0.05, 'base': 0.1, 'small': 0.3, 'medium': 0.8, 'large': 1.6}
+_MIN_OBSERVATIONS = 5
+
+class Decoding:
+    '''The Whisper model and `transcribe()` options chosen for one video.'''
+
+    def __init__(self, preset: str, model: str, options: dict):
+        self.preset = preset
+        self.model = model
+        self.options = options
+
+    def __repr__(self) -> str:
+        return f"Decoding({self.preset!r}, {self.model!r})"
+
+_current: contextvars.ContextVar[Decoding | None] = contextvars.ContextVar('quiz_decoding', default=None)
+
+def validate_preset(name: str | None) -> str:
+    '''Return the preset name, or '' for none.
+
+    Raises:
+        ValueError: If the name is not a known preset.
+    '''
+
+    name = (name or '').strip().lower()
+    if name and name not in PRESET_NAMES:
+        raise ValueError(f"Unknown preset {name!r} (choose from {', '.join(PRESET_NAMES)}).")
+    return name
+
+def _group_presets() -> dict[str, str]:
+    return dict(getattr(settings, 'QUIZ_GROUP_PRESETS', {}) or {})
+
+def preset_for(user, requested: str | None = None) -> str:
+    '''Pick the preset for a request: explicit name, the user's group default, or QUIZ_DEFAULT_PRESET.
+
+    Raises:
+        ValueError: If the requested preset is unknown.
+    '''
+
+    name = validate_preset(requested)
+    if name:
+        return name
+    by_group = _group_presets()
+    if by_group and user is not None and getattr(user, 'pk', None):
+        for group in user.groups.order_by('name').values_list('name', flat=True):
+            if group in by_group:
+                return validate_preset(by_group[group])
+    return validate_preset(getattr(settings, 'QUIZ_DEFAULT_PRESET', ''))
+
+def _tier(preset: str, duration: float) -> tuple[str, dict]:
+    for max_duration, model, options in PRESETS[preset]:
+        if max_duration is None or duration <= max_duration:
+            return model, options
+    raise AssertionError(f"Preset {preset} has no open-ended tier.")
+
+def estimated_rtf(model: str) -> float:
+    '''Real-time factor of `model`: observed average, or DEFAULT_RTF until enough runs.'''
+
+    mean, count = histogram_mean('quiz_whisper_rtf', model=model)
+    if count >= _MIN_OBSERVATIONS:
+        return mean
+    return DEFAULT_RTF.get(model, 1.0)
+
+def resolve(preset: str, duration: float | None) -> Decoding | None:
+    '''Return the Decoding for a preset and video duration (None for no preset).'''
+
+    preset = validate_preset(preset)
+    if not preset:
+        return None
+    duration = float(duration or 0)
+    if preset == AUTO:
+        target = float(getattr(settings, 'QUIZ_LATENCY_TARGET_SEC', 300))
+        for candidate in ('accurate', 'balanced', 'fast'):
+            model, options = _tier(candidate, duration)
+            if duration * estimated_rtf(model) <= target:
+                return Decoding(candidate, model, dict(options))
+        preset = 'fast'
+    model, options = _tier(preset, duration)
+    return Decoding(preset, model, dict(options))
+
+@contextlib.contextmanager
+def use_decoding(decoding: Decoding | None):
+    '''Make `decoding` the active choice in this thread (None keeps the defaults).'''
+
+    token = _current.set(decoding)
+    try:
+        yield decoding
+    finally:
+        _current.reset(token)
+
+def current() -> Decoding | None:
+    '''Return the Decoding activated with use_decoding(), if any.'''
+
+    return _current.get()
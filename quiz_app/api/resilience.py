@@ -0,0 +1,227 @@
+'''Retries and circuit breakers around external dependencies (Gemini, YouTube).
+
+Calls to Gemini and yt-dlp go through `call()` / `acall()` with a dependency
+name ('gemini' or 'youtube'):
+
+- Transient errors (HTTP 408/429/5xx, timeouts, dropped connections) are
+  retried up to QUIZ_RETRY_ATTEMPTS times with jittered exponential backoff
+  (tenacity's `wait_random_exponential`, base QUIZ_RETRY_BACKOFF_SEC, capped
+  at QUIZ_RETRY_MAX_WAIT_SEC). Other errors (invalid video, bad JSON, 4xx)
+  are raised at once.
+- Each dependency has a circuit breaker. QUIZ_BREAKER_FAILURES calls that
+  failed transiently within QUIZ_BREAKER_WINDOW_SEC open it; while it is
+  open, calls fail fast with DependencyUnavailable instead of waiting for
+  their timeouts. After QUIZ_BREAKER_COOLDOWN_SEC a single trial call is let
+  through: success closes the breaker, failure opens it again. A
+  non-transient error counts as success only if the dependency answered
+  (e.g. HTTP 400, "video unavailable"); other errors (a cancelled job, a bug
+  in our code) leave the breaker as it is.
+- A call whose retries are exhausted also raises DependencyUnavailable.
+
+DependencyUnavailable is a ValueError with `retry_after` seconds: the API
+answers 503 with a Retry-After header, and background jobs are requeued for
+after the cooldown without using up an attempt (see jobs.py).
+
+Breaker state lives in Django's cache, so it is shared by every process that
+uses the same cache backend. With the default per-process local-memory
+cache, each worker trips its own breaker; configure Redis or Memcached to
+share it.
+'''
+
+import time
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from google.genai import errors as genai_errors
+from tenacity import AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+from yt_dlp.networking.exceptions import HTTPError as YtHTTPError, TransportError as YtTransportError
+from yt_dlp.utils import ExtractorError
+
+from .metrics import inc
+
+DEPENDENCY_NAMES = {'gemini': 'Gemini', 'youtube': 'YouTube'}
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+class DependencyUnavailable(ValueError):
+    '''An external dependency is down (breaker open or retries exhausted).
+
+    Args:
+        dependency: 'gemini' or 'youtube'.
+        retry_after: Seconds until a new attempt makes sense.
+    '''
+
+    def __init__(self, dependency: str, retry_after: float):
+        self.dependency = dependency
+        self.retry_after = max(1, int(round(retry_after)))
+        name = DEPENDENCY_NAMES.get(dependency, dependency)
+        super().__init__(f"{name} is temporarily unavailable. Please try again in {self.retry_after} seconds.")
+
+def _cooldown() -> float:
+    return float(getattr(settings, 'QUIZ_BREAKER_COOLDOWN_SEC', 30))
+
+def _status(error: BaseException) -> int | None:
+    for attr in ('status', 'code'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+def _chain(error: BaseException):
+    '''The error and everything it wraps (yt-dlp keeps causes in exc_info / cause).'''
+
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen or not isinstance(current, BaseException):
+            continue
+        seen.add(id(current))
+        yield current
+        exc_info = getattr(current, 'exc_info', None)
+        pending += [current.__cause__, current.__context__, getattr(current, 'cause', None),
+                    exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None]
+
+def is_transient(error: BaseException) -> bool:
+    '''Whether `error` (or an error it wraps) is worth retrying.'''
+
+    if isinstance(error, DependencyUnavailable):
+        return False
+    for e in _chain(error):
+        if isinstance(e, (genai_errors.APIError, YtHTTPError)):
+            return _status(e) in TRANSIENT_STATUS
+        if isinstance(e, (httpx.TransportError, YtTransportError, ConnectionError, TimeoutError)):
+            return True
+    return False
+
+def is_response(error: BaseException) -> bool:
+    '''Whether `error` (or an error it wraps) is an answer of the dependency, such as an HTTP error status.'''
+
+    return any(isinstance(e, (genai_errors.APIError, YtHTTPError, ExtractorError)) for e in _chain(error))
+
+class CircuitBreaker:
+    '''Failure counter and open/half-open state of one dependency, kept in Django's cache.
+
+    Args:
+        dependency: Name of the dependency ('gemini', 'youtube').
+    '''
+
+    def __init__(self, dependency: str):
+        self.dependency = dependency
+        self._failures_key = f"quiz:breaker:{dependency}:failures"
+        self._open_key = f"quiz:breaker:{dependency}:open_until"
+        self._trial_key = f"quiz:breaker:{dependency}:trial"
+
+    def retry_after(self) -> float:
+        '''Seconds until the breaker lets a trial call through (0 when closed).'''
+
+        open_until = cache.get(self._open_key)
+        return max(0.0, open_until - time.time()) if open_until else 0.0
+
+    def is_open(self) -> bool:
+        return self.retry_after() > 0
+
+    def before_call(self):
+        '''Reject the call while open; after the cooldown, admit one trial call.
+
+        Raises:
+            DependencyUnavailable: If the breaker is open, or another caller
+                is already making the trial call.
+        '''
+
+        open_until = cache.get(self._open_key)
+        if open_until is None:
+            return
+        remaining = open_until - time.time()
+        if remaining > 0 or not cache.add(self._trial_key, 1, timeout=_cooldown()):
+            inc('quiz_breaker_rejected_total', dependency=self.dependency)
+            raise DependencyUnavailable(self.dependency, remaining if remaining > 0 else _cooldown())
+
+    def record_success(self):
+        '''The dependency answered: close the breaker.'''
+
+        if cache.get(self._open_key) is not None or cache.get(self._failures_key):
+            cache.delete_many([self._failures_key, self._open_key, self._trial_key])
+
+    def release_trial(self):
+        '''A trial call ended without an answer from the dependency: let the next caller try.'''
+
+        cache.delete(self._trial_key)
+
+    def record_failure(self):
+        '''Count a transient failure; open the breaker at the threshold or after a failed trial.'''
+
+        window = float(getattr(settings, 'QUIZ_BREAKER_WINDOW_SEC', 60))
+        cache.add(self._failures_key, 0, timeout=window)
+        try:
+            failures = cache.incr(self._failures_key)
+        except ValueError:
+            cache.set(self._failures_key, 1, timeout=window)
+            failures = 1
+        half_open = cache.get(self._open_key) is not None
+        if half_open or failures >= int(getattr(settings, 'QUIZ_BREAKER_FAILURES', 5)):
+            cache.set(self._open_key, time.time() + _cooldown(), timeout=None)
+            cache.delete(self._trial_key)
+            inc('quiz_breaker_opened_total', dependency=self.dependency)
+
+def _retry_options(breaker: CircuitBreaker) -> dict:
+    def log_retry(state):
+        inc('quiz_retries_total', operation=breaker.dependency)
+
+    backoff = float(getattr(settings, 'QUIZ_RETRY_BACKOFF_SEC', 1.0))
+    return {
+        'stop': stop_after_attempt(max(1, int(getattr(settings, 'QUIZ_RETRY_ATTEMPTS', 3))))
+                | (lambda state: breaker.is_open()),
+        'wait': wait_random_exponential(multiplier=backoff, max=float(getattr(settings, 'QUIZ_RETRY_MAX_WAIT_SEC', 10))),
+        'retry': retry_if_exception(is_transient),
+        'before_sleep': log_retry,
+        'reraise': True,
+    }
+
+def _failed(breaker: CircuitBreaker, error: Exception):
+    '''Update the breaker for a failed call; turn exhausted transient errors into DependencyUnavailable.'''
+
+    if not is_transient(error):
+        if is_response(error) and not isinstance(error, DependencyUnavailable):
+            breaker.record_success()
+        else:
+            breaker.release_trial()
+        return
+    breaker.record_failure()
+    raise DependencyUnavailable(breaker.dependency, breaker.retry_after() or _cooldown()) from error
+
+def call(dependency: str, fn, *args, **kwargs):
+    '''Call `fn(*args, **kwargs)` with retries, guarded by the dependency's circuit breaker.
+
+    Returns:
+        Whatever `fn` returns.
+
+    Raises:
+        DependencyUnavailable: If the breaker is open or transient errors
+            persisted through all retries.
+        Exception: Non-transient errors of `fn`, unchanged.
+    '''
+
+    breaker = CircuitBreaker(dependency)
+    breaker.before_call()
+    try:
+        result = Retrying(**_retry_options(breaker))(fn, *args, **kwargs)
+    except Exception as e:
+        _failed(breaker, e)
+        raise
+    breaker.record_success()
+    return result
+
+async def acall(dependency: str, fn, *args, **kwargs):
+    '''Async variant of call() for coroutine functions.'''
+
+    breaker = CircuitBreaker(dependency)
+    breaker.before_call()
+    try:
+        result = await AsyncRetrying(**_retry_options(breaker))(fn, *args, **kwargs)
+    except Exception as e:
+        _failed(breaker, e)
+        raise
+    breaker.record_success()
+    return result
@@ -0,0 +1,54 @@
+'''Response schemas for Gemini structured output (JSON mode).
+
+The schemas mirror services.validate_quiz_dict(): a title, a description and
+exactly `num_questions` questions, each with a title, exactly four options
+and an answer. Gemini's schema subset cannot express "the options are
+distinct" or "the answer is one of the options", so responses are still
+validated and only the offending questions are regenerated (see
+services.arepair_quiz()).
+'''
+
+QUESTION_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'question_title': {'type': 'STRING'},
+        'question_options': {'type': 'ARRAY', 'items': {'type': 'STRING'}, 'min_items': 4, 'max_items': 4},
+        'answer': {'type': 'STRING'},
+    },
+    'required': ['question_title', 'question_options', 'answer'],
+    'property_ordering': ['question_title', 'question_options', 'answer'],
+}
+
+def questions_schema(count: int | None = None) -> dict:
+    '''Schema for `{"questions": [...]}`, optionally with exactly `count` items.'''
+
+    questions = {'type': 'ARRAY', 'items': QUESTION_SCHEMA}
+    if count is not None:
+        questions.update(min_items=count, max_items=count)
+    return {'type': 'OBJECT', 'properties': {'questions': questions}, 'required': ['questions']}
+
+def quiz_schema(num_questions: int) -> dict:
+    '''Schema for a complete quiz with exactly `num_questions` questions.'''
+
+    schema = questions_schema(num_questions)
+    return {
+        'type': 'OBJECT',
+        'properties': {
+            'title': {'type': 'STRING'},
+            'description': {'type': 'STRING'},
+            'questions': schema['properties']['questions'],
+        },
+        'required': ['title', 'description', 'questions'],
+        'property_ordering': ['title', 'description', 'questions'],
+    }
+
+REDUCE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'title': {'type': 'STRING'},
+        'description': {'type': 'STRING'},
+        'selected': {'type': 'ARRAY', 'items': {'type': 'INTEGER'}},
+    },
+    'required': ['title', 'description', 'selected'],
+    'property_ordering': ['title', 'description', 'selected'],
+}
@@ -5,6 +5,7 @@ Provides:
 - QuizSerializer: quiz with nested questions (used for GET responses).
 - QuizUpdateSerializer: strict full update (PUT) of quiz metadata.
 - QuizPartialUpdateSerializer: partial update (PATCH) of quiz metadata.
+- QuizJobSerializer: read-only status of a background quiz-creation job.
 
 Notes:
 - Question options are stored as a JSON list on the model and serialized as-is.
@@ -13,7 +14,7 @@ Notes:
 '''
 
 from rest_framework import serializers
-from ..models import Quiz, Question
+from ..models import Quiz, Question, QuizJob
 
 class QuestionSerializer(serializers.ModelSerializer):
     '''Serialize a single quiz question.
@@ -94,4 +95,34 @@ class QuizPartialUpdateSerializer(serializers.ModelSerializer):
             vid = extract_youtube_id(value)
         except ValueError:
             raise serializers.ValidationError('Invalid YouTube URL.')
-        return YOUTUBE_CANONICAL.format(vid=vid)
\ No newline at end of file
+        return YOUTUBE_CANONICAL.format(vid=vid)
+
+class QuizJobSerializer(serializers.ModelSerializer):
+    '''Serialize the state of a quiz-creation job.
+
+    Fields:
+        id: Job id (used in GET /api/jobs/<id>/).
+        kind: 'quiz', or 'prefetch' (transcript only, see POST /api/prefetch/).
+        status: queued / running / succeeded / failed / cancelled.
+        stage: Current pipeline stage (probe, download, transcribe, generate,
+            persist, done).
+        progress: Overall progress between 0 and 1.
+        detail: Stage details, e.g. downloaded_bytes/total_bytes,
+            transcribed_sec/audio_sec, or event 'llm_started'/'llm_done'.
+        quiz_id: The created quiz once the job has succeeded, else null.
+        error: Failure message for failed jobs.
+        preset: Transcription preset of the job ('' = default model).
+        skipped_audio_fraction: Share of the audio dropped as non-speech
+            before Whisper (null until transcribed with QUIZ_VAD).
+        downloaded_bytes: Size of the downloaded audio (null until
+            downloaded, and for captions or streamed audio).
+        not_before: When a job requeued during a Gemini or YouTube outage
+            is run again (null otherwise).
+    '''
+
+    quiz_id = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = QuizJob
+        fields = ['id', 'kind', 'status', 'stage', 'progress', 'detail', 'quiz_id', 'error', 'video_url', 'preset', 'skipped_audio_fraction', 'downloaded_bytes', 'not_before', 'created_at', 'updated_at']
+        read_only_fields = fields
@@ -3,30 +3,71 @@
 Responsibilities:
 - Normalize and validate YouTube URLs.
 - Check video availability and (optionally) max duration.
-- Download audio with yt-dlp.
+- Reuse transcripts from the shared transcript cache (see caching.py).
+- Use existing YouTube captions when available (see captions.py).
+- Download audio with yt-dlp, or stream it through ffmpeg (see audio.py).
 - Ensure FFmpeg is available and transcribe audio with Whisper.
-- Build a strict LLM prompt and call Gemini to generate a quiz.
+- Prefetch transcripts ahead of quiz creation (prefetch_transcript()).
+- Resume jobs from per-stage checkpoints (see checkpoints.py).
+- Retry transient yt-dlp and Gemini errors behind per-dependency circuit
+  breakers (see resilience.py).
+- Build a strict LLM prompt (map-reduce over chunks for long transcripts,
+  see mapreduce.py) and call Gemini (shared pooled client, see gemini.py)
+  through the async variant, awaited directly or on the process's
+  background event loop, to generate a quiz; optionally hedged with a
+  second request when the first is slow (see hedging.py).
 - Validate the returned quiz JSON and persist Quiz/Question models.
 
 Error handling contract:
 - Expected, user-facing problems (invalid URL, unavailable video, missing FFmpeg,
   missing GEMINI_API_KEY, invalid LLM JSON, etc.) raise ValueError with a clear
   message. The API view maps ValueError → HTTP 400.
+- An outage of Gemini or YouTube (open circuit breaker, or transient errors
+  that outlast the retries) raises DependencyUnavailable, a ValueError the
+  view maps to HTTP 503 and the job worker requeues.
 - Unexpected failures bubble up as generic exceptions (HTTP 500 in the view).
 
 Dependencies:
 - yt-dlp, FFmpeg (binary on PATH), whisper (OpenAI Whisper), google-genai (Gemini).
 '''
 
-import json, os, re, tempfile, contextlib, pathlib, shutil
+import asyncio, json, logging, os, re, tempfile, contextlib, copy, hashlib, pathlib, shutil, threading, time
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 import yt_dlp
 import whisper
 
 from django.conf import settings
-from google import genai
+from django.db import transaction
+from django.utils import timezone
 from yt_dlp.utils import DownloadError, ExtractorError
 
+from .audio import audio_format_selector, iter_pcm, select_audio_stream
+from .caching import (
+    get_cached_transcript, get_cached_video_info, get_generated_quiz, options_key,
+    store_generated_quiz, store_transcript, store_video_info,
+)
+from . import gemini, hedging
+from .captions import fetch_captions
+from .checkpoints import JobCheckpoints
+from .db import retry_locked
+from .mapreduce import (
+    build_map_prompt, build_reduce_prompt, candidates_per_chunk, count_tokens, dedupe_questions,
+    interleave, select_questions, split_by_tokens, template_fingerprint,
+)
+from .metrics import inc, observe, stage_timer
+from .schemas import REDUCE_SCHEMA, questions_schema, quiz_schema
+from .singleflight import Abandoned, coalesce
+from .transcription import SAMPLE_RATE, iter_chunks, transcribe_chunks, transcribe_parallel, whisper_progress
+from .resilience import DependencyUnavailable, acall as acall_dependency, call as call_dependency
+from .presets import current as current_decoding, resolve as resolve_preset, use_decoding
+from .vad import StreamTrimmer, trim_silence
+from .whisper_models import cache_size, default_backend, torch_threads, use_model
+
+logger = logging.getLogger(__name__)
+
 YOUTUBE_CANONICAL = 'https://www.youtube.com/watch?v={vid}'
+GEMINI_MODEL = 'gemini-2.5-flash'
 
 def extract_youtube_id(url: str) -> str:
     '''Extract a YouTube video ID from common URL forms.
@@ -57,6 +98,56 @@ def extract_youtube_id(url: str) -> str:
 
     raise ValueError('Could not extract YouTube video id.')
 
+class _ProbeLock:
+    '''Per-video probe lock, kept while any caller holds or waits for it.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+_probe_locks: dict[str, _ProbeLock] = {}
+_probe_locks_guard = threading.Lock()
+
+def probe_video(url: str) -> dict:
+    '''Fetch the yt-dlp info dict for a video, using the metadata cache.
+
+    Concurrent probes of the same video within a process wait for a single
+    network round trip; later requests are served from the cache until the
+    TTL expires.
+
+    Args:
+        url: Canonical YouTube watch URL.
+
+    Returns:
+        The sanitized yt-dlp info dict.
+
+    Raises:
+        DownloadError, ExtractorError: If yt-dlp cannot resolve the video.
+        DependencyUnavailable: If YouTube keeps failing transiently or its
+            circuit breaker is open.
+    '''
+
+    vid = extract_youtube_id(url)
+    info = get_cached_video_info(vid)
+    if info is not None:
+        return info
+    with _probe_locks_guard:
+        entry = _probe_locks.setdefault(vid, _ProbeLock())
+        entry.users += 1
+    try:
+        with entry.lock:
+            info = get_cached_video_info(vid)
+            if info is None:
+                with stage_timer('probe'), yt_dlp.YoutubeDL({'quiet': True, 'noplaylist': True}) as ydl:
+                    info = ydl.sanitize_info(call_dependency('youtube', ydl.extract_info, url, download=False))
+                store_video_info(vid, info)
+    finally:
+        with _probe_locks_guard:
+            entry.users -= 1
+            if not entry.users:
+                del _probe_locks[vid]
+    return info
+
 def ensure_video_available(url: str, max_duration_sec: int | None = None):
     '''Check if a YouTube video is available and optionally enforce a max duration.
 
@@ -69,44 +160,79 @@ def ensure_video_available(url: str, max_duration_sec: int | None = None):
 
     Raises:
         ValueError: If the video is unavailable/invalid or exceeds the duration limit.
+        DependencyUnavailable: If YouTube is temporarily unreachable.
     '''
 
     try:
-        with yt_dlp.YoutubeDL({'quiet': True, 'noplaylist': True}) as ydl:
-            info = ydl.extract_info(url, download=False)
+        info = probe_video(url)
         if max_duration_sec and info.get('duration') and info['duration'] > max_duration_sec:
             raise ValueError('Video too long.')
         return info
     except (DownloadError, ExtractorError):
         raise ValueError('YouTube video unavailable or invalid.')
 
-def download_audio(url: str) -> str:
-    '''Download best-available audio stream for a YouTube video.
+def download_audio(url: str, info: dict | None = None, progress=None) -> str:
+    '''Download the smallest adequate audio stream for a YouTube video.
+
+    The format is chosen by pick_audio_format() (smallest audio-only stream
+    with at least QUIZ_AUDIO_MIN_ABR kbit/s) and DASH fragments are fetched
+    in parallel. When the info dict from ensure_video_available() is passed,
+    the download reuses it via `process_ie_result()` instead of resolving the
+    page, player JS and formats a second time. The number of bytes
+    downloaded is logged per video and reported as a 'downloaded' event.
 
     Args:
         url: Any YouTube URL containing a valid video ID (normalized internally).
+        info: Optional yt-dlp info dict from a previous probe of the same video.
+        progress: Optional pipeline progress callback; receives the 'download'
+            stage with the fraction of bytes fetched, then the final
+            `downloaded_bytes`.
 
     Returns:
         Absolute file path to the downloaded audio file.
 
     Raises:
         ValueError: If the download fails or no file is produced.
+        DependencyUnavailable: If YouTube is temporarily unreachable.
     '''
 
+    downloaded: dict[str, int] = {}
+
+    def track_bytes(d):
+        if d.get('status') in ('downloading', 'finished'):
+            done = downloaded[d.get('filename', '')] = d.get('downloaded_bytes') or d.get('total_bytes') or 0
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if progress and total:
+                progress('download', done / total, downloaded_bytes=done, total_bytes=int(total))
+
     try:
         vid = extract_youtube_id(url)
         outtmpl = str((getattr(settings, 'QUIZ_TMP_DIR', pathlib.Path(tempfile.gettempdir())) / f"{vid}.%(ext)s").resolve())
         ydl_opts = {
-            'format': "bestaudio/best",
+            'format': audio_format_selector(float(getattr(settings, 'QUIZ_AUDIO_MIN_ABR', 48))),
+            'concurrent_fragment_downloads': int(getattr(settings, 'QUIZ_DOWNLOAD_FRAGMENT_CONCURRENCY', 4)),
+            'progress_hooks': [track_bytes],
             'outtmpl': outtmpl,
             'quiet': True,
             'noplaylist': True,
         }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(YOUTUBE_CANONICAL.format(vid=vid), download=True)
-            path = ydl.prepare_filename(info)
+        def fetch() -> tuple[dict, str]:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                if info is not None:
+                    result = ydl.process_ie_result(copy.deepcopy(info), download=True)
+                else:
+                    result = ydl.extract_info(YOUTUBE_CANONICAL.format(vid=vid), download=True)
+                return result, ydl.prepare_filename(result)
+
+        with stage_timer('download'):
+            info, path = call_dependency('youtube', fetch)
         if not path or not os.path.exists(path):
             raise ValueError('Audio download failed.')
+        total_bytes = sum(downloaded.values())
+        inc('quiz_download_bytes_total', total_bytes)
+        logger.info('Downloaded audio for %s: format %s, %d bytes', vid, info.get('format_id'), total_bytes)
+        if progress:
+            progress('download', 1.0, event='downloaded', downloaded_bytes=total_bytes)
         return path
     except (DownloadError, ExtractorError) as e:
         raise ValueError('Failed to download audio from Youtube.')
@@ -122,11 +248,23 @@ def _require_ffmpeg():
         raise ValueError('FFmpeg not found. Please install FFmpeg and add it to PATH.')
     return ff
 
-def transcribe_audio(audio_path: str) -> str:
-    '''Transcribe an audio file to text using Whisper.
+def transcribe_audio(audio_path: str | np.ndarray, options: dict | None = None, progress=None) -> str:
+    '''Transcribe an audio file (or decoded 16 kHz PCM) to text using Whisper.
+
+    The model comes from the process-wide registry (see whisper_models), so
+    only the first request in a worker pays for loading the checkpoint, and
+    runs on the configured backend (WHISPER_BACKEND, see whisper_backends).
+    With QUIZ_VAD, silence is dropped first (see vad.py) and the skipped share
+    is reported as a 'vad' progress event. With WHISPER_WORKERS > 1, audio
+    longer than WHISPER_CHUNK_SEC is split into overlapping chunks and
+    transcribed across a process pool.
 
     Args:
-        audio_path: Path to the downloaded audio file.
+        audio_path: Path to the downloaded audio file, or a mono float32
+            PCM array at 16 kHz.
+        options: Extra decoding options passed to `model.transcribe()`.
+        progress: Optional pipeline progress callback; receives the
+            'transcribe' stage with the seconds of audio decoded so far.
 
     Returns:
         The transcribed text (stripped).
@@ -136,19 +274,152 @@ def transcribe_audio(audio_path: str) -> str:
     '''
 
     _require_ffmpeg()
-    model_name = getattr(settings, 'WHISPER_MODEL', 'small')
+    model_name = whisper_model_name()
+    backend = default_backend()
+    workers = int(getattr(settings, 'WHISPER_WORKERS', 1))
+    chunk_sec = float(getattr(settings, 'WHISPER_CHUNK_SEC', 300))
     try:
-        import whisper
-        model = whisper.load_model(model_name)
-        result = model.transcribe(audio_path)
-        return result.get('text', '').strip()
+        audio = audio_path
+        if isinstance(audio, str):
+            with stage_timer('ffmpeg'):
+                audio = whisper.load_audio(audio_path)
+        vad = vad_options()
+        if vad is not None:
+            with stage_timer('vad'):
+                trimmed = trim_silence(audio, **vad)
+            report_vad(progress, trimmed.audio_sec, trimmed.speech_sec)
+            audio = trimmed.audio
+        audio_sec = len(audio) / SAMPLE_RATE
+        on_seconds = _transcribe_reporter(progress, audio_sec)
+        started = time.perf_counter()
+        with stage_timer('whisper', model=model_name, backend=backend.name):
+            if workers > 1 and len(audio) > chunk_sec * SAMPLE_RATE:
+                overlap_sec = float(getattr(settings, 'WHISPER_CHUNK_OVERLAP_SEC', 2))
+                text = transcribe_parallel(audio, model_name, workers, chunk_sec, overlap_sec, options, on_seconds,
+                                           backend.name, torch_threads(), cache_size())
+            else:
+                on_frames = on_seconds and (lambda done, _total: on_seconds(done))
+                with use_model(model_name, backend) as model, whisper_progress(on_frames):
+                    text = backend.transcribe(model, audio, options)
+        record_whisper(model_name, time.perf_counter() - started, audio_sec, backend.name)
+        return text
     except FileNotFoundError as e:
         if 'ffmpeg' in str(e).lower():
             raise ValueError('FFmpeg is not installed or not on PATH.')
         raise
+    except (Abandoned, BrokenProcessPool):
+        raise
     except Exception as e:
         raise ValueError(f"Transcription failed: {e}")
 
+def transcribe_stream(fmt: dict, options: dict | None = None, progress=None, duration: float | None = None) -> str:
+    '''Transcribe an audio stream piped through ffmpeg, without a temp file.
+
+    With WHISPER_WORKERS > 1 each chunk is handed to the process pool as soon
+    as it has been decoded, so transcription overlaps the download.
+
+    Args:
+        fmt: A progressive audio format dict from select_audio_stream().
+        options: Extra decoding options passed to `model.transcribe()`.
+        progress: Optional pipeline progress callback (see transcribe_audio()).
+        duration: Length of the video in seconds, used to turn decoded and
+            transcribed seconds into fractions.
+
+    Returns:
+        The transcribed text (stripped).
+
+    Raises:
+        ValueError: If FFmpeg is missing or streaming/transcription fails.
+    '''
+
+    _require_ffmpeg()
+    model_name = whisper_model_name()
+    backend = default_backend().name
+    workers = int(getattr(settings, 'WHISPER_WORKERS', 1))
+    samples = 0
+
+    def counted(blocks):
+        nonlocal samples
+        for block in blocks:
+            samples += len(block)
+            if progress and duration and workers <= 1:
+                progress('download', samples / SAMPLE_RATE / duration, decoded_sec=round(samples / SAMPLE_RATE, 1))
+            yield block
+
+    try:
+        blocks = counted(iter_pcm(fmt))
+        if workers > 1:
+            chunk_sec = float(getattr(settings, 'WHISPER_CHUNK_SEC', 300))
+            overlap_sec = float(getattr(settings, 'WHISPER_CHUNK_OVERLAP_SEC', 2))
+            vad = vad_options()
+            trimmer = StreamTrimmer(**vad) if vad is not None else None
+            if trimmer is not None:
+                blocks = trimmer.trim(blocks)
+            started = time.perf_counter()
+            with stage_timer('whisper', model=model_name, backend=backend):
+                text = transcribe_chunks(iter_chunks(blocks, chunk_sec, overlap_sec), model_name, workers, options,
+                                         _transcribe_reporter(progress, duration), backend, torch_threads(),
+                                         cache_size())
+            speech_sec = trimmer.kept_samples / SAMPLE_RATE if trimmer else samples / SAMPLE_RATE
+            if trimmer is not None:
+                report_vad(progress, samples / SAMPLE_RATE, speech_sec, fraction=1.0)
+            record_whisper(model_name, time.perf_counter() - started, speech_sec, backend)
+            return text
+        with stage_timer('ffmpeg'):
+            audio = np.concatenate(list(blocks) or [np.empty(0, dtype=np.float32)])
+    except (Abandoned, BrokenProcessPool):
+        raise
+    except Exception as e:
+        raise ValueError(f"Audio streaming failed: {e}")
+    return transcribe_audio(audio, options, progress)
+
+def _transcribe_reporter(progress, audio_sec: float | None):
+    '''Adapt a pipeline progress callback to a `callback(done_sec)` for Whisper.'''
+
+    if progress is None:
+        return None
+
+    def report(done_sec: float):
+        fraction = min(done_sec / audio_sec, 1.0) if audio_sec else 0.0
+        detail = {'transcribed_sec': round(min(done_sec, audio_sec or done_sec), 1)}
+        if audio_sec:
+            detail['audio_sec'] = round(audio_sec, 1)
+        progress('transcribe', fraction, **detail)
+    return report
+
+def vad_options() -> dict | None:
+    '''Options for vad.trim_silence() from settings, or None if QUIZ_VAD is off.'''
+
+    if not getattr(settings, 'QUIZ_VAD', True):
+        return None
+    return {
+        'margin_db': float(getattr(settings, 'QUIZ_VAD_MARGIN_DB', 12.0)),
+        'min_silence_sec': float(getattr(settings, 'QUIZ_VAD_MIN_SILENCE_SEC', 1.0)),
+        'pad_sec': float(getattr(settings, 'QUIZ_VAD_PAD_SEC', 0.2)),
+    }
+
+def report_vad(progress, audio_sec: float, speech_sec: float, fraction: float = 0.0):
+    '''Count skipped non-speech audio and report the skipped share as a 'vad' event.
+
+    `fraction` is the transcribe-stage progress at the time of the report.
+    '''
+
+    skipped = max(0.0, audio_sec - speech_sec)
+    inc('quiz_vad_skipped_seconds_total', skipped)
+    if progress is not None:
+        progress('transcribe', fraction, event='vad', audio_sec=round(audio_sec, 1), speech_sec=round(speech_sec, 1),
+                 skipped_fraction=round(skipped / audio_sec, 4) if audio_sec else 0.0)
+
+def record_whisper(model_name: str, elapsed: float, audio_sec: float, backend: str = 'openai'):
+    '''Count transcribed audio and record the real-time factor.
+
+    `audio_sec` is the audio Whisper actually processed, i.e. after VAD.
+    '''
+
+    inc('quiz_audio_seconds_total', audio_sec, model=model_name, backend=backend)
+    if audio_sec > 0:
+        observe('quiz_whisper_rtf', elapsed / audio_sec, model=model_name, backend=backend)
+
 def build_quiz_prompt(transcript: str, num_questions: int = 10) -> str:
     '''Construct a strict prompt instructing Gemini to return valid JSON only.'''
 
@@ -179,9 +450,28 @@ Transcript:
 \"\"\"{transcript}\"\"\"
 """.strip()
 
+def prompt_version(num_questions: int = 10) -> str:
+    '''Return a short hash identifying the prompt template and LLM model.
+
+    Any edit to build_quiz_prompt() (or the map-reduce prompts and token
+    budget used for long transcripts) changes the hash, which invalidates reused
+    quiz payloads (see caching.get_generated_quiz).
+    '''
+
+    template = '\n'.join([
+        build_quiz_prompt('{transcript}', num_questions),
+        template_fingerprint(num_questions),
+        json.dumps(quiz_schema(num_questions), sort_keys=True),
+    ])
+    return hashlib.sha256(f"{GEMINI_MODEL}\n{template}".encode('utf-8')).hexdigest()[:16]
+
 def generate_quiz_with_gemini(transcript: str, num_questions: int = 10) -> dict:
     '''Call Gemini to generate a quiz JSON and parse/validate the result.
 
+    Runs agenerate_quiz_with_gemini() on the process's background event loop
+    (gemini.run()), so the calls of all threads share one async connection
+    pool and the QUIZ_GEMINI_CONCURRENCY limit.
+
     Args:
         transcript: The transcribed text.
         num_questions: Number of questions to request and enforce.
@@ -191,34 +481,290 @@ def generate_quiz_with_gemini(transcript: str, num_questions: int = 10) -> dict:
 
     Raises:
         ValueError: If GEMINI_API_KEY is missing, the call fails, or the JSON is invalid.
+        DependencyUnavailable: If Gemini keeps failing transiently or its
+            circuit breaker is open.
     '''
 
-    api_key = getattr(settings, 'GEMINI_API_KEY', '')
-    if not api_key:
-        raise ValueError('GEMINI_API_KEY is not configured.')
-    client = genai.Client(api_key=api_key)
+    return gemini.run(agenerate_quiz_with_gemini(transcript, num_questions))
+
+async def agenerate_quiz_map_reduce(aio, transcript: str, num_questions: int = 10) -> dict:
+    '''Generate a quiz from a long transcript in a map and a reduce pass (see mapreduce.py).
+
+    The transcript is split into chunks of at most QUIZ_MAP_CHUNK_TOKENS
+    tokens; candidate questions are generated for up to QUIZ_MAP_CONCURRENCY
+    chunks at a time (gathered on the event loop), so latency grows with the
+    number of rounds rather than with the transcript length. Invalid and
+    duplicate candidates are dropped, then one call selects exactly
+    `num_questions` and writes title and description. A failing chunk only
+    loses its candidates.
+
+    Args:
+        aio: The async Gemini client.
+        transcript: The transcribed text.
+        num_questions: Number of questions in the final quiz.
+
+    Returns:
+        A validated quiz dict with keys: title, description, questions[list].
+
+    Raises:
+        ValueError: If GEMINI_API_KEY is missing, too few valid candidates
+            were produced, or the final call fails.
+    '''
+
+    chunks = split_by_tokens(transcript, int(getattr(settings, 'QUIZ_MAP_CHUNK_TOKENS', 6000)))
+    per_chunk = candidates_per_chunk(num_questions, len(chunks))
+    rounds = asyncio.Semaphore(max(1, min(int(getattr(settings, 'QUIZ_MAP_CONCURRENCY', 4)), len(chunks))))
+
+    async def map_chunk(part: int, chunk: str) -> list[dict]:
+        try:
+            async with rounds:
+                data = await _ask_gemini_json(aio, build_map_prompt(chunk, per_chunk, part + 1, len(chunks)),
+                                              'gemini_map', questions_schema())
+        except DependencyUnavailable:
+            raise
+        except ValueError as e:
+            logger.warning('Map call for chunk %d/%d failed: %s', part + 1, len(chunks), e)
+            return []
+        return [q for q in data.get('questions') or [] if _is_valid_question(q)]
+
+    groups = await asyncio.gather(*(map_chunk(part, chunk) for part, chunk in enumerate(chunks)))
+    candidates = dedupe_questions(interleave(groups))
+    if len(candidates) < num_questions:
+        raise ValueError(f"Only {len(candidates)} valid questions could be generated from the transcript.")
+
+    data = await _ask_gemini_json(aio, build_reduce_prompt(candidates, num_questions), 'gemini_reduce', REDUCE_SCHEMA)
+    if not isinstance(data.get('title'), str) or not isinstance(data.get('description'), str):
+        raise ValueError('Quiz JSON must contain title, description, questions.')
+    quiz = {
+        'title': data.get('title'),
+        'description': data.get('description'),
+        'questions': select_questions(candidates, data.get('selected'), num_questions),
+    }
+    validate_quiz_dict(quiz, num_questions=num_questions)
+    return quiz
+
+async def arepair_quiz(aio, data: dict, transcript: str, num_questions: int) -> dict:
+    '''Validate a generated quiz and regenerate only its invalid or missing questions.
+
+    Valid questions are kept as they are; for the rest, a small follow-up
+    call asks for exactly the missing number of questions (up to
+    QUIZ_REPAIR_ATTEMPTS times) instead of rerunning the whole prompt.
+
+    Args:
+        aio: The async Gemini client.
+        data: The parsed quiz JSON.
+        transcript: The transcript the quiz was generated from.
+        num_questions: Number of questions to enforce.
+
+    Returns:
+        The validated (possibly repaired) quiz dict.
+
+    Raises:
+        ValueError: If title/description are missing or the quiz is still
+            invalid after the repair attempts.
+    '''
+
+    if not isinstance(data.get('questions'), list):
+        validate_quiz_dict(data, num_questions=num_questions)
+    questions = data['questions']
+    attempts = int(getattr(settings, 'QUIZ_REPAIR_ATTEMPTS', 1))
+    for attempt in range(attempts + 1):
+        valid = [q for q in questions if _is_valid_question(q)][:num_questions]
+        missing = num_questions - len(valid)
+        if not missing or attempt == attempts:
+            break
+        problems = [_question_problem(q) for q in questions if not _is_valid_question(q)]
+        inc('quiz_repaired_questions_total', missing)
+        with stage_timer('json_repair'):
+            extra = await _ask_gemini_json(
+                aio, build_repair_prompt(transcript, valid, problems, missing), 'gemini_repair', questions_schema(missing),
+            )
+        questions = valid + list(extra.get('questions') or [])
+
+    quiz = {**data, 'questions': valid}
+    validate_quiz_dict(quiz, num_questions=num_questions)
+    return quiz
+
+def _needs_repair(data: dict, num_questions: int) -> bool:
+    questions = data.get('questions')
+    return not (isinstance(questions, list) and len(questions) == num_questions
+                and all(_is_valid_question(q) for q in questions))
+
+def _question_problem(q) -> str:
     try:
-        resp = client.models.generate_content(model='gemini-2.5-flash', contents=build_quiz_prompt(transcript, num_questions))
+        validate_question(q)
+    except ValueError as e:
+        return str(e)
+    return 'question_title must be text.'
+
+def build_repair_prompt(transcript: str, valid: list[dict], problems: list[str], missing: int) -> str:
+    '''Prompt asking for `missing` replacement questions that do not repeat the valid ones.'''
+
+    existing = '\n'.join(f"- {q['question_title']}" for q in valid) or '- (none)'
+    reasons = '\n'.join(f"- {p}" for p in dict.fromkeys(problems)) or '- Too few questions were returned.'
+    return f"""
+Based on the following transcript, write exactly {missing} more quiz questions.
+
+They must not repeat any of these existing questions:
+{existing}
+
+Earlier questions were rejected for these reasons:
+{reasons}
+
+Requirements:
+- Each question must have exactly 4 distinct answer options.
+- Only one correct answer per question, and it must be present in "question_options".
+
+Transcript:
+\"\"\"{transcript}\"\"\"
+""".strip()
+
+async def _ask_gemini_json(aio, prompt: str, stage: str, schema: dict | None = None) -> dict:
+    '''Send one prompt to Gemini in JSON mode on the async client `aio` and return the parsed object.'''
+
+    try:
+        async with gemini.concurrency_slot():
+            with stage_timer(stage, model=GEMINI_MODEL):
+                resp = await acall_dependency(
+                    'gemini', aio.models.generate_content,
+                    model=GEMINI_MODEL, contents=prompt, config=gemini.json_config(schema),
+                )
+    except DependencyUnavailable:
+        raise
     except Exception as e:
         raise ValueError(f"Gemini request failed: {e}")
-    
-    text = getattr(resp, 'text', None) or getattr(resp, 'candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
-    
-    json_str = text.strip()
-    
-    if "```" in json_str:
-        json_str = json_str.split("```")[1]
-        
-        json_str = "\n".join([l for l in json_str.splitlines() if l.strip().lower() != 'json'])
-    
-    if not json_str.strip().startswith('{'):
-        s = json_str.find('{')
-        e = json_str.rfind('}')
-        json_str = json_str[s:e+1]
-    data = json.loads(json_str)
+    return _extract_json(resp)
+
+async def _ask_gemini_quiz(aio, prompt: str, schema: dict, num_questions: int) -> tuple[dict, bool]:
+    '''One async quiz call on the async client `aio`. Returns the parsed quiz and whether it passes validation.'''
+
+    try:
+        async with gemini.concurrency_slot():
+            start = time.perf_counter()
+            resp = await acall_dependency(
+                'gemini', aio.models.generate_content,
+                model=GEMINI_MODEL, contents=prompt, config=gemini.json_config(schema),
+            )
+    except DependencyUnavailable:
+        raise
+    except Exception as e:
+        raise ValueError(f"Gemini request failed: {e}")
+    hedging.tracker.observe(time.perf_counter() - start)
+    data = _extract_json(resp)
+    try:
+        validate_quiz_dict(data, num_questions=num_questions)
+    except ValueError:
+        return data, False
+    return data, True
+
+async def _hedged_quiz(aio, prompt: str, schema: dict, num_questions: int) -> dict:
+    '''Ask Gemini for a quiz; if it is slow, ask again and keep the first valid answer.
+
+    The duplicate request goes out once the first one has taken longer than
+    hedging.hedge_delay() and the per-minute hedge budget allows it. The
+    first response passing validate_quiz_dict() wins and the other request
+    is cancelled. A cancelled first request is observed with the time it
+    ran (see hedging.LatencyTracker).
+
+    Returns:
+        The winning quiz, or, if no response is valid, the first parsed one
+        (for repair_quiz()).
+
+    Raises:
+        ValueError: If no request returned a JSON object (the first error).
+        DependencyUnavailable: If that first error was a Gemini outage.
+    '''
+
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(_ask_gemini_quiz(aio, prompt, schema, num_questions))]
+    fallback, error = None, None
+    try:
+        with stage_timer('gemini', model=GEMINI_MODEL):
+            done, _ = await asyncio.wait(tasks, timeout=hedging.hedge_delay())
+            if not done:
+                if hedging.acquire_hedge():
+                    inc('quiz_gemini_hedges_total', outcome='sent')
+                    tasks.append(asyncio.create_task(_ask_gemini_quiz(aio, prompt, schema, num_questions)))
+                else:
+                    inc('quiz_gemini_hedges_total', outcome='capped')
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (t for t in tasks if t in done):
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    data, valid = task.result()
+                    if valid:
+                        if len(tasks) > 1:
+                            inc('quiz_gemini_hedges_total', outcome='hedge_won' if task is tasks[1] else 'primary_won')
+                        return data
+                    if fallback is None:
+                        fallback = data
+            if fallback is None:
+                raise error
+            return fallback
+    finally:
+        if not tasks[0].done():
+            hedging.tracker.observe(time.perf_counter() - started)
+        for task in tasks:
+            task.cancel()
+
+async def agenerate_quiz_with_gemini(transcript: str, num_questions: int = 10) -> dict:
+    '''Generate a quiz with the SDK's aio interface (see generate_quiz_with_gemini()).
+
+    At most QUIZ_GEMINI_CONCURRENCY calls per event loop are in flight at
+    once; further callers wait for a free slot without holding a thread.
+    Transcripts longer than QUIZ_PROMPT_TOKEN_BUDGET tokens go through
+    agenerate_quiz_map_reduce() instead of a single prompt. With
+    QUIZ_GEMINI_HEDGE, a slow request is hedged (see _hedged_quiz()).
+    Invalid questions are regenerated by arepair_quiz(). All of these calls
+    go through the same async client and concurrency slots.
+
+    Args:
+        transcript: The transcribed text.
+        num_questions: Number of questions to request and enforce.
+
+    Returns:
+        A Python dict with keys: title, description, questions[list].
+
+    Raises:
+        ValueError: If GEMINI_API_KEY is missing, the call fails, or the JSON is invalid.
+        DependencyUnavailable: If Gemini keeps failing transiently or its
+            circuit breaker is open.
+    '''
+
+    aio = gemini.get_async_client(_gemini_api_key())
+    if count_tokens(transcript) > int(getattr(settings, 'QUIZ_PROMPT_TOKEN_BUDGET', 12000)):
+        return await agenerate_quiz_map_reduce(aio, transcript, num_questions)
+    prompt, schema = build_quiz_prompt(transcript, num_questions), quiz_schema(num_questions)
+    if hedging.enabled():
+        data = await _hedged_quiz(aio, prompt, schema, num_questions)
+    else:
+        with stage_timer('gemini', model=GEMINI_MODEL):
+            data, _valid = await _ask_gemini_quiz(aio, prompt, schema, num_questions)
+    if _needs_repair(data, num_questions):
+        return await arepair_quiz(aio, data, transcript, num_questions)
     validate_quiz_dict(data, num_questions=num_questions)
     return data
 
+def _gemini_api_key() -> str:
+    api_key = getattr(settings, 'GEMINI_API_KEY', '')
+    if not api_key:
+        raise ValueError('GEMINI_API_KEY is not configured.')
+    return api_key
+
+def _extract_json(resp) -> dict:
+    '''Parse the JSON object of a JSON-mode Gemini response.'''
+
+    try:
+        data = json.loads(getattr(resp, 'text', None) or '')
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Gemini returned invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError('Quiz must be a JSON object.')
+    return data
+
 def validate_quiz_dict(d: dict, num_questions: int = 10):
     '''Validate the shape and constraints of the generated quiz JSON.'''
 
@@ -230,21 +776,253 @@ def validate_quiz_dict(d: dict, num_questions: int = 10):
     if not isinstance(qs, list) or len(qs) != num_questions:
         raise ValueError(f"Quiz must contain exactly {num_questions} questions.")
     for q in qs:
-        if not all(k in q for k in ('question_title', 'question_options', 'answer')):
-            raise ValueError('Each question must have question_title, question_options, answer.')
-        opts = q['question_options']
-        if not isinstance(opts, list) or len(opts) != 4 or len(set(opts)) != 4:
-            raise ValueError('Each question must have exactly 4 distinct options.')
-        if q['answer'] not in opts:
-            raise ValueError('Answer must be one of question_options.')
+        validate_question(q)
+
+def validate_question(q: dict):
+    '''Validate a single generated question (fields, 4 distinct options, answer among them).'''
+
+    if not isinstance(q, dict) or not all(k in q for k in ('question_title', 'question_options', 'answer')):
+        raise ValueError('Each question must have question_title, question_options, answer.')
+    opts = q['question_options']
+    if not isinstance(opts, list) or len(opts) != 4 or len(set(map(str, opts))) != 4:
+        raise ValueError('Each question must have exactly 4 distinct options.')
+    if q['answer'] not in opts:
+        raise ValueError('Answer must be one of question_options.')
+
+def _is_valid_question(q) -> bool:
+    try:
+        validate_question(q)
+    except ValueError:
+        return False
+    return isinstance(q['question_title'], str)
+
+def obtain_transcript(canonical_url: str, info: dict, progress=None, checkpoints: JobCheckpoints | None = None,
+                      audio_path: str | None = None, transcriber=None) -> str:
+    '''Return the transcript for a video, preferring existing captions.
+
+    Transcripts are looked up in the shared transcript cache first (see
+    caching.py). With QUIZ_CAPTIONS_FIRST enabled, a matching subtitle track
+    from the yt-dlp info dict is fetched and converted to text;
+    download_audio() and transcribe_audio() only run when no good captions
+    exist. With QUIZ_STREAMING_AUDIO enabled, a progressive audio stream is
+    piped through ffmpeg into Whisper instead of going through a temp file.
+    Fresh results are written back to the cache. Concurrent requests for the
+    same video are coalesced (see singleflight.py): one caller produces the
+    transcript and the others wait for it.
+
+    Args:
+        canonical_url: Canonical YouTube watch URL.
+        info: The yt-dlp info dict returned by ensure_video_available().
+        progress: Optional pipeline progress callback, passed on to the
+            download and Whisper steps of the caller that does the work.
+        checkpoints: Optional job checkpoints; a downloaded audio file is
+            recorded there and reused (and kept if Whisper fails).
+        audio_path: Audio file the caller already downloaded (see
+            fetch_audio()); captions are not tried again and the stream is
+            not used.
+        transcriber: Optional `transcriber(audio_path, options, progress)` returning
+            the text of an audio file, used instead of transcribe_audio()
+            (e.g. to run Whisper in a staged-pipeline process pool).
+
+    Returns:
+        The transcript text.
+
+    Raises:
+        ValueError: If the audio fallback fails to download or transcribe.
+    '''
+
+    vid = extract_youtube_id(canonical_url)
+    decoding = current_decoding()
+    return coalesce(
+        f"transcript:{vid}" + (f":{decoding.model}:{options_key(decoding.options)}" if decoding else ''),
+        compute=lambda: _produce_transcript(vid, canonical_url, info, progress, checkpoints, audio_path, transcriber),
+        lookup=lambda: lookup_transcript(vid),
+        on_wait=(lambda: progress('transcribe', 0.0, waiting_for='transcript')) if progress else None,
+    )
+
+def _caption_options() -> dict:
+    return {'languages': list(getattr(settings, 'QUIZ_CAPTION_LANGUAGES', ['en']))}
+
+def whisper_model_name() -> str:
+    '''Whisper model for the current video: the active preset's, else WHISPER_MODEL.'''
+
+    decoding = current_decoding()
+    return decoding.model if decoding else getattr(settings, 'WHISPER_MODEL', 'small')
+
+def decoding_detail() -> dict:
+    '''Progress detail naming the active preset and model (empty without a preset).'''
+
+    decoding = current_decoding()
+    return {'preset': decoding.preset, 'model': decoding.model} if decoding else {}
+
+def whisper_options() -> dict:
+    '''Decoding options passed to `model.transcribe()` (also part of the transcript cache key).
+
+    These come from the active preset (see presets.py); without one,
+    Whisper's defaults are used.
+    '''
+
+    decoding = current_decoding()
+    return dict(decoding.options) if decoding else {}
+
+def whisper_cache_options() -> dict:
+    '''Options key of cached Whisper transcripts: everything besides the model that changes the text.
+
+    That is the decoding options, the inference backend (an int8 transcript
+    differs from an fp32 one) and the VAD settings.
+    '''
+
+    return {**whisper_options(), 'backend': default_backend().name, 'vad': vad_options()}
+
+def transcript_key() -> str:
+    '''Key of the transcript a quiz would be generated from: '<model>:<options hash>'.
+
+    Uses the active decoding preset, so quizzes of the same video under
+    different presets are neither coalesced nor reused across each other.
+    '''
 
-def create_quiz_from_youtube(url: str, owner, num_questions: int = 10):
-    '''End-to-end pipeline: validate → download → transcribe → LLM → persist.
+    return f"{whisper_model_name()}:{options_key(whisper_cache_options())[:16]}"
+
+def lookup_transcript(vid: str) -> str | None:
+    '''Return a cached caption or Whisper transcript for the video, or None.'''
+
+    if getattr(settings, 'QUIZ_CAPTIONS_FIRST', True):
+        captions = get_cached_transcript(vid, 'captions', _caption_options())
+        if captions:
+            return captions
+    return get_cached_transcript(vid, whisper_model_name(), whisper_cache_options()) or None
+
+def caption_transcript(vid: str, info: dict, progress=None) -> str | None:
+    '''Return the video's captions as transcript (and cache them), or None.
+
+    Returns None without a request when QUIZ_CAPTIONS_FIRST is disabled.
+    '''
+
+    if not getattr(settings, 'QUIZ_CAPTIONS_FIRST', True):
+        return None
+    with stage_timer('captions'):
+        captions = fetch_captions(info)
+    if not captions:
+        return None
+    if progress:
+        progress('transcribe', 1.0, source='captions')
+    inc('quiz_transcript_chars_total', len(captions), source='captions')
+    retry_locked(store_transcript, vid, 'captions', captions, _caption_options())
+    return captions
+
+def whisper_transcript(vid: str, audio_path: str, progress=None, keep_on_error: bool = False,
+                       transcriber=None) -> str:
+    '''Transcribe a downloaded audio file, delete it and cache the transcript.
+
+    With `keep_on_error` the file survives a failed transcription (it is
+    checkpointed for the next attempt). `transcriber` replaces transcribe_audio()
+    (see obtain_transcript()).
+    '''
+
+    try:
+        transcript = (transcriber or transcribe_audio)(audio_path, whisper_options(), progress)
+    except BaseException:
+        if not keep_on_error:
+            with contextlib.suppress(Exception):
+                pathlib.Path(audio_path).unlink(missing_ok=True)
+        raise
+    with contextlib.suppress(Exception):
+        pathlib.Path(audio_path).unlink(missing_ok=True)
+    store_whisper_transcript(vid, transcript)
+    return transcript
+
+def store_whisper_transcript(vid: str, transcript: str):
+    '''Count and cache a fresh Whisper transcript.'''
+
+    inc('quiz_transcript_chars_total', len(transcript), source='whisper')
+    retry_locked(store_transcript, vid, whisper_model_name(), transcript, whisper_cache_options())
+
+def audio_stream(info: dict) -> dict | None:
+    '''The audio format to pipe into Whisper with QUIZ_STREAMING_AUDIO, or None to download a file.'''
+
+    if not getattr(settings, 'QUIZ_STREAMING_AUDIO', False):
+        return None
+    return select_audio_stream(info, float(getattr(settings, 'QUIZ_AUDIO_MIN_ABR', 48)))
+
+def fetch_audio(canonical_url: str, info: dict, progress=None, checkpoints: JobCheckpoints | None = None) -> str:
+    '''Download the audio file, or reuse the one checkpointed by an earlier attempt.'''
+
+    if checkpoints is None:
+        return download_audio(canonical_url, info, progress)
+    saved = checkpoints.load('audio')
+    audio_path = saved['path'] if saved else download_audio(canonical_url, info, progress)
+    checkpoints.save('audio', {'path': audio_path})
+    return audio_path
+
+def _produce_transcript(vid: str, canonical_url: str, info: dict, progress=None,
+                        checkpoints: JobCheckpoints | None = None, audio_path: str | None = None,
+                        transcriber=None) -> str:
+    '''Fetch captions or run Whisper, and store the result in the transcript cache.'''
+
+    if audio_path is None:
+        captions = caption_transcript(vid, info, progress)
+        if captions:
+            return captions
+        stream = audio_stream(info)
+        if stream is not None:
+            transcript = transcribe_stream(stream, whisper_options(), progress, info.get('duration'))
+            store_whisper_transcript(vid, transcript)
+            return transcript
+        audio_path = fetch_audio(canonical_url, info, progress, checkpoints)
+    transcript = whisper_transcript(vid, audio_path, progress, keep_on_error=checkpoints is not None,
+                                    transcriber=transcriber)
+    if checkpoints is not None:
+        checkpoints.discard('audio')
+    return transcript
+
+def persist_quiz(quiz_dict: dict, owner, video_url: str):
+    '''Create a Quiz and its Questions from a validated quiz payload.'''
+
+    from ..models import Quiz, Question
+    with transaction.atomic():
+        quiz = Quiz.objects.create(
+            owner=owner,
+            title=quiz_dict['title'],
+            description=quiz_dict['description'],
+            video_url=video_url,
+        )
+        questions = [
+            Question(
+                quiz=quiz,
+                question_title=q['question_title'],
+                question_options=q['question_options'],
+                answer=q['answer'],
+            ) for q in quiz_dict['questions']
+        ]
+        Question.objects.bulk_create(questions)
+    return quiz
+
+def create_quiz_from_youtube(url: str, owner, num_questions: int = 10, progress=None, preset: str = '',
+                             checkpoints: JobCheckpoints | None = None):
+    '''End-to-end pipeline: validate → captions or download+transcribe → LLM → persist.
+
+    With QUIZ_REUSE_GENERATED enabled, a quiz payload generated earlier for the
+    same video, question count and prompt version is cloned for the new owner
+    instead of calling Gemini again. Concurrent identical requests are
+    coalesced: one runs the pipeline, the others wait for its payload and
+    persist their own Quiz rows. A transcription preset (see presets.py)
+    picks the Whisper model and decoding options from the video duration.
 
     Args:
         url: Any YouTube URL containing a valid video ID.
         owner: The Django User who will own the quiz.
         num_questions: Number of questions to generate and enforce.
+        progress: Optional callable `progress(stage, fraction=0.0, **detail)`
+            invoked on each stage transition ('probe', 'download',
+            'transcribe', 'generate', 'persist') and with fine-grained
+            progress inside a stage: download fraction and bytes, seconds of
+            audio transcribed, and the LLM 'llm_started'/'llm_done' events
+            (passed as `event=...`).
+        preset: Transcription preset name ('' = WHISPER_MODEL with default
+            decoding); see presets.preset_for().
+        checkpoints: Optional job checkpoints. Stages with a saved output
+            (probe, audio, transcript, LLM payload) are skipped, and each
+            completed stage is saved.
 
     Returns:
         The created Quiz instance (with related Questions saved).
@@ -254,31 +1032,121 @@ def create_quiz_from_youtube(url: str, owner, num_questions: int = 10):
         FFmpeg missing, LLM errors, invalid JSON, etc.).
     '''
 
-    canonical_url = YOUTUBE_CANONICAL.format(vid=extract_youtube_id(url))
-    ensure_video_available(canonical_url, max_duration_sec=getattr(settings, 'QUIZ_MAX_DURATION_SEC', None))    
-    audio_path = download_audio(canonical_url)
-    try:
-        transcript = transcribe_audio(audio_path)
-    finally:
-        with contextlib.suppress(Exception):
-            pathlib.Path(audio_path).unlink(missing_ok=True)
+    with stage_timer('pipeline'):
+        return _create_quiz(url, owner, num_questions, progress or (lambda stage, fraction=0.0, **detail: None), preset,
+                            checkpoints)
 
-    quiz_dict = generate_quiz_with_gemini(transcript, num_questions=num_questions)
+def resume(checkpoints: JobCheckpoints | None, stage: str, field: str, compute):
+    '''Return the checkpointed output of `stage`, or compute it and save it as `{field: value}`.'''
 
-    from ..models import Quiz, Question
-    quiz = Quiz.objects.create(
-        owner=owner,
-        title=quiz_dict['title'],
-        description=quiz_dict['description'],
-        video_url=canonical_url,
-    )
-    questions = [
-        Question(
-            quiz=quiz,
-            question_title=q['question_title'],
-            question_options=q['question_options'],
-            answer=q['answer'],
-        ) for q in quiz_dict['questions']
-    ]
-    Question.objects.bulk_create(questions)
-    return quiz
\ No newline at end of file
+    if checkpoints is not None:
+        saved = checkpoints.load(stage)
+        if saved is not None:
+            return saved[field]
+    value = compute()
+    if checkpoints is not None:
+        checkpoints.save(stage, {field: value})
+    return value
+
+def _create_quiz(url: str, owner, num_questions: int, report, preset: str = '',
+                 checkpoints: JobCheckpoints | None = None):
+    vid = extract_youtube_id(url)
+    canonical_url = YOUTUBE_CANONICAL.format(vid=vid)
+    report('probe')
+    info = video_info(canonical_url, checkpoints)
+    with use_decoding(resolve_preset(preset, info.get('duration'))):
+        return _create_quiz_for(vid, canonical_url, info, owner, num_questions, report, checkpoints)
+
+def video_info(canonical_url: str, checkpoints: JobCheckpoints | None = None) -> dict:
+    '''Probe the video (or load the checkpointed probe) and enforce QUIZ_MAX_DURATION_SEC.'''
+
+    return resume(checkpoints, 'probe', 'info', lambda: ensure_video_available(
+        canonical_url, max_duration_sec=getattr(settings, 'QUIZ_MAX_DURATION_SEC', None)))
+
+def prefetch_transcript(url: str, progress=None, preset: str = '') -> str:
+    '''Probe, download and transcribe a video into the transcript cache, without a quiz.
+
+    A later create_quiz_from_youtube() for the same video and preset finds
+    the probe result and transcript in the caches and only calls Gemini. A
+    prefetch and a quiz request running at the same time are coalesced like
+    two quiz requests.
+
+    Args:
+        url: Any YouTube URL containing a valid video ID.
+        progress: Optional progress callback (see create_quiz_from_youtube()).
+        preset: Transcription preset name (see presets.preset_for()).
+
+    Returns:
+        The transcript text.
+
+    Raises:
+        ValueError: For expected failure modes (invalid URL, video unavailable,
+        FFmpeg missing, etc.).
+    '''
+
+    report = progress or (lambda stage, fraction=0.0, **detail: None)
+    with stage_timer('prefetch'):
+        canonical_url = YOUTUBE_CANONICAL.format(vid=extract_youtube_id(url))
+        report('probe')
+        info = video_info(canonical_url)
+        with use_decoding(resolve_preset(preset, info.get('duration'))):
+            report('download', **decoding_detail())
+            return obtain_transcript(canonical_url, info, report)
+
+def quiz_payload(vid: str, num_questions: int, report, transcript, checkpoints: JobCheckpoints | None = None) -> dict:
+    '''Return the quiz payload for a video: reused, checkpointed or generated by Gemini.
+
+    Concurrent calls for the same video, question count, prompt version and
+    transcript key (see transcript_key()) are coalesced (key
+    'quiz:<video>:<n>:<version>:<transcript key>'); with QUIZ_REUSE_GENERATED
+    an earlier payload is returned without a call.
+
+    Args:
+        vid: YouTube video id.
+        num_questions: Number of questions to generate and enforce.
+        report: Progress callback (see create_quiz_from_youtube()).
+        transcript: Zero-argument callable returning the transcript; only
+            called when Gemini has to run.
+        checkpoints: Optional job checkpoints for the LLM payload.
+
+    Returns:
+        The validated quiz payload.
+    '''
+
+    reuse = getattr(settings, 'QUIZ_REUSE_GENERATED', False)
+    share = reuse or getattr(settings, 'QUIZ_SINGLE_FLIGHT', True)
+    version = prompt_version(num_questions)
+    source = transcript_key()
+    started = timezone.now()
+
+    def llm():
+        text = transcript()
+        report('generate', 0.0, event='llm_started', model=GEMINI_MODEL)
+        payload = generate_quiz_with_gemini(text, num_questions=num_questions)
+        report('generate', 1.0, event='llm_done', model=GEMINI_MODEL)
+        return payload
+
+    def generate():
+        payload = resume(checkpoints, 'llm', 'payload', llm)
+        if share:
+            retry_locked(store_generated_quiz, vid, num_questions, version, payload, source)
+        return payload
+
+    def lookup():
+        return get_generated_quiz(vid, num_questions, version, source, since=None if reuse else started)
+
+    return coalesce(f"quiz:{vid}:{num_questions}:{version}:{source}", compute=generate, lookup=lookup,
+                    on_wait=lambda: report('generate', 0.0, waiting_for='quiz'))
+
+def _create_quiz_for(vid: str, canonical_url: str, info: dict, owner, num_questions: int, report,
+                     checkpoints: JobCheckpoints | None = None):
+
+    def transcript():
+        report('download', **decoding_detail())
+        return resume(checkpoints, 'transcript', 'text', lambda: obtain_transcript(canonical_url, info, report, checkpoints))
+
+    quiz_dict = quiz_payload(vid, num_questions, report, transcript, checkpoints)
+
+    report('persist')
+    with stage_timer('persist'):
+        return persist_quiz(quiz_dict, owner, canonical_url)
@@ -0,0 +1,184 @@
+'''Single-flight coalescing of duplicate pipeline work.
+
+When many users submit the same video at once, only one caller should
+download, transcribe and call Gemini; everyone else waits for that result.
+
+- Within a process, concurrent callers for the same key share one call:
+  followers block on the leader and receive its return value (or exception).
+  A leader that stops for a reason of its own (Abandoned, e.g. its job was
+  cancelled) does not fail its followers: one of them takes over.
+- Across processes, the leader holds a PipelineLock row and renews it while
+  it computes. Callers in other processes poll the shared store through
+  `lookup()` (transcript cache, generated quiz table) until the result
+  appears or the lock is released.
+- Waiting followers call `on_wait()` about once a second, so a job can
+  report progress (and keep its lease) during a long wait.
+
+Settings:
+- QUIZ_SINGLE_FLIGHT: enable coalescing (default True).
+- QUIZ_SINGLE_FLIGHT_LOCK_SEC: lock lifetime between renewals; the lock of
+  a crashed leader expires after it.
+- QUIZ_SINGLE_FLIGHT_WAIT_SEC: how long a follower waits before doing the
+  work itself.
+'''
+
+import contextlib, logging, threading, time, uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+
+from ..models import PipelineLock
+from .db import retry_locked
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SEC = 1.0
+
+class Abandoned(Exception):
+    '''Raised by a caller that stops for its own reasons rather than because the work failed.
+
+    Followers of an abandoned call compute (or wait for a new leader) again
+    instead of inheriting the error.
+    '''
+
+class _Call:
+    '''An in-flight computation that followers in the same process wait on.'''
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+_calls: dict[str, _Call] = {}
+_calls_lock = threading.Lock()
+
+def _lock_duration() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, 'QUIZ_SINGLE_FLIGHT_LOCK_SEC', 900)))
+
+def acquire_lock(key: str, owner: str) -> bool:
+    '''Try to take the cross-process lock for `key`; steal it if it has expired.'''
+
+    now = timezone.now()
+    expires_at = now + _lock_duration()
+    try:
+        with transaction.atomic():
+            PipelineLock.objects.create(key=key, owner=owner, expires_at=expires_at)
+        return True
+    except IntegrityError:
+        return bool(PipelineLock.objects.filter(key=key, expires_at__lt=now).update(owner=owner, expires_at=expires_at))
+    except OperationalError as e:
+        logger.warning('Taking the %s lock failed, polling again: %s', key, e)
+        return False
+
+def renew_lock(key: str, owner: str) -> bool:
+    '''Extend `owner`'s lock on `key` by a full lifetime. Returns False if it is no longer held.'''
+
+    return bool(PipelineLock.objects.filter(key=key, owner=owner).update(expires_at=timezone.now() + _lock_duration()))
+
+def release_lock(key: str, owner: str):
+    '''Release the lock for `key` if `owner` still holds it.'''
+
+    retry_locked(PipelineLock.objects.filter(key=key, owner=owner).delete)
+
+@contextlib.contextmanager
+def _renewing(key: str, owner: str):
+    '''Renew the lock every third of its lifetime until the block exits.'''
+
+    stopped = threading.Event()
+
+    def renew():
+        try:
+            while not stopped.wait(_lock_duration().total_seconds() / 3):
+                try:
+                    renew_lock(key, owner)
+                except OperationalError as e:
+                    logger.warning('Renewing the %s lock failed, retrying: %s', key, e)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=renew, name='singleflight-renew', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+def _run_locked(key: str, compute, lookup, on_wait=None):
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + float(getattr(settings, 'QUIZ_SINGLE_FLIGHT_WAIT_SEC', 1800))
+    while True:
+        if acquire_lock(key, owner):
+            try:
+                result = lookup()
+                if result is not None:
+                    return result
+                with _renewing(key, owner):
+                    return compute()
+            finally:
+                release_lock(key, owner)
+        if time.monotonic() > deadline:
+            return compute()
+        time.sleep(POLL_INTERVAL_SEC)
+        if on_wait is not None:
+            on_wait()
+        result = lookup()
+        if result is not None:
+            return result
+
+def coalesce(key: str, compute, lookup, on_wait=None):
+    '''Return `lookup()` if it has a result, else run `compute()` at most once per key.
+
+    Args:
+        key: Identifies the work, e.g. 'transcript:<video id>'.
+        compute: Zero-argument callable doing the work; it must make its
+            result visible to `lookup()` for callers in other processes.
+        lookup: Zero-argument callable returning a stored result or None.
+        on_wait: Optional zero-argument callable, called about once a
+            second while this caller waits for another one's result.
+
+    Returns:
+        The stored or computed result.
+    '''
+
+    result = lookup()
+    if result is not None:
+        return result
+    if not getattr(settings, 'QUIZ_SINGLE_FLIGHT', True):
+        return compute()
+
+    deadline = time.monotonic() + float(getattr(settings, 'QUIZ_SINGLE_FLIGHT_WAIT_SEC', 1800))
+    while True:
+        with _calls_lock:
+            call = _calls.get(key)
+            leader = call is None
+            if leader:
+                call = _calls[key] = _Call()
+        if leader:
+            break
+        while not call.done.wait(timeout=POLL_INTERVAL_SEC):
+            if time.monotonic() > deadline:
+                return compute()
+            if on_wait is not None:
+                on_wait()
+        if isinstance(call.error, Abandoned):
+            result = lookup()
+            if result is not None:
+                return result
+            continue
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _run_locked(key, compute, lookup, on_wait)
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
@@ -0,0 +1,228 @@
+'''The quiz pipeline split into stages for pipeline.Pipeline.
+
+Used by the bulk ingestion command (ingest.py) and by pipelined job workers
+(jobs.work_pipelined). Each video is a QuizRun that moves through:
+
+- prepare (threads, I/O): probe the video, reuse a generated quiz payload or
+  a cached transcript / captions, otherwise download the audio file (not
+  with QUIZ_STREAMING_AUDIO when the video has a streamable format).
+- transcribe (processes, CPU): services.obtain_transcript() with that file,
+  or streaming the audio. Whisper runs in a spawn process pool whose
+  workers keep the model loaded. With `whisper_processes=False` it runs in
+  the stage threads instead, on the process-wide model registry, and long
+  audio is split across WHISPER_WORKERS processes like in a request.
+- generate (threads, remote): services.quiz_payload() and persist the quiz.
+
+Because Gemini calls have their own pool, quizzes for already-transcribed
+videos keep being generated while Whisper is busy, and the next download
+runs at the same time.
+
+The run's transcription preset is resolved after the probe; every stage
+function runs with that Decoding active (see presets.use_decoding), and the
+Whisper process workers load other models than their initial one on demand.
+
+With job checkpoints (see checkpoints.py), prepare resumes from a saved LLM
+payload, transcript or audio file, and transcribe and generate save their
+outputs; a checkpointed audio file survives a failed attempt.
+
+The steps are the ones create_quiz_from_youtube() runs (video_info,
+fetch_audio, obtain_transcript, quiz_payload in services.py), so transcripts
+and quiz payloads are coalesced with requests and other workers working on
+the same video. Only the download happens before the transcript:<video>
+coalescing, so two workers preparing the same video at once may both
+download it; just one of them runs Whisper.
+'''
+
+import contextlib, functools, os, pathlib
+
+from django.conf import settings
+
+from ..models import Quiz
+from .caching import get_generated_quiz
+from .checkpoints import JobCheckpoints
+from .db import retry_locked
+from .pipeline import Skip, Stage
+from .presets import Decoding, resolve as resolve_preset, use_decoding
+from .services import (
+    YOUTUBE_CANONICAL, audio_stream, caption_transcript, decoding_detail, extract_youtube_id, fetch_audio,
+    lookup_transcript, obtain_transcript, persist_quiz, prompt_version, quiz_payload, record_whisper, report_vad,
+    transcript_key, vad_options, video_info, whisper_model_name,
+)
+from .transcription import init_worker, transcribe_file
+from .whisper_models import cache_size, default_backend, torch_threads
+
+STAGE_NAMES = ('prepare', 'transcribe', 'generate')
+
+def _no_progress(stage, fraction=0.0, **detail):
+    return None
+
+class QuizRun:
+    '''One video moving through the stages.
+
+    Args:
+        url: Any YouTube URL of the video.
+        owner: The User who will own the quiz.
+        num_questions: Questions per quiz.
+        progress: Optional progress callback (see create_quiz_from_youtube).
+        skip_existing: Finish with Skip if the owner already has a quiz for
+            this video (used to resume bulk ingestion).
+        preset: Transcription preset name (see presets.py).
+        transcript_only: Stop after the transcript is cached (prefetch);
+            no quiz is generated.
+        checkpoints: Optional job checkpoints to resume from and save to.
+    '''
+
+    def __init__(self, url: str, owner, num_questions: int = 10, progress=None, skip_existing: bool = False,
+                 preset: str = '', transcript_only: bool = False, checkpoints: JobCheckpoints | None = None):
+        self.url = url
+        self.owner = owner
+        self.num_questions = num_questions
+        self.report = progress or _no_progress
+        self.skip_existing = skip_existing
+        self.preset = preset
+        self.transcript_only = transcript_only
+        self.checkpoints = checkpoints
+        self.decoding: Decoding | None = None
+        self.vid = ''
+        self.canonical_url = url
+        self.info: dict | None = None
+        self.version = ''
+        self.payload: dict | None = None
+        self.transcript: str | None = None
+        self.audio_path: str | None = None
+        self.quiz = None
+
+    @property
+    def duration(self) -> float:
+        return float((self.info or {}).get('duration') or 0)
+
+    def discard_audio(self, force: bool = False):
+        '''Delete the downloaded audio file, if any.
+
+        A checkpointed file is kept for the next attempt unless `force`.
+        '''
+
+        if self.audio_path and (force or self.checkpoints is None):
+            with contextlib.suppress(Exception):
+                pathlib.Path(self.audio_path).unlink(missing_ok=True)
+            self.audio_path = None
+
+def _decoded(func):
+    '''Run a stage function with the run's Decoding active.'''
+
+    @functools.wraps(func)
+    def wrapper(run: QuizRun, *args):
+        with use_decoding(run.decoding):
+            return func(run, *args)
+    return wrapper
+
+def _reuse() -> bool:
+    return getattr(settings, 'QUIZ_REUSE_GENERATED', False)
+
+def _saved(run: QuizRun, stage: str, field: str):
+    '''Return a checkpointed output of the run's job, or None.'''
+
+    saved = run.checkpoints.load(stage) if run.checkpoints is not None else None
+    return saved[field] if saved is not None else None
+
+def _transcribed(run: QuizRun, text: str):
+    '''Keep a fresh transcript and drop the audio file.'''
+
+    run.transcript = text
+    run.discard_audio(force=True)
+    if run.checkpoints is not None:
+        run.checkpoints.save('transcript', {'text': text})
+        run.checkpoints.discard('audio')
+
+def prepare(run: QuizRun):
+    '''Probe the video and obtain a payload, transcript or audio file.'''
+
+    run.vid = extract_youtube_id(run.url)
+    run.canonical_url = YOUTUBE_CANONICAL.format(vid=run.vid)
+    if run.skip_existing and Quiz.objects.filter(owner=run.owner, video_url=run.canonical_url).exists():
+        raise Skip('Quiz already exists.')
+    run.report('probe')
+    run.info = video_info(run.canonical_url, run.checkpoints)
+    run.decoding = resolve_preset(run.preset, run.duration)
+    run.version = prompt_version(run.num_questions)
+    run.payload = _saved(run, 'llm', 'payload')
+    run.transcript = _saved(run, 'transcript', 'text')
+    if run.payload is not None or run.transcript is not None:
+        return
+    with use_decoding(run.decoding):
+        if _reuse() and not run.transcript_only:
+            run.payload = get_generated_quiz(run.vid, run.num_questions, run.version, transcript_key())
+            if run.payload is not None:
+                return
+        run.report('download', **decoding_detail())
+        run.transcript = lookup_transcript(run.vid) or caption_transcript(run.vid, run.info, run.report)
+        if run.transcript is None and audio_stream(run.info) is None:
+            run.audio_path = fetch_audio(run.canonical_url, run.info, run.report, run.checkpoints)
+
+def _whisper_in_pool(submit, audio_path: str, options: dict, progress) -> str:
+    '''Transcribe a file with transcription.transcribe_file() in the stage's process pool.'''
+
+    model_name = whisper_model_name()
+    vad = vad_options()
+    text, audio_sec, elapsed, speech_sec = submit(audio_path, options, model_name, vad)
+    if vad is not None:
+        report_vad(progress, audio_sec, speech_sec, fraction=1.0)
+    record_whisper(model_name, elapsed, speech_sec, default_backend().name)
+    return text
+
+@_decoded
+def transcribe(run: QuizRun, submit=None):
+    '''Obtain the transcript with obtain_transcript(), coalesced with other runs of the video.
+
+    Uses the audio file from prepare (or streams the audio). With `submit`
+    (the process stage's driver call) Whisper runs in the stage's process
+    pool; otherwise in this thread, on the process-wide model registry.
+    '''
+
+    if run.payload is not None or run.transcript is not None:
+        return
+    if run.audio_path:
+        run.report('transcribe')
+    transcriber = functools.partial(_whisper_in_pool, submit) if submit is not None else None
+    _transcribed(run, obtain_transcript(run.canonical_url, run.info, run.report, run.checkpoints,
+                                        audio_path=run.audio_path, transcriber=transcriber))
+
+@_decoded
+def generate(run: QuizRun):
+    '''Obtain the quiz payload with quiz_payload() (unless reused) and persist the quiz.'''
+
+    if run.transcript_only:
+        return
+    if run.payload is None:
+        run.payload = quiz_payload(run.vid, run.num_questions, run.report, lambda: run.transcript, run.checkpoints)
+    run.report('persist')
+    run.quiz = retry_locked(persist_quiz, run.payload, run.owner, run.canonical_url)
+
+def build_stages(workers: dict[str, int] | None = None, whisper_processes: bool = True) -> list[Stage]:
+    '''Return the prepare → transcribe → generate stages.
+
+    Args:
+        workers: Pool size per stage name; missing stages get one worker.
+        whisper_processes: Run Whisper in a dedicated process pool (one
+            model per process, torch threads split between them) instead of
+            the stage threads.
+    '''
+
+    workers = {name: max(1, int((workers or {}).get(name, 1))) for name in STAGE_NAMES}
+    if whisper_processes:
+        model_name = getattr(settings, 'WHISPER_MODEL', 'small')
+        intra, inter = torch_threads()
+        threads = intra or max(1, (os.cpu_count() or 1) // workers['transcribe'])
+        whisper = Stage(
+            'transcribe', transcribe_file, workers['transcribe'], processes=True,
+            initializer=init_worker,
+            initargs=(model_name, threads, default_backend().name, inter, cache_size()),
+            driver=transcribe,
+        )
+    else:
+        whisper = Stage('transcribe', transcribe, workers['transcribe'])
+    return [
+        Stage('prepare', prepare, workers['prepare']),
+        whisper,
+        Stage('generate', generate, workers['generate']),
+    ]
@@ -0,0 +1,411 @@
+'''Chunked, multi-process Whisper transcription for long audio.
+
+A single `model.transcribe()` call pins one process for the whole file. For
+long lectures the decoded 16 kHz PCM is instead split into overlapping chunks
+(cut at the quietest point near each boundary), the chunks are transcribed
+across a process pool, and the texts are stitched back together with the
+duplicated overlap removed.
+
+Pool workers are started with the 'spawn' method and never touch Django
+settings: everything they need (model name, backend, thread counts) is
+passed in. There is one pool per worker configuration, not per model: each
+task names its model, workers preload the model of the request that started
+the pool and keep others (e.g. chosen by a preset) in a per-worker LRU of
+`cache_size` entries, the same policy as whisper_models.
+
+Progress:
+- Chunked runs report the seconds of audio finished after each chunk.
+- Single-process runs report decoded seconds through whisper_progress(),
+  which swaps the tqdm progress bar inside `whisper.transcribe` for a shim
+  that forwards its frame counts to a per-thread callback. Threads without
+  a callback still get the normal tqdm bar.
+
+Settings (see quiz_app.api.services.transcribe_audio):
+- WHISPER_WORKERS: number of worker processes (1 disables chunking).
+- WHISPER_CHUNK_SEC: target chunk length in seconds.
+- WHISPER_CHUNK_OVERLAP_SEC: overlap between neighbouring chunks in seconds.
+'''
+
+import contextlib, importlib, logging, multiprocessing, os, re, threading, time, types
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from .vad import trim_silence
+from .whisper_backends import WhisperBackend, configure_torch_threads, get_backend
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+POOL_RETRIES = 1
+MEL_FRAMES_PER_SEC = 100
+_FRAME = SAMPLE_RATE // 50
+
+_pools: dict[tuple, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+_worker_model_name: str | None = None
+_worker_models: 'OrderedDict[str, object]' = OrderedDict()
+_worker_cache_size = 2
+_worker_backend: WhisperBackend | None = None
+
+_progress_local = threading.local()
+_shim_lock = threading.Lock()
+_real_tqdm = None
+
+class _ProgressBar:
+    '''Stand-in for `tqdm.tqdm` in whisper.transcribe that reports decoded seconds.'''
+
+    def __init__(self, *args, **kwargs):
+        self.callback = getattr(_progress_local, 'callback', None)
+        self.total = kwargs.get('total') or 0
+        self.n = 0
+        self._bar = None if self.callback else _real_tqdm(*args, **kwargs)
+
+    def __enter__(self):
+        if self._bar is not None:
+            self._bar.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        if self._bar is not None:
+            return self._bar.__exit__(*exc)
+        return False
+
+    def update(self, n: int = 1):
+        self.n += n
+        if self._bar is not None:
+            return self._bar.update(n)
+        self.callback(self.n / MEL_FRAMES_PER_SEC, self.total / MEL_FRAMES_PER_SEC)
+
+def _install_progress_shim():
+    global _real_tqdm
+    with _shim_lock:
+        module = importlib.import_module('whisper.transcribe')
+        if _real_tqdm is None:
+            _real_tqdm = module.tqdm.tqdm
+            module.tqdm = types.SimpleNamespace(tqdm=_ProgressBar)
+
+@contextlib.contextmanager
+def whisper_progress(callback: Callable[[float, float], None] | None):
+    '''Report Whisper decoding progress of this thread to `callback(done_sec, total_sec)`.'''
+
+    if callback is None:
+        yield
+        return
+    _install_progress_shim()
+    previous = getattr(_progress_local, 'callback', None)
+    _progress_local.callback = callback
+    try:
+        yield
+    finally:
+        _progress_local.callback = previous
+
+def _cut_point(audio: np.ndarray, end: int, search: int) -> int:
+    '''Move a nominal cut at `end` back to the quietest 20 ms frame within `search` samples.'''
+
+    window = audio[end - search:end]
+    frames = len(window) // _FRAME
+    if not frames:
+        return end
+    energy = np.square(window[:frames * _FRAME].reshape(frames, _FRAME)).mean(axis=1)
+    return end - search + int(np.argmin(energy)) * _FRAME + _FRAME // 2
+
+def split_on_silence(audio: np.ndarray, chunk_sec: float, overlap_sec: float, search_sec: float = 10.0) -> list[tuple[int, int]]:
+    '''Split PCM audio into overlapping (start, end) sample ranges.
+
+    Each boundary is moved back to the quietest 20 ms frame within
+    `search_sec` before the nominal cut, so words are rarely split in half.
+
+    Args:
+        audio: Mono float32 PCM at 16 kHz.
+        chunk_sec: Target chunk length in seconds.
+        overlap_sec: Audio shared by neighbouring chunks, in seconds.
+        search_sec: How far back from the nominal cut to look for silence.
+
+    Returns:
+        A list of (start, end) sample indices covering the whole input.
+    '''
+
+    total = len(audio)
+    chunk = int(chunk_sec * SAMPLE_RATE)
+    overlap = int(overlap_sec * SAMPLE_RATE)
+    search = min(int(search_sec * SAMPLE_RATE), chunk // 4)
+    if total <= chunk:
+        return [(0, total)]
+
+    ranges, start = [], 0
+    while start < total:
+        end = start + chunk
+        if end >= total:
+            ranges.append((start, total))
+            break
+        end = _cut_point(audio, end, search)
+        ranges.append((start, end))
+        start = max(end - overlap, start + 1)
+    return ranges
+
+def iter_chunks(blocks: Iterable[np.ndarray], chunk_sec: float, overlap_sec: float, search_sec: float = 10.0) -> Iterator[np.ndarray]:
+    '''Cut a stream of PCM blocks into overlapping chunks as soon as each is complete.
+
+    Same boundary rules as split_on_silence(), but works incrementally so the
+    first chunk can be transcribed while the rest of the audio is still
+    arriving.
+    '''
+
+    chunk = int(chunk_sec * SAMPLE_RATE)
+    overlap = int(overlap_sec * SAMPLE_RATE)
+    search = min(int(search_sec * SAMPLE_RATE), chunk // 4)
+    buf = np.empty(0, dtype=np.float32)
+    carried = 0
+    for block in blocks:
+        buf = np.concatenate([buf, block])
+        while len(buf) > chunk:
+            end = _cut_point(buf, chunk, search)
+            yield buf[:end]
+            carried = min(overlap, end - 1)
+            buf = buf[end - carried:]
+    if len(buf) > carried:
+        yield buf
+
+def _norm(word: str) -> str:
+    return re.sub(r'\W+', '', word.lower())
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    '''Word error rate of `hypothesis` against `reference`.
+
+    (substitutions + deletions + insertions) / reference words, from the
+    word-level edit distance; case and punctuation are ignored.
+    '''
+
+    ref = [w for w in map(_norm, reference.split()) if w]
+    hyp = [w for w in map(_norm, hypothesis.split()) if w]
+    if not ref:
+        return float(bool(hyp))
+    previous = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, 1):
+        current = [i]
+        for j, other in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1] / len(ref)
+
+def stitch(texts: list[str], max_overlap_words: int = 40) -> str:
+    '''Join chunk transcripts, dropping words repeated across the overlap.
+
+    For each pair of neighbours the longest run of words that ends the left
+    text and starts the right text (compared case- and punctuation-insensitive)
+    is kept only once.
+    '''
+
+    merged: list[str] = []
+    for text in texts:
+        words = text.split()
+        if not merged:
+            merged.extend(words)
+            continue
+        left = [_norm(w) for w in merged[-max_overlap_words:]]
+        right = [_norm(w) for w in words[:max_overlap_words]]
+        skip = 0
+        for k in range(min(len(left), len(right)), 0, -1):
+            if left[-k:] == right[:k]:
+                skip = k
+                break
+        merged.extend(words[skip:])
+    return ' '.join(merged).strip()
+
+def init_worker(model_name: str, threads: int, backend: str = 'openai', interop_threads: int = 0,
+                cache_size: int = 2):
+    '''Pool initializer: pin torch threads and load the model once.
+
+    `cache_size` bounds the models this worker keeps (see _worker_model()).
+    '''
+
+    global _worker_model_name, _worker_backend, _worker_cache_size
+    configure_torch_threads(threads, interop_threads)
+    _worker_backend = get_backend(backend)
+    _worker_model_name, _worker_cache_size = model_name, max(1, cache_size)
+    _worker_model(model_name)
+
+def _worker_model(name: str | None = None):
+    '''Return this worker's model `name` (default: the preloaded one), loading it on first use.
+
+    The least recently used model is dropped once more than
+    `_worker_cache_size` are loaded.
+    '''
+
+    name = name or _worker_model_name
+    model = _worker_models.get(name)
+    if model is not None:
+        _worker_models.move_to_end(name)
+        return model
+    model = _worker_models[name] = _worker_backend.load(name)
+    while len(_worker_models) > _worker_cache_size:
+        _worker_models.popitem(last=False)
+    return model
+
+def _transcribe_chunk(audio: np.ndarray, options: dict, model_name: str) -> str:
+    return _worker_backend.transcribe(_worker_model(model_name), audio, options)
+
+def transcribe_file(audio_path: str, options: dict, model_name: str | None = None,
+                    vad: dict | None = None) -> tuple[str, float, float, float]:
+    '''Pool task: decode and transcribe a whole file with this worker's model.
+
+    Used by the Whisper stage of the staged pipeline (see pipeline.py), which
+    runs whole videos rather than chunks in its worker processes. A
+    `model_name` other than the preloaded one (e.g. chosen by a preset) is
+    loaded on first use and kept in the worker's LRU. With `vad` (options for
+    vad.trim_silence()) non-speech is dropped before transcription.
+
+    Returns:
+        (text, audio seconds, seconds spent in Whisper, speech seconds
+        transcribed).
+
+    Raises:
+        ValueError: If decoding or transcription fails.
+    '''
+
+    import whisper
+    try:
+        model = _worker_model(model_name)
+        audio = whisper.load_audio(audio_path)
+        speech = trim_silence(audio, **vad).audio if vad is not None else audio
+        started = time.perf_counter()
+        text = _worker_backend.transcribe(model, speech, options)
+    except Exception as e:
+        raise ValueError(f"Transcription failed: {e}")
+    return text, len(audio) / SAMPLE_RATE, time.perf_counter() - started, len(speech) / SAMPLE_RATE
+
+def get_pool(model_name: str, workers: int, backend: str = 'openai', threads: int = 0,
+             interop_threads: int = 0, cache_size: int = 2) -> ProcessPoolExecutor:
+    '''Return the reusable process pool for this worker configuration.
+
+    The pool is shared by all models: a new pool preloads `model_name`, and
+    tasks for other models load them into the workers' LRU of `cache_size`.
+    `threads` is the torch intra-op thread count per worker; 0 splits the
+    CPU cores evenly between the workers.
+    '''
+
+    key = (workers, backend, threads, interop_threads, cache_size)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(model_name, threads or max(1, (os.cpu_count() or 1) // workers), backend, interop_threads,
+                          cache_size),
+            )
+            _pools[key] = pool
+        return pool
+
+def discard_pool(pool: ProcessPoolExecutor):
+    '''Forget a broken pool, so the next get_pool() call starts a fresh one.'''
+
+    with _pools_lock:
+        for key, cached in list(_pools.items()):
+            if cached is pool:
+                del _pools[key]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_pools():
+    '''Stop all worker pools (e.g. at process exit or in tests).'''
+
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(cancel_futures=True)
+        _pools.clear()
+
+def transcribe_chunks(chunks: Iterable[np.ndarray], model_name: str, workers: int, options: dict | None = None,
+                      on_progress: Callable[[float], None] | None = None, backend: str = 'openai',
+                      threads: tuple[int, int] = (0, 0), cache_size: int = 2) -> str:
+    '''Transcribe PCM chunks on the process pool as they arrive and stitch the result.
+
+    Args:
+        chunks: Overlapping mono float32 chunks at 16 kHz, in order.
+        model_name: Whisper model for these chunks.
+        workers: Number of worker processes.
+        options: Extra keyword arguments for `model.transcribe()`.
+        on_progress: Optional callable receiving the seconds of audio
+            transcribed so far, called in this thread after each chunk.
+        backend: Whisper backend name (see whisper_backends.py).
+        threads: Torch (intra-op, inter-op) threads per worker; 0 = default.
+        cache_size: Max number of models each worker keeps loaded.
+
+    Returns:
+        The stitched transcript text.
+
+    Raises:
+        BrokenProcessPool: If a worker process died again after the pool
+            was rebuilt POOL_RETRIES times.
+    '''
+
+    pending: deque = deque()
+    texts: list[str] = []
+    done_sec = 0.0
+    restarts = 0
+
+    def restart(pool: ProcessPoolExecutor, error: BrokenProcessPool):
+        nonlocal restarts
+        if restarts >= POOL_RETRIES:
+            raise error
+        restarts += 1
+        logger.warning('A Whisper worker process died; restarting the pool.')
+        discard_pool(pool)
+
+    def submit(chunk: np.ndarray) -> tuple:
+        while True:
+            pool = get_pool(model_name, workers, backend, *threads, cache_size)
+            try:
+                return pool.submit(_transcribe_chunk, chunk, dict(options or {}), model_name), pool, chunk
+            except BrokenProcessPool as e:
+                restart(pool, e)
+
+    def drain(block: bool):
+        nonlocal done_sec
+        while pending and (block or pending[0][0].done()):
+            future, pool, chunk = pending[0]
+            try:
+                text = future.result()
+            except BrokenProcessPool as e:
+                restart(pool, e)
+                for index, (_, _, queued) in enumerate(pending):
+                    pending[index] = submit(queued)
+                continue
+            pending.popleft()
+            texts.append(text)
+            done_sec += len(chunk) / SAMPLE_RATE
+            if on_progress is not None:
+                on_progress(done_sec)
+
+    for chunk in chunks:
+        pending.append(submit(chunk))
+        drain(block=False)
+    drain(block=True)
+    return stitch(texts)
+
+def transcribe_parallel(audio: np.ndarray, model_name: str, workers: int, chunk_sec: float, overlap_sec: float,
+                        options: dict | None = None, on_progress: Callable[[float], None] | None = None,
+                        backend: str = 'openai', threads: tuple[int, int] = (0, 0), cache_size: int = 2) -> str:
+    '''Transcribe long PCM audio across a process pool and stitch the result.
+
+    Args:
+        audio: Mono float32 PCM at 16 kHz.
+        model_name: Whisper model for this audio.
+        workers: Number of worker processes.
+        chunk_sec: Target chunk length in seconds.
+        overlap_sec: Overlap between chunks in seconds.
+        options: Extra keyword arguments for `model.transcribe()`.
+        on_progress: See transcribe_chunks().
+        backend, threads, cache_size: See transcribe_chunks().
+
+    Returns:
+        The stitched transcript text.
+    '''
+
+    ranges = split_on_silence(audio, chunk_sec, overlap_sec)
+    return transcribe_chunks((audio[s:e] for s, e in ranges), model_name, workers, options, on_progress, backend, threads,
+                             cache_size)
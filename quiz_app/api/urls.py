@@ -1,7 +1,12 @@
 '''URL routes for the quiz API.
 
 Exposes:
-- POST /api/createQuiz/          -> CreateQuizView (runs yt-dlp → Whisper → Gemini)
+- POST /api/createQuiz/          -> CreateQuizView (queues a job, or runs yt-dlp → Whisper → Gemini)
+- GET  /api/jobs/<id>/           -> QuizJobDetailView (stage, progress and result of a job)
+- GET  /api/jobs/<id>/events/    -> QuizJobEventsView (Server-Sent Events stream of job progress)
+- POST /api/prefetch/            -> PrefetchView (warm the transcript cache for a URL)
+- GET/DELETE /api/prefetch/<id>/ -> PrefetchDetailView (state / cancel a prefetch)
+- GET  /api/metrics/             -> MetricsView (Prometheus metrics, admin only)
 - GET  /api/quizzes/             -> QuizzesListView (list own quizzes with questions)
 - GET  /api/quizzes/<id>/        -> QuizDetailView (retrieve a single quiz)
 - PUT  /api/quizzes/<id>/        -> QuizDetailView (full update of metadata)
@@ -13,10 +18,18 @@ These paths are typically included under the project-level '/api/' prefix, e.g.:
 '''
 
 from django.urls import path
-from .views import CreateQuizView, QuizzesListView, QuizDetailView
+from .views import (
+    CreateQuizView, MetricsView, PrefetchDetailView, PrefetchView, QuizJobDetailView, QuizJobEventsView,
+    QuizzesListView, QuizDetailView,
+)
 
 urlpatterns = [
     path('createQuiz/', CreateQuizView.as_view(), name='api-create-quiz'),
     path('quizzes/', QuizzesListView.as_view(),  name='api-quizzes'),
     path('quizzes/<int:id>/', QuizDetailView.as_view(),  name='api-quiz-detail'),
+    path('jobs/<int:id>/', QuizJobDetailView.as_view(), name='api-job-detail'),
+    path('jobs/<int:id>/events/', QuizJobEventsView.as_view(), name='api-job-events'),
+    path('prefetch/', PrefetchView.as_view(), name='api-prefetch'),
+    path('prefetch/<int:id>/', PrefetchDetailView.as_view(), name='api-prefetch-detail'),
+    path('metrics/', MetricsView.as_view(), name='api-metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,198 @@
+'''Energy-based voice activity detection: drop non-speech before Whisper.
+
+Lectures and podcasts contain long pauses, dead air and quiet intros.
+Whisper spends as much CPU on them as on speech and sometimes hallucinates
+text there, so the decoded 16 kHz PCM is trimmed first:
+
+- The audio is cut into 30 ms frames and each frame's RMS level is measured
+  in dBFS.
+- The speech threshold adapts to the recording: `margin_db` above its noise
+  floor (10th percentile of the frame levels), but never more than
+  `dynamic_range_db` below its loud parts (90th percentile), so a recording
+  without pauses keeps its quiet syllables. Frames below -60 dBFS are never
+  speech, and digital silence (below -90 dBFS) does not count towards the
+  noise floor.
+- Pauses shorter than `min_silence_sec` are kept (natural pauses between
+  sentences), blips shorter than `min_speech_sec` are dropped, and every
+  kept region is padded by `pad_sec` so word onsets and endings survive.
+- The kept regions are concatenated; the padding leaves a short gap between
+  them.
+
+If no frame of a whole file qualifies as speech (e.g. a very quiet
+recording), the file is kept as is rather than handing Whisper nothing.
+A stream (StreamTrimmer) is trimmed window by window with a threshold taken
+from the levels of all recent windows, so a window of pure dead air is
+dropped entirely.
+
+This is a level detector: loud music or noise counts as speech. It targets
+silence and near-silence, which is most of what long-form content wastes.
+
+This module never imports Django: Whisper pool workers use it as well.
+'''
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_SEC = 0.03
+FLOOR_DB = -60.0
+DIGITAL_SILENCE_DB = -90.0
+
+class VadResult:
+    '''Speech-only audio and the share of the input that was dropped.'''
+
+    def __init__(self, audio: np.ndarray, regions: list[tuple[int, int]], total_samples: int):
+        self.audio = audio
+        self.regions = regions
+        self.total_samples = total_samples
+
+    @property
+    def audio_sec(self) -> float:
+        return self.total_samples / SAMPLE_RATE
+
+    @property
+    def speech_sec(self) -> float:
+        return len(self.audio) / SAMPLE_RATE
+
+    @property
+    def skipped_fraction(self) -> float:
+        if not self.total_samples:
+            return 0.0
+        return max(0.0, 1.0 - len(self.audio) / self.total_samples)
+
+def frame_levels(audio: np.ndarray, frame: int) -> np.ndarray:
+    '''Return the RMS level in dBFS of each `frame`-sample frame (the last one may be shorter).'''
+
+    count = -(-len(audio) // frame)
+    padded = np.zeros(count * frame, dtype=np.float32)
+    padded[:len(audio)] = audio
+    power = np.square(padded.reshape(count, frame)).mean(axis=1)
+    if len(audio) % frame:
+        power[-1] *= frame / (len(audio) % frame)
+    return 10 * np.log10(power + 1e-12)
+
+def _runs(mask: np.ndarray) -> list[tuple[int, int]]:
+    '''(start, end) frame indices of the True runs in `mask`.'''
+
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+def speech_threshold(levels: np.ndarray, margin_db: float = 12.0, dynamic_range_db: float = 30.0) -> float:
+    '''Speech threshold in dBFS for a recording with the given frame levels.
+
+    Digital silence (frames below DIGITAL_SILENCE_DB) is left out of the
+    noise floor: it would pull the floor far below the actual background
+    noise.
+    '''
+
+    levels = levels[levels > DIGITAL_SILENCE_DB]
+    if not len(levels):
+        return FLOOR_DB
+    noise, loud = np.percentile(levels, [10, 90])
+    return max(FLOOR_DB, min(noise + margin_db, loud - dynamic_range_db))
+
+def speech_regions(audio: np.ndarray, margin_db: float = 12.0, dynamic_range_db: float = 30.0,
+                   min_silence_sec: float = 1.0, min_speech_sec: float = 0.2,
+                   pad_sec: float = 0.2, threshold: float | None = None) -> list[tuple[int, int]]:
+    '''Return the (start, end) sample ranges that contain speech.
+
+    Args:
+        audio: Mono float32 PCM at 16 kHz.
+        margin_db: Required level above the noise floor.
+        dynamic_range_db: Maximum distance of the threshold below the loud
+            parts of the recording.
+        min_silence_sec: Shorter pauses are kept.
+        min_speech_sec: Shorter sounds are dropped.
+        pad_sec: Audio kept before and after each region.
+        threshold: Speech threshold in dBFS to use instead of the one
+            derived from `audio` (see StreamTrimmer).
+
+    Returns:
+        Sorted, non-overlapping ranges; empty if nothing qualifies.
+    '''
+
+    frame = int(FRAME_SEC * SAMPLE_RATE)
+    if not len(audio):
+        return []
+    levels = frame_levels(audio, frame)
+    if threshold is None:
+        threshold = speech_threshold(levels, margin_db, dynamic_range_db)
+    runs = _runs(levels > threshold)
+
+    merged: list[list[int]] = []
+    gap = min_silence_sec / FRAME_SEC
+    for start, end in runs:
+        if merged and start - merged[-1][1] < gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    pad = int(pad_sec * SAMPLE_RATE)
+    regions: list[tuple[int, int]] = []
+    for start, end in merged:
+        if (end - start) * FRAME_SEC < min_speech_sec:
+            continue
+        start, end = max(0, start * frame - pad), min(len(audio), end * frame + pad)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+def trim_silence(audio: np.ndarray, **options) -> VadResult:
+    '''Drop non-speech from `audio` (see speech_regions() for the options).'''
+
+    regions = speech_regions(audio, **options)
+    if not regions:
+        return VadResult(audio, [(0, len(audio))], len(audio))
+    if len(regions) == 1 and regions[0] == (0, len(audio)):
+        return VadResult(audio, regions, len(audio))
+    trimmed = np.concatenate([audio[start:end] for start, end in regions])
+    return VadResult(trimmed, regions, len(audio))
+
+class StreamTrimmer:
+    '''Trim a stream of PCM blocks window by window and count what was dropped.
+
+    Each `window_sec` window is trimmed as soon as it is complete, so trimmed
+    audio keeps flowing while the stream is still being decoded. The speech
+    threshold comes from the frame levels of the last `history_sec` seconds
+    of the stream, not of the window alone, and a window without speech is
+    dropped: unlike trim_silence(), a silent window is not kept whole.
+    '''
+
+    def __init__(self, window_sec: float = 30.0, history_sec: float = 600.0, **options):
+        self.window = int(window_sec * SAMPLE_RATE)
+        self.options = options
+        self.total_samples = 0
+        self.kept_samples = 0
+        self._levels: deque = deque(maxlen=int(history_sec / FRAME_SEC))
+
+    @property
+    def skipped_fraction(self) -> float:
+        if not self.total_samples:
+            return 0.0
+        return max(0.0, 1.0 - self.kept_samples / self.total_samples)
+
+    def _trim(self, audio: np.ndarray) -> np.ndarray:
+        self._levels.extend(frame_levels(audio, int(FRAME_SEC * SAMPLE_RATE)).tolist())
+        threshold = speech_threshold(np.fromiter(self._levels, dtype=np.float64, count=len(self._levels)),
+                                     self.options.get('margin_db', 12.0), self.options.get('dynamic_range_db', 30.0))
+        regions = speech_regions(audio, **{**self.options, 'threshold': threshold})
+        kept = np.concatenate([audio[start:end] for start, end in regions]) if regions else audio[:0]
+        self.total_samples += len(audio)
+        self.kept_samples += len(kept)
+        return kept
+
+    def trim(self, blocks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        '''Yield the speech parts of `blocks`, one window at a time.'''
+
+        buf = np.empty(0, dtype=np.float32)
+        for block in blocks:
+            buf = np.concatenate([buf, block])
+            while len(buf) >= self.window:
+                yield self._trim(buf[:self.window])
+                buf = buf[self.window:]
+        if len(buf):
+            yield self._trim(buf)
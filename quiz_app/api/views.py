@@ -1,7 +1,13 @@
 '''Views for the quiz API.
 
 Exposes:
-- POST /api/createQuiz/          -> CreateQuizView (runs yt-dlp → Whisper → Gemini)
+- POST /api/createQuiz/          -> CreateQuizView (queues a job, or runs yt-dlp → Whisper → Gemini)
+- GET  /api/jobs/<id>/           -> QuizJobDetailView (stage, progress and result of a job)
+- GET  /api/jobs/<id>/events/    -> QuizJobEventsView (Server-Sent Events stream of job progress)
+- POST /api/prefetch/            -> PrefetchView (warm the transcript cache for a URL)
+- GET  /api/prefetch/<id>/       -> PrefetchDetailView (state of a prefetch)
+- DELETE /api/prefetch/<id>/     -> PrefetchDetailView (cancel a prefetch)
+- GET  /api/metrics/             -> MetricsView (Prometheus metrics, admin only)
 - GET  /api/quizzes/             -> QuizzesListView (list own quizzes with questions)
 - GET  /api/quizzes/<id>/        -> QuizDetailView (retrieve a single quiz)
 - PUT  /api/quizzes/<id>/        -> QuizDetailView (full update of metadata)
@@ -12,35 +18,57 @@ Notes:
 - All endpoints require authentication via cookie-based JWT (or Authorization header).
 - The service layer raises ValueError for expected client errors (mapped to 400),
   everything else bubbles up as 500 (with debug detail in DEBUG mode).
+- DependencyUnavailable (Gemini or YouTube down, see resilience.py) maps to
+  503 with a Retry-After header.
 '''
 
 from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.exceptions import NotFound, PermissionDenied
-from rest_framework.generics import ListAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.generics import ListAPIView, RetrieveAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from ..models import Quiz
-from .serializers import QuizSerializer, QuizUpdateSerializer, QuizPartialUpdateSerializer
+from ..models import Quiz, QuizJob
+from .events import EventStreamRenderer, iter_job_events, parse_event_id
+from .jobs import PrefetchLimitExceeded, cancel_job, enqueue_prefetch_job, enqueue_quiz_job
+from .metrics import collect, render_prometheus
+from .presets import preset_for
+from .resilience import DependencyUnavailable
+from .serializers import QuizJobSerializer, QuizSerializer, QuizUpdateSerializer, QuizPartialUpdateSerializer
 from .services import create_quiz_from_youtube
 
 class CreateQuizView(APIView):
-    '''Create a new quiz from a YouTube URL (full pipeline).
+    '''Create a new quiz from a YouTube URL.
 
     Endpoint:
         POST /api/createQuiz/
 
     Request body (JSON):
         - url: str (required) — any valid YouTube URL (watch/embed/short).
+        - preset: str (optional) — transcription preset: fast, balanced,
+          accurate or auto. Defaults to the preset of the user's group
+          (QUIZ_GROUP_PRESETS), else QUIZ_DEFAULT_PRESET.
+
+    With QUIZ_ASYNC_JOBS enabled (default) the pipeline runs in a background
+    worker (`manage.py run_quiz_worker`) and the response only acknowledges
+    the job; follow GET /api/jobs/<id>/events/ (or poll GET /api/jobs/<id>/)
+    for progress and the resulting quiz id.
+    Otherwise the full pipeline runs inside the request.
 
     Responses:
-        201: Returns the created quiz with nested questions.
-        400: For expected failures (invalid URL, unavailable video, missing FFmpeg,
+        202: Job queued; returns the job status (async mode).
+        201: Returns the created quiz with nested questions (sync mode).
+        400: For expected failures (invalid URL, unknown preset, unavailable video, missing FFmpeg,
              missing GEMINI_API_KEY, invalid LLM JSON, etc.).
+        503: Gemini or YouTube is temporarily unavailable (sync mode); see
+             the Retry-After header. Queued jobs wait for it instead.
         500: Unexpected server errors (shows exception text in DEBUG mode).
     '''
 
@@ -51,7 +79,16 @@ class CreateQuizView(APIView):
         if not url:
             return Response({'detail': "Missing 'url'."}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            quiz = create_quiz_from_youtube(url, owner=request.user, num_questions=10)
+            preset = preset_for(request.user, request.data.get('preset'))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if getattr(settings, 'QUIZ_ASYNC_JOBS', True):
+            return self._enqueue(request, url, preset)
+        try:
+            quiz = create_quiz_from_youtube(url, owner=request.user, num_questions=10, preset=preset)
+        except DependencyUnavailable as e:
+            return Response({'detail': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={'Retry-After': str(e.retry_after)})
         except ValueError as e:
             return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -59,6 +96,155 @@ class CreateQuizView(APIView):
                 return Response({'detail': f"Internal server error: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             return Response({'detail': 'Internal server error.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         return Response(QuizSerializer(quiz).data, status=status.HTTP_201_CREATED)
+
+    def _enqueue(self, request: Request, url: str, preset: str = '') -> Response:
+        '''Queue a background job and answer 202 with its status URL.'''
+
+        try:
+            job = enqueue_quiz_job(url, owner=request.user, num_questions=10, preset=preset)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        location = reverse('api-job-detail', kwargs={'id': job.id})
+        return Response(QuizJobSerializer(job).data, status=status.HTTP_202_ACCEPTED, headers={'Location': location})
+
+class QuizJobDetailView(RetrieveAPIView):
+    '''Report the state of a quiz-creation job.
+
+    Endpoint:
+        GET /api/jobs/<id>/
+
+    Permission rules:
+        - 404 if the job does not exist.
+        - 403 if the job exists but the current user is not the owner.
+    '''
+
+    serializer_class = QuizJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self) -> QuizJob:
+        try:
+            job = QuizJob.objects.get(pk=self.kwargs.get('id'))
+        except QuizJob.DoesNotExist:
+            raise NotFound('Job not found.')
+        if job.owner_id != self.request.user.id:
+            raise PermissionDenied('You do not have permission to access this job.')
+        return job
+
+class QuizJobEventsView(QuizJobDetailView):
+    '''Stream the progress of a quiz-creation job as Server-Sent Events.
+
+    Endpoint:
+        GET /api/jobs/<id>/events/
+
+    Emits 'stage', 'progress', 'downloaded', 'llm_started', 'llm_done', 'vad' and finally
+    'succeeded', 'failed' or 'cancelled' events whose data is the job JSON
+    (see events.py). A reconnecting client's `Last-Event-ID` header resumes
+    the stream after that event.
+
+    Permission rules:
+        - 404 if the job does not exist.
+        - 403 if the job exists but the current user is not the owner.
+    '''
+
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request: Request, *args, **kwargs) -> StreamingHttpResponse:
+        job = self.get_object()
+        response = StreamingHttpResponse(
+            iter_job_events(job.pk, parse_event_id(request.headers.get('Last-Event-ID'))),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class PrefetchView(APIView):
+    '''Start downloading and transcribing a video before the quiz is requested.
+
+    Endpoint:
+        POST /api/prefetch/
+
+    Request body (JSON):
+        - url: str (required) — any valid YouTube URL.
+        - preset: str (optional) — transcription preset, as for createQuiz;
+          use the same one there to hit the prefetched transcript.
+
+    A worker probes, downloads and transcribes the video into the transcript
+    cache; a later POST /api/createQuiz/ for it then only waits for Gemini.
+    Each user can have QUIZ_PREFETCH_MAX_ACTIVE prefetches queued or running.
+
+    Responses:
+        202: Prefetch queued; returns the job status (see /api/jobs/<id>/).
+        200: The same video is already being prefetched; returns that job.
+        400: Invalid URL or unknown preset.
+        429: Too many active prefetches.
+    '''
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request: Request) -> Response:
+        url = request.data.get('url', '').strip()
+        if not url:
+            return Response({'detail': "Missing 'url'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            job, created = enqueue_prefetch_job(url, request.user, preset_for(request.user, request.data.get('preset')))
+        except PrefetchLimitExceeded as e:
+            return Response({'detail': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        location = reverse('api-prefetch-detail', kwargs={'id': job.id})
+        return Response(QuizJobSerializer(job).data, headers={'Location': location},
+                        status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+
+class PrefetchDetailView(QuizJobDetailView):
+    '''Report or cancel a prefetch.
+
+    Endpoints:
+        GET /api/prefetch/<id>/
+        DELETE /api/prefetch/<id>/
+
+    Cancelling is cheap: a queued prefetch is never started, a running one
+    stops at its next progress report. Transcripts already cached stay.
+
+    Responses (DELETE):
+        204: Cancelled (also when it already was).
+        409: The prefetch has already finished.
+
+    Permission rules:
+        - 404 if the prefetch does not exist.
+        - 403 if it exists but the current user is not the owner.
+    '''
+
+    def get_object(self) -> QuizJob:
+        job = super().get_object()
+        if job.kind != QuizJob.KIND_PREFETCH:
+            raise NotFound('Prefetch not found.')
+        return job
+
+    def delete(self, request: Request, *args, **kwargs) -> Response:
+        if not cancel_job(self.get_object()):
+            return Response({'detail': 'Prefetch has already finished.'}, status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class MetricsView(APIView):
+    '''Expose pipeline metrics in the Prometheus text format.
+
+    Endpoint:
+        GET /api/metrics/
+
+    Includes this process's metrics merged with the snapshots published by
+    quiz workers (stage latencies, bytes downloaded, audio seconds, Whisper
+    real-time factor, retries).
+
+    Responses:
+        200: text/plain exposition.
+        401/403: If the user is not a staff member.
+    '''
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: Request) -> HttpResponse:
+        return HttpResponse(render_prometheus(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
     
 class QuizzesListView(ListAPIView):
     '''List all quizzes owned by the authenticated user.
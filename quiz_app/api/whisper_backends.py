@@ -0,0 +1,106 @@
+'''Whisper inference backends.
+
+Transcription goes through a small backend interface so deployments can trade
+accuracy for CPU time without touching the pipeline:
+
+- 'openai': the stock openai-whisper model (fp32 on CPU).
+- 'int8': the same checkpoint with its Linear layers dynamically quantized to
+  int8 (torch.ao.quantization.quantize_dynamic). CPU only; typically faster
+  and about a quarter of the Linear weight memory, at a small WER cost.
+  Measure both on your hardware with `manage.py benchmark_whisper`.
+
+Torch threading is configured with configure_torch_threads(): intra-op
+threads parallelize one matrix multiplication, inter-op threads run
+independent operators concurrently.
+
+This module never imports Django: pool worker processes (see
+transcription.init_worker) use it as well.
+'''
+
+import logging, warnings
+
+logger = logging.getLogger(__name__)
+
+class WhisperBackend:
+    '''Stock openai-whisper inference.'''
+
+    name = 'openai'
+
+    def load(self, model_name: str):
+        '''Load and return the model `model_name`.'''
+
+        import whisper
+        return whisper.load_model(model_name)
+
+    def decode_options(self, options: dict | None) -> dict:
+        '''Keyword arguments for `model.transcribe()`.'''
+
+        return dict(options or {})
+
+    def transcribe(self, model, audio, options: dict | None = None) -> str:
+        '''Transcribe a path or 16 kHz float32 PCM array and return the stripped text.'''
+
+        return model.transcribe(audio, **self.decode_options(options)).get('text', '').strip()
+
+class Int8Backend(WhisperBackend):
+    '''openai-whisper with int8 dynamically quantized Linear layers (CPU).'''
+
+    name = 'int8'
+
+    def load(self, model_name: str):
+        import whisper
+        return quantize_int8(whisper.load_model(model_name, device='cpu'))
+
+    def decode_options(self, options: dict | None) -> dict:
+        return {**(options or {}), 'fp16': False}
+
+BACKENDS = {backend.name: backend for backend in (WhisperBackend(), Int8Backend())}
+
+def get_backend(name: str) -> WhisperBackend:
+    '''Return the backend registered as `name`.
+
+    Raises:
+        ValueError: If there is no such backend.
+    '''
+
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown Whisper backend {name!r} (choose from {', '.join(BACKENDS)}).")
+
+def quantize_int8(model):
+    '''Return `model` with its Linear layers dynamically quantized to int8.
+
+    Whisper wraps its projections in a `whisper.model.Linear` subclass that
+    only adds dtype casting for fp16. quantize_dynamic() matches module types
+    exactly, so those layers are turned back into plain nn.Linear first (they
+    behave identically in fp32). Recent torch releases flag eager-mode
+    quantization as deprecated in favour of torchao; those warnings are
+    silenced here.
+    '''
+
+    import torch
+    from whisper.model import Linear
+
+    for module in model.modules():
+        if type(module) is Linear:
+            module.__class__ = torch.nn.Linear
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', (DeprecationWarning, UserWarning))
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def configure_torch_threads(intra: int = 0, inter: int = 0):
+    '''Set torch intra-op / inter-op thread counts (0 keeps torch's default).
+
+    Inter-op threads can only be set before torch starts parallel work;
+    later attempts are logged and ignored.
+    '''
+
+    import torch
+    if intra > 0:
+        torch.set_num_threads(intra)
+    if inter > 0 and torch.get_num_interop_threads() != inter:
+        try:
+            torch.set_num_interop_threads(inter)
+        except RuntimeError as e:
+            logger.warning('Cannot change torch inter-op threads to %s: %s', inter, e)
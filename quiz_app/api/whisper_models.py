@@ -0,0 +1,179 @@
+'''Process-wide registry of loaded Whisper models.
+
+Loading a Whisper checkpoint costs seconds of deserialization and hundreds of
+MB of allocation, so models are loaded once per process and kept in a small
+LRU keyed by model name. The configured model can be preloaded at worker boot
+(see preload_configured()) so the first request does not pay the load either.
+
+Whisper installs forward hooks on the shared model while decoding, so
+concurrent `transcribe()` calls on the same instance must not overlap.
+`use_model()` hands out the cached model together with its inference lock.
+
+Models are loaded through a backend (see whisper_backends.py); entries of
+non-default backends are cached as 'name:backend' (e.g. 'small:int8').
+
+Settings:
+- WHISPER_MODEL: default model name (e.g. 'small').
+- WHISPER_BACKEND: inference backend, 'openai' (default) or 'int8'.
+- WHISPER_TORCH_THREADS / WHISPER_TORCH_INTEROP_THREADS: torch intra-op /
+  inter-op threads, applied before the first load (0 = torch default).
+- WHISPER_MODEL_CACHE_SIZE: max number of models kept in memory (default 2).
+- WHISPER_PRELOAD: load WHISPER_MODEL when a transcribing process boots.
+- WHISPER_SHARE_WEIGHTS: 'fork' or 'shm' to share preloaded weights between
+  forked processes: `run_quiz_worker --processes N` children, or gunicorn
+  workers when QUIZ_ASYNC_JOBS is False (see memory.py and gunicorn.conf.py).
+'''
+
+import contextlib, threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .whisper_backends import WhisperBackend, configure_torch_threads, get_backend
+
+_registry_lock = threading.Lock()
+_models: 'OrderedDict[str, tuple[object, threading.Lock]]' = OrderedDict()
+_loading: dict[str, threading.Lock] = {}
+_threads_configured = False
+
+def default_model_name() -> str:
+    '''Return the configured Whisper model name.'''
+
+    return getattr(settings, 'WHISPER_MODEL', 'small')
+
+def default_backend() -> WhisperBackend:
+    '''Return the configured Whisper backend.'''
+
+    return get_backend(getattr(settings, 'WHISPER_BACKEND', 'openai'))
+
+def torch_threads() -> tuple[int, int]:
+    '''Configured (intra-op, inter-op) torch threads; 0 means torch's default.'''
+
+    return (int(getattr(settings, 'WHISPER_TORCH_THREADS', 0)),
+            int(getattr(settings, 'WHISPER_TORCH_INTEROP_THREADS', 0)))
+
+def _registry_key(name: str, backend: WhisperBackend) -> str:
+    return name if backend.name == 'openai' else f"{name}:{backend.name}"
+
+def _configure_threads():
+    global _threads_configured
+    if not _threads_configured:
+        configure_torch_threads(*torch_threads())
+        _threads_configured = True
+
+def cache_size() -> int:
+    '''Max number of Whisper models a process keeps loaded (WHISPER_MODEL_CACHE_SIZE).'''
+
+    return max(1, int(getattr(settings, 'WHISPER_MODEL_CACHE_SIZE', 2)))
+
+def _lookup(name: str):
+    '''Return the cached (model, lock) entry and mark it recently used.'''
+
+    entry = _models.get(name)
+    if entry is not None:
+        _models.move_to_end(name)
+    return entry
+
+def _get_entry(name: str, backend: WhisperBackend) -> tuple[object, threading.Lock]:
+    key = _registry_key(name, backend)
+    with _registry_lock:
+        entry = _lookup(key)
+        if entry is not None:
+            return entry
+        load_lock = _loading.setdefault(key, threading.Lock())
+
+    with load_lock:
+        with _registry_lock:
+            entry = _lookup(key)
+            if entry is not None:
+                return entry
+
+        _configure_threads()
+        model = backend.load(name)
+
+        with _registry_lock:
+            entry = (model, threading.Lock())
+            _models[key] = entry
+            while len(_models) > cache_size():
+                _models.popitem(last=False)
+            _loading.pop(key, None)
+        return entry
+
+def get_model(name: str | None = None, backend: WhisperBackend | None = None):
+    '''Return the Whisper model `name` for `backend`, loading it on first use.
+
+    Concurrent callers asking for the same model wait for a single load
+    instead of each deserializing their own copy.
+    '''
+
+    return _get_entry(name or default_model_name(), backend or default_backend())[0]
+
+@contextlib.contextmanager
+def use_model(name: str | None = None, backend: WhisperBackend | None = None):
+    '''Yield the cached model while holding its inference lock.'''
+
+    model, lock = _get_entry(name or default_model_name(), backend or default_backend())
+    with lock:
+        yield model
+
+def preload(names=None) -> list[str]:
+    '''Load the given model names (default: WHISPER_MODEL) into the registry.'''
+
+    names = list(names or [default_model_name()])
+    for name in names:
+        get_model(name)
+    return names
+
+def preload_configured(context: str, web: bool = False) -> list[str]:
+    '''Preload WHISPER_MODEL if WHISPER_PRELOAD or WHISPER_SHARE_WEIGHTS asks for it.
+
+    Called at boot by the processes that transcribe: quiz workers
+    (run_quiz_worker, before forking its children) and, with `web=True`,
+    the WSGI/ASGI application. Web processes only transcribe when
+    QUIZ_ASYNC_JOBS is False, so otherwise nothing is loaded there. With
+    'shm' the weights are moved into shared memory.
+
+    Args:
+        context: Label of the memory log line written after loading.
+        web: Whether the caller is a web server process.
+
+    Returns:
+        The preloaded model names (empty if nothing was preloaded).
+    '''
+
+    share = getattr(settings, 'WHISPER_SHARE_WEIGHTS', '')
+    if not (getattr(settings, 'WHISPER_PRELOAD', False) or share):
+        return []
+    if web and getattr(settings, 'QUIZ_ASYNC_JOBS', True):
+        return []
+    from .memory import log_memory
+    names = preload()
+    if share == 'shm':
+        share_weights()
+    log_memory(context)
+    return names
+
+def share_weights() -> list[str]:
+    '''Move the weights of all cached models into shared memory.
+
+    Forked processes then map the same physical pages even if one of them
+    writes to a tensor. Returns the registry keys of the shared models.
+    '''
+
+    with _registry_lock:
+        entries = list(_models.items())
+    for _key, (model, _lock) in entries:
+        model.share_memory()
+    return [key for key, _entry in entries]
+
+def loaded_models() -> list[str]:
+    '''Names of currently cached models, least recently used first.'''
+
+    with _registry_lock:
+        return list(_models)
+
+def clear():
+    '''Drop all cached models (used by tests and on memory pressure).'''
+
+    with _registry_lock:
+        _models.clear()
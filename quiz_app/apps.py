@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class QuizAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quiz_app'
+
+    def ready(self):
+        '''Validate WHISPER_SHARE_WEIGHTS.
+
+        The model itself is preloaded by the processes that transcribe (see
+        whisper_models.preload_configured()), not here, so other manage.py
+        commands do not load Whisper.
+        '''
+
+        share = getattr(settings, 'WHISPER_SHARE_WEIGHTS', '')
+        if share and share not in ('fork', 'shm'):
+            raise ImproperlyConfigured("WHISPER_SHARE_WEIGHTS must be '', 'fork' or 'shm'.")
@@ -0,0 +1,84 @@
+'''Management command: compare Whisper backends and thread counts on one clip.
+
+Usage:
+    python manage.py benchmark_whisper clip.wav --reference clip.txt
+        [--model small] [--backend openai] [--backend int8]
+        [--threads 2] [--threads 4] [--interop-threads 1] [--repeat 3]
+
+For every backend the model is loaded once, then the clip is transcribed
+`--repeat` times per thread count. The table reports load time, the best
+real-time factor (processing seconds per audio second; below 1 is faster
+than real time) and, with --reference, the word error rate against the
+reference transcript. 16 kHz mono 16-bit WAV clips are read directly; other
+formats are decoded with FFmpeg.
+'''
+
+import pathlib, time, wave
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz_app.api.transcription import SAMPLE_RATE, word_error_rate
+from quiz_app.api.whisper_backends import BACKENDS, configure_torch_threads, get_backend
+
+def load_clip(path: str) -> np.ndarray:
+    '''Return the clip as mono float32 PCM at 16 kHz.'''
+
+    if path.lower().endswith('.wav'):
+        with wave.open(path, 'rb') as clip:
+            if (clip.getframerate(), clip.getnchannels(), clip.getsampwidth()) == (SAMPLE_RATE, 1, 2):
+                frames = clip.readframes(clip.getnframes())
+                return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    import whisper
+    return whisper.load_audio(path)
+
+class Command(BaseCommand):
+    help = 'Measure real-time factor and word error rate of Whisper backends on a clip.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('clip', help='Audio clip to transcribe.')
+        parser.add_argument('--reference', help='Text file with the reference transcript (enables WER).')
+        parser.add_argument('--model', default=None, help='Whisper model name (default: WHISPER_MODEL).')
+        parser.add_argument('--backend', action='append', choices=sorted(BACKENDS),
+                            help='Backend to measure; repeat for several (default: all).')
+        parser.add_argument('--threads', action='append', type=int,
+                            help='Torch intra-op threads; repeat for several (default: torch default).')
+        parser.add_argument('--interop-threads', type=int, default=0, help='Torch inter-op threads.')
+        parser.add_argument('--repeat', type=int, default=1, help='Runs per setting; the fastest is reported.')
+        parser.add_argument('--language', default=None, help='Skip language detection, e.g. "en".')
+
+    def handle(self, *args, **options):
+        try:
+            audio = load_clip(options['clip'])
+            reference = pathlib.Path(options['reference']).read_text(encoding='utf-8') if options['reference'] else None
+        except Exception as e:
+            raise CommandError(f"Cannot read input: {e}")
+        audio_sec = len(audio) / SAMPLE_RATE
+        if not audio_sec:
+            raise CommandError('The clip is empty.')
+
+        model_name = options['model'] or getattr(settings, 'WHISPER_MODEL', 'small')
+        decode = {'language': options['language']} if options['language'] else {}
+        self.stdout.write(f"Clip: {audio_sec:.1f}s, model {model_name}")
+        self.stdout.write(f"{'backend':<8} {'threads':>7} {'load s':>7} {'RTF':>6} {'x real':>7} {'WER':>6}")
+
+        for name in options['backend'] or list(BACKENDS):
+            backend = get_backend(name)
+            started = time.perf_counter()
+            model = backend.load(model_name)
+            load_sec = time.perf_counter() - started
+            for threads in options['threads'] or [0]:
+                configure_torch_threads(threads, options['interop_threads'])
+                best, text = None, ''
+                for _ in range(max(1, options['repeat'])):
+                    started = time.perf_counter()
+                    text = backend.transcribe(model, audio, decode)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                rtf = best / audio_sec
+                wer = f"{word_error_rate(reference, text):.1%}" if reference is not None else '-'
+                self.stdout.write(
+                    f"{name:<8} {threads or 'auto':>7} {load_sec:>7.1f} {rtf:>6.3f} {1 / max(rtf, 1e-9):>6.1f}x {wer:>6}"
+                )
+            del model
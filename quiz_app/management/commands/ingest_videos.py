@@ -0,0 +1,91 @@
+'''Management command: create quizzes for many videos in one run.
+
+Usage:
+    python manage.py ingest_videos videos.txt --owner alice
+        [--num-questions 10] [--download-workers 2] [--transcribe-workers 1]
+        [--llm-workers 2] [--queue-size 4] [--no-whisper-processes]
+        [--preset fast|balanced|accurate|auto]
+
+The input file holds one YouTube video URL, video id, playlist URL or
+playlist id per line ('#' starts a comment). Download, transcription and
+quiz generation run as separate worker pools (see quiz_app/api/ingest.py);
+Whisper runs in its own worker processes unless --no-whisper-processes is
+given.
+Rerunning the same file after an interruption skips videos that already have
+a quiz for the owner. SIGINT/SIGTERM let running videos finish and mark the
+rest as not started. A throughput summary is printed at the end.
+'''
+
+import signal, threading
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz_app.api.ingest import STATUS_FAILED, STATUS_OK, expand_sources, read_sources, run_ingest, summary
+from quiz_app.api.presets import preset_for
+
+class Command(BaseCommand):
+    help = 'Generate quizzes for a list of YouTube videos or playlists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='File with one video/playlist URL or id per line.')
+        parser.add_argument('--owner', required=True, help='Username that will own the quizzes.')
+        parser.add_argument('--num-questions', type=int, default=10)
+        parser.add_argument('--download-workers', type=int, default=2,
+                            help='Parallel probes/downloads.')
+        parser.add_argument('--transcribe-workers', type=int, default=1,
+                            help='Whisper worker processes (each loads the model once).')
+        parser.add_argument('--llm-workers', type=int, default=2,
+                            help='Parallel Gemini calls.')
+        parser.add_argument('--queue-size', type=int, default=4,
+                            help='Videos buffered between two stages.')
+        parser.add_argument('--no-whisper-processes', action='store_true',
+                            help='Run Whisper in threads of this process instead of worker processes.')
+        parser.add_argument('--preset', default='',
+                            help='Transcription preset: fast, balanced, accurate or auto (default: QUIZ_DEFAULT_PRESET).')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['owner']!r} does not exist.")
+        try:
+            preset = preset_for(owner, options['preset'])
+            urls = expand_sources(read_sources(options['file']))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        stopping = []
+
+        def request_stop(signum, frame):
+            self.stdout.write('Stopping: finishing running videos...')
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        write_lock = threading.Lock()
+
+        def report(task):
+            url = task.item.url
+            if task.status == STATUS_OK:
+                line = self.style.SUCCESS(f"[ok] {url} -> quiz #{task.item.quiz.id}")
+            elif task.status == STATUS_FAILED:
+                line = self.style.ERROR(f"[failed] {url}: {task.error}")
+            else:
+                line = f"[{task.status}] {url}"
+            with write_lock:
+                self.stdout.write(line)
+
+        self.stdout.write(f"Ingesting {len(urls)} video(s) for {owner.username}.")
+        result = run_ingest(
+            urls, owner, num_questions=options['num_questions'],
+            workers={
+                'prepare': options['download_workers'],
+                'transcribe': options['transcribe_workers'],
+                'generate': options['llm_workers'],
+            },
+            queue_size=options['queue_size'], on_item=report, should_stop=lambda: bool(stopping),
+            whisper_processes=not options['no_whisper_processes'], preset=preset,
+        )
+        self.stdout.write(summary(result))
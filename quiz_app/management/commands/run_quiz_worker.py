@@ -0,0 +1,102 @@
+'''Management command: process queued quiz-creation jobs.
+
+Usage:
+    python manage.py run_quiz_worker [--poll-interval 2] [--once] [--worker-id ID] [--pipelined] [--processes N]
+
+Run one or more of these next to the web server. Each worker leases one job
+at a time from the QuizJob table; SIGTERM/SIGINT finish the current job and
+then stop the loop, and a killed worker's job is retried by another worker
+once its lease expires.
+
+With --pipelined (or QUIZ_WORKER_PIPELINED=True) the worker keeps several
+jobs in flight, with separate pools for downloads, Whisper and Gemini (see
+quiz_app/api/jobs.py, work_pipelined).
+
+With --processes N (or QUIZ_WORKER_PROCESSES) the command preloads Whisper
+(if WHISPER_PRELOAD or WHISPER_SHARE_WEIGHTS is set), then forks N worker
+processes. With WHISPER_SHARE_WEIGHTS they share one copy of the weights
+(see quiz_app/api/memory.py). Pipelined workers run Whisper in spawned
+processes of their own, which load their own model and share nothing.
+'''
+
+import os, signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from quiz_app.api.jobs import default_worker_id, work, work_pipelined
+from quiz_app.api.memory import freeze_for_fork
+from quiz_app.api.whisper_models import preload_configured
+
+class Command(BaseCommand):
+    help = 'Lease and run queued quiz-creation jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait between polls when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit as soon as the queue is empty.')
+        parser.add_argument('--worker-id', default=None,
+                            help='Lease owner name (defaults to host:pid:random).')
+        parser.add_argument('--pipelined', action='store_true',
+                            help='Run several jobs at once with one pool per stage.')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Number of forked worker processes sharing the preloaded model.')
+
+    def handle(self, *args, **options):
+        processes = options['processes'] or int(getattr(settings, 'QUIZ_WORKER_PROCESSES', 1))
+        preload_configured('Quiz worker preloaded Whisper:')
+        if processes <= 1:
+            return self._run(options['worker_id'] or default_worker_id(), options)
+
+        freeze_for_fork()
+        connections.close_all()
+        children = []
+        for index in range(processes):
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    worker_id = f"{options['worker_id']}-{index + 1}" if options['worker_id'] else default_worker_id()
+                    self._run(worker_id, options)
+                    code = 0
+                finally:
+                    os._exit(code)
+            children.append(pid)
+
+        def forward(signum, frame):
+            for child in children:
+                try:
+                    os.kill(child, signum)
+                except ProcessLookupError:
+                    pass
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        self.stdout.write(f"Started {processes} quiz worker processes.")
+        failed = 0
+        for child in children:
+            _pid, status = os.waitpid(child, 0)
+            failed += os.waitstatus_to_exitcode(status) != 0
+        if failed:
+            self.stderr.write(f"{failed} quiz worker process(es) exited with an error.")
+
+    def _run(self, worker_id: str, options: dict):
+        '''Run one worker loop in this process until the queue is empty (--once) or a stop signal.'''
+
+        stopping = []
+
+        def request_stop(signum, frame):
+            self.stdout.write('Stopping after the current job...')
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.stdout.write(f"Quiz worker {worker_id} started.")
+        pipelined = options['pipelined'] or getattr(settings, 'QUIZ_WORKER_PIPELINED', False)
+        loop = work_pipelined if pipelined else work
+        processed = loop(worker_id, poll_interval=options['poll_interval'],
+                         once=options['once'], should_stop=lambda: bool(stopping))
+        self.stdout.write(self.style.SUCCESS(f"Quiz worker {worker_id} stopped after {processed} job(s)."))
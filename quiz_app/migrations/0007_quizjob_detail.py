@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0006_metricssnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizjob',
+            name='detail',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0007_quizjob_detail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizjob',
+            name='preset',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+    ]
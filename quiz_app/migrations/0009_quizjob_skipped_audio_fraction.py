@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0008_quizjob_preset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizjob',
+            name='skipped_audio_fraction',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0009_quizjob_skipped_audio_fraction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizjob',
+            name='kind',
+            field=models.CharField(choices=[('quiz', 'Quiz'), ('prefetch', 'Prefetch')], default='quiz', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='quizjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], db_index=True, default='queued', max_length=16),
+        ),
+    ]
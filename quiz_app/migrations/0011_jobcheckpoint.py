@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0010_quizjob_kind_cancelled'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(max_length=16)),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='quiz_app.quizjob')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('job', 'stage'), name='unique_job_checkpoint')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0011_jobcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizjob',
+            name='not_before',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0013_quizjobevent'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='generatedquiz',
+            name='quiz_app_ge_video_i_c8cfe4_idx',
+        ),
+        migrations.AddField(
+            model_name='generatedquiz',
+            name='transcript_key',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='generatedquiz',
+            index=models.Index(fields=['video_id', 'num_questions', 'prompt_version', 'transcript_key'], name='quiz_app_ge_video_i_b43d63_idx'),
+        ),
+    ]
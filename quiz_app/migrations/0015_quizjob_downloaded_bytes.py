@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0014_generatedquiz_transcript_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizjob',
+            name='downloaded_bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -3,6 +3,12 @@
 Models:
 - Quiz: A quiz owned by a user and linked to a YouTube video.
 - Question: A single multiple-choice question belonging to a quiz.
+- Transcript: A cached video transcript shared across users.
+- GeneratedQuiz: A cached LLM quiz payload that can be cloned for new owners.
+- QuizJob: A durable, leasable background job running the quiz pipeline.
+- JobCheckpoint: The saved output of one completed stage of a job.
+- PipelineLock: A cross-process lock row used to coalesce duplicate work.
+- MetricsSnapshot: The latest pipeline metrics of one worker process.
 
 Notes:
 - Questions are accessible from a quiz via the reverse relation 'questions'
@@ -51,4 +57,184 @@ class Question(models.Model):
         if not isinstance(self.question_options, list) or len(self.question_options) != 4:
             raise ValueError('question_options must be a list of exactly 4 items.')
         if self.answer not in self.question_options:
-            raise ValueError('answer must be one of question_options.')
\ No newline at end of file
+            raise ValueError('answer must be one of question_options.')
+
+class Transcript(models.Model):
+    '''A cached transcript, keyed by video, transcription model and options.
+
+    `model_name` is the Whisper model name, or 'captions' for transcripts
+    taken from YouTube subtitles. `options_key` is a hash of the options that
+    influence the text (decoding options, caption languages).
+    '''
+
+    video_id = models.CharField(max_length=11)
+    model_name = models.CharField(max_length=64)
+    options_key = models.CharField(max_length=64)
+    text = models.TextField()
+    size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['video_id', 'model_name', 'options_key'], name='unique_transcript_key'),
+        ]
+
+    def __str__(self) -> str:
+        '''Readable representation used in admin and logs.'''
+
+        return f"{self.video_id} [{self.model_name}]"
+
+
+class GeneratedQuiz(models.Model):
+    '''A quiz payload as returned by the LLM, reusable for identical requests.
+
+    Keyed by video, question count, prompt version and transcript key (the
+    Whisper model and options that would produce the transcript), so changing
+    the prompt or decoding preset stops older payloads from being reused.
+    '''
+
+    video_id = models.CharField(max_length=11)
+    num_questions = models.PositiveIntegerField()
+    prompt_version = models.CharField(max_length=64)
+    transcript_key = models.CharField(max_length=100, default='')
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['video_id', 'num_questions', 'prompt_version', 'transcript_key'])]
+
+    def __str__(self) -> str:
+        '''Readable representation used in admin and logs.'''
+
+        return f"{self.video_id} x{self.num_questions} [{self.prompt_version}]"
+
+
+class QuizJob(models.Model):
+    '''A queued quiz-creation job, processed by `manage.py run_quiz_worker`.
+
+    Workers lease a job by setting `lease_owner` and `lease_expires_at`; a job
+    whose lease runs out while 'running' (e.g. the worker was killed) is
+    picked up again by another worker. A job requeued during an outage of
+    Gemini or YouTube is not leased again before `not_before`. Prefetch jobs
+    (POST /api/prefetch/) only fill the transcript cache and create no quiz.
+    '''
+
+    KIND_QUIZ = 'quiz'
+    KIND_PREFETCH = 'prefetch'
+    KIND_CHOICES = [
+        (KIND_QUIZ, 'Quiz'),
+        (KIND_PREFETCH, 'Prefetch'),
+    ]
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_CANCELLED, 'Cancelled'),
+    ]
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_jobs')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=KIND_QUIZ)
+    video_url = models.URLField()
+    num_questions = models.PositiveIntegerField(default=10)
+    preset = models.CharField(max_length=16, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    stage = models.CharField(max_length=32, default='queued')
+    progress = models.FloatField(default=0.0)
+    detail = models.JSONField(default=dict, blank=True)
+    skipped_audio_fraction = models.FloatField(null=True, blank=True)
+    downloaded_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    quiz = models.ForeignKey(Quiz, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    lease_owner = models.CharField(max_length=128, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    not_before = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        '''Readable representation used in admin and logs.'''
+
+        return f"Job #{self.id} {self.status} ({self.video_url})"
+
+
+class QuizJobEvent(models.Model):
+    '''One entry of a job's append-only progress log (see api/events.py).
+
+    The id is the SSE event id: ids only grow, so a reconnecting client
+    resumes after the last one it saw. `data` is the job JSON at the time
+    of the event.
+    '''
+
+    job = models.ForeignKey(QuizJob, on_delete=models.CASCADE, related_name='events')
+    event = models.CharField(max_length=32)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        '''Readable representation used in admin and logs.'''
+
+        return f"Job #{self.job_id} {self.event} #{self.id}"
+
+
+class JobCheckpoint(models.Model):
+    '''Output of a completed pipeline stage of a job (see api/checkpoints.py).
+
+    `stage` is 'probe' (yt-dlp info dict), 'audio' (path of the downloaded
+    file), 'transcript' or 'llm' (the quiz payload returned by Gemini).
+    '''
+
+    job = models.ForeignKey(QuizJob, on_delete=models.CASCADE, related_name='checkpoints')
+    stage = models.CharField(max_length=16)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'stage'], name='unique_job_checkpoint'),
+        ]
+
+    def __str__(self) -> str:
+        '''Readable representation used in admin and logs.'''
+
+        return f"Job #{self.job_id} {self.stage}"
+
+
+class PipelineLock(models.Model):
+    '''A named lock shared by all worker processes (see api/singleflight.py).
+
+    The row exists while one process is doing the work for `key`; it expires
+    at `expires_at` so a crashed holder cannot block others forever.
+    '''
+
+    key = models.CharField(max_length=255, unique=True)
+    owner = models.CharField(max_length=128)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        '''Readable representation used in admin and logs.'''
+
+        return f"{self.key} ({self.owner})"
+
+
+class MetricsSnapshot(models.Model):
+    '''Serialized metrics registry of a worker process (see api/metrics.py).'''
+
+    process_id = models.CharField(max_length=128, unique=True)
+    payload = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self) -> str:
+        '''Readable representation used in admin and logs.'''
+
+        return f"Metrics of {self.process_id}"
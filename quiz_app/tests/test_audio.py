@@ -0,0 +1,80 @@
+'''Tests for streaming audio ingestion helpers.
+
+Covers:
+- pick_audio_format() takes the smallest audio-only format meeting the
+  bitrate floor and degrades sensibly when none does.
+- select_audio_stream() picks a progressive audio-only format and returns
+  None when only fragmented or muxed formats exist.
+- iter_pcm() turns ffmpeg's f32le stdout into float32 blocks.
+'''
+
+import io
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from quiz_app.api.audio import iter_pcm, pick_audio_format, select_audio_stream
+
+FORMATS = [
+    {'format_id': '18', 'vcodec': 'avc1', 'acodec': 'mp4a', 'tbr': 500},
+    {'format_id': '249', 'vcodec': 'none', 'acodec': 'opus', 'abr': 50},
+    {'format_id': '250', 'vcodec': 'none', 'acodec': 'opus', 'abr': 70},
+    {'format_id': '251', 'vcodec': 'none', 'acodec': 'opus', 'abr': 160},
+]
+
+class PickAudioFormatTests(SimpleTestCase):
+    '''Tests for pick_audio_format().'''
+
+    def test_smallest_above_floor(self):
+        '''The cheapest audio-only format that meets the floor wins.'''
+
+        self.assertEqual(pick_audio_format(FORMATS, min_abr=60)['format_id'], '250')
+
+    def test_floor_too_high_uses_best_audio_only(self):
+        '''If nothing meets the floor, the best audio-only format is used.'''
+
+        self.assertEqual(pick_audio_format(FORMATS, min_abr=500)['format_id'], '251')
+
+    def test_muxed_fallback(self):
+        '''Without audio-only formats the smallest muxed format is used.'''
+
+        self.assertEqual(pick_audio_format(FORMATS[:1], min_abr=48)['format_id'], '18')
+
+class SelectAudioStreamTests(SimpleTestCase):
+    '''Tests for select_audio_stream().'''
+
+    def test_picks_progressive_audio_only(self):
+        '''Muxed and DASH-fragmented formats are ignored.'''
+
+        info = {'formats': [
+            {'format_id': '18', 'url': 'u18', 'protocol': 'https', 'vcodec': 'avc1', 'acodec': 'mp4a', 'tbr': 500},
+            {'format_id': '251d', 'url': 'u251d', 'protocol': 'http_dash_segments', 'vcodec': 'none', 'acodec': 'opus', 'abr': 160},
+            {'format_id': '140', 'url': 'u140', 'protocol': 'https', 'vcodec': 'none', 'acodec': 'mp4a', 'abr': 129},
+        ]}
+        self.assertEqual(select_audio_stream(info)['format_id'], '140')
+
+    def test_none_without_streamable_format(self):
+        '''No progressive audio-only stream means no streaming.'''
+
+        info = {'formats': [{'url': 'u', 'protocol': 'm3u8_native', 'vcodec': 'none', 'acodec': 'mp4a'}]}
+        self.assertIsNone(select_audio_stream(info))
+
+class IterPcmTests(SimpleTestCase):
+    '''Tests for iter_pcm().'''
+
+    @patch('quiz_app.api.audio.subprocess.Popen')
+    def test_yields_float32_blocks(self, mock_popen):
+        '''ffmpeg output is decoded into float32 samples in order.'''
+
+        samples = np.arange(10, dtype=np.float32)
+        proc = MagicMock()
+        proc.stdout = io.BytesIO(samples.tobytes())
+        proc.stderr = io.BytesIO(b'')
+        proc.wait.return_value = 0
+        proc.poll.return_value = 0
+        mock_popen.return_value = proc
+
+        blocks = list(iter_pcm({'url': 'u', 'http_headers': {'User-Agent': 'x'}}, block_sec=3 / 16000))
+        np.testing.assert_array_equal(np.concatenate(blocks), samples)
+        self.assertIn('-headers', mock_popen.call_args[0][0])
@@ -0,0 +1,92 @@
+'''Tests for the caption-first transcript source.
+
+Covers:
+- Track selection prefers uploaded subtitles, preferred languages and VTT,
+  and ignores machine-translated automatic tracks.
+- VTT and srv XML payloads convert to plain text.
+- obtain_transcript() skips download/transcription when captions exist and
+  falls back to Whisper when they do not.
+'''
+
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from quiz_app.api import services
+from quiz_app.api.captions import pick_caption_track, srv_to_text, vtt_to_text
+
+VTT = '''WEBVTT
+Kind: captions
+Language: en
+
+00:00:00.000 --> 00:00:02.000 align:start position:0%
+Hello <c.colorE5E5E5>and</c> welcome
+
+00:00:02.000 --> 00:00:04.000
+Hello and welcome
+to the lecture &amp; more
+'''
+
+SRV3 = '<timedtext format="3"><body><p t="0" d="10">Hello <s>there</s></p><p t="10" d="5">General &amp; Kenobi</p></body></timedtext>'
+
+@override_settings(QUIZ_CAPTION_LANGUAGES=['en'])
+class PickCaptionTrackTests(SimpleTestCase):
+    '''Tests for pick_caption_track().'''
+
+    def test_uploaded_subtitles_preferred(self):
+        '''Uploaded subtitles win over automatic captions.'''
+
+        info = {
+            'subtitles': {'en-US': [{'ext': 'srv3', 'url': 'u-srv3'}, {'ext': 'vtt', 'url': 'u-vtt'}]},
+            'automatic_captions': {'en': [{'ext': 'vtt', 'url': 'a-vtt'}]},
+        }
+        self.assertEqual(pick_caption_track(info)['url'], 'u-vtt')
+
+    def test_translated_auto_captions_ignored(self):
+        '''Auto tracks translated from another language are skipped.'''
+
+        info = {'language': 'de', 'automatic_captions': {
+            'en': [{'ext': 'vtt', 'url': 'https://x/api?tlang=en'}],
+            'de-orig': [{'ext': 'vtt', 'url': 'https://x/api?lang=de'}],
+        }}
+        self.assertEqual(pick_caption_track(info)['url'], 'https://x/api?lang=de')
+
+    def test_no_tracks(self):
+        '''Returns None when the video has no captions.'''
+
+        self.assertIsNone(pick_caption_track({}))
+
+class CaptionConversionTests(SimpleTestCase):
+    '''Tests for the VTT/srv converters.'''
+
+    def test_vtt_to_text(self):
+        '''Timings, tags and rolling duplicates are removed.'''
+
+        self.assertEqual(vtt_to_text(VTT), 'Hello and welcome to the lecture & more')
+
+    def test_srv_to_text(self):
+        '''Nested spans and entities are flattened.'''
+
+        self.assertEqual(srv_to_text(SRV3), 'Hello there General & Kenobi')
+
+@override_settings(QUIZ_CAPTIONS_FIRST=True)
+class ObtainTranscriptTests(TestCase):
+    '''Tests for services.obtain_transcript().'''
+
+    @patch('quiz_app.api.services.transcribe_audio')
+    @patch('quiz_app.api.services.download_audio')
+    @patch('quiz_app.api.services.fetch_captions', return_value='caption text')
+    def test_captions_skip_whisper(self, _captions, mock_download, mock_transcribe):
+        '''Good captions short-circuit download and transcription.'''
+
+        self.assertEqual(services.obtain_transcript('https://www.youtube.com/watch?v=AAAAAAAAAAA', {}), 'caption text')
+        mock_download.assert_not_called()
+        mock_transcribe.assert_not_called()
+
+    @patch('quiz_app.api.services.transcribe_audio', return_value='whisper text')
+    @patch('quiz_app.api.services.download_audio', return_value='/nonexistent/audio.m4a')
+    @patch('quiz_app.api.services.fetch_captions', return_value=None)
+    def test_fallback_to_whisper(self, _captions, _download, _transcribe):
+        '''Without captions the audio is downloaded and transcribed.'''
+
+        self.assertEqual(services.obtain_transcript('https://www.youtube.com/watch?v=AAAAAAAAAAA', {}), 'whisper text')
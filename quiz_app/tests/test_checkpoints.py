@@ -0,0 +1,135 @@
+'''Tests for per-job stage checkpoints.
+
+Covers:
+- A job requeued after a Gemini failure resumes without probing,
+  downloading or transcribing again; checkpoints and the audio file are
+  gone once it succeeds.
+- A failed transcription keeps the downloaded audio for the next attempt.
+- A new job for a failed quiz adopts the failed job's checkpoints.
+- collect_garbage() drops expired checkpoints (and their audio files) and
+  those of succeeded jobs.
+
+Notes:
+- Probe, download, Whisper and Gemini are patched; the "audio file" is a
+  real temporary file so its lifetime can be checked.
+'''
+
+import pathlib, tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from quiz_app.api import checkpoints
+from quiz_app.api.jobs import enqueue_quiz_job, lease_next_job, run_job
+from quiz_app.models import JobCheckpoint, QuizJob
+
+QUIZ = {
+    'title': 'T',
+    'description': 'D',
+    'questions': [
+        {'question_title': 'Q1', 'question_options': ['A', 'B', 'C', 'D'], 'answer': 'A'},
+        {'question_title': 'Q2', 'question_options': ['A', 'B', 'C', 'D'], 'answer': 'B'},
+    ],
+}
+URL = 'https://youtu.be/AAAAAAAAAAA'
+
+def audio_file() -> str:
+    with tempfile.NamedTemporaryFile(suffix='.m4a', delete=False) as f:
+        f.write(b'audio')
+    return f.name
+
+@override_settings(QUIZ_CAPTIONS_FIRST=False, QUIZ_STREAMING_AUDIO=False, QUIZ_JOB_MAX_ATTEMPTS=3)
+@patch('quiz_app.api.services.generate_quiz_with_gemini')
+@patch('quiz_app.api.services.transcribe_audio', return_value='spoken text')
+@patch('quiz_app.api.services.download_audio')
+@patch('quiz_app.api.services.ensure_video_available', return_value={'id': 'AAAAAAAAAAA', 'duration': 600})
+class ResumeTests(TestCase):
+    '''Tests for resuming quiz jobs from their checkpoints.'''
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='u1', password='Abc123')
+
+    def _attempt(self) -> QuizJob:
+        return run_job(lease_next_job('w1'), 'w1')
+
+    def test_resume_after_gemini_failure(self, mock_probe, mock_download, mock_whisper, mock_gemini):
+        '''The second attempt only calls Gemini.'''
+
+        path = audio_file()
+        mock_download.return_value = path
+        mock_gemini.side_effect = [RuntimeError('upstream 500'), QUIZ]
+        enqueue_quiz_job(URL, self.owner, num_questions=2)
+
+        job = self._attempt()
+        self.assertEqual(job.status, QuizJob.STATUS_QUEUED)
+        self.assertEqual(set(job.checkpoints.values_list('stage', flat=True)), {'probe', 'transcript'})
+
+        job = self._attempt()
+        self.assertEqual(job.status, QuizJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.quiz.questions.count(), 2)
+        self.assertEqual((mock_probe.call_count, mock_download.call_count, mock_whisper.call_count), (1, 1, 1))
+        self.assertEqual(mock_gemini.call_args.args[0], 'spoken text')
+        self.assertFalse(JobCheckpoint.objects.exists())
+        self.assertFalse(pathlib.Path(path).exists())
+
+    def test_audio_kept_when_whisper_fails(self, mock_probe, mock_download, mock_whisper, mock_gemini):
+        '''The downloaded file survives a failed transcription and is not downloaded again.'''
+
+        path = audio_file()
+        self.addCleanup(pathlib.Path(path).unlink, missing_ok=True)
+        mock_download.return_value = path
+        mock_whisper.side_effect = [RuntimeError('killed'), 'spoken text']
+        mock_gemini.return_value = QUIZ
+        enqueue_quiz_job(URL, self.owner, num_questions=2)
+
+        job = self._attempt()
+        self.assertEqual(job.status, QuizJob.STATUS_QUEUED)
+        self.assertTrue(pathlib.Path(path).exists())
+        self.assertEqual(job.checkpoints.get(stage='audio').data, {'path': path})
+
+        job = self._attempt()
+        self.assertEqual(job.status, QuizJob.STATUS_SUCCEEDED)
+        self.assertEqual(mock_download.call_count, 1)
+        self.assertEqual(mock_whisper.call_args.args[0], path)
+        self.assertFalse(pathlib.Path(path).exists())
+
+    def test_new_job_adopts_failed_checkpoints(self, mock_probe, mock_download, mock_whisper, mock_gemini):
+        '''Resubmitting a failed quiz continues where the failed job stopped.'''
+
+        mock_download.return_value = audio_file()
+        mock_gemini.side_effect = [ValueError('LLM returned invalid JSON.'), QUIZ]
+        enqueue_quiz_job(URL, self.owner, num_questions=2)
+        self.assertEqual(self._attempt().status, QuizJob.STATUS_FAILED)
+
+        retry = enqueue_quiz_job(URL, self.owner, num_questions=2)
+        self.assertEqual(set(retry.checkpoints.values_list('stage', flat=True)), {'probe', 'transcript'})
+        self.assertEqual(self._attempt().status, QuizJob.STATUS_SUCCEEDED)
+        self.assertEqual((mock_probe.call_count, mock_whisper.call_count), (1, 1))
+
+class GarbageCollectionTests(TestCase):
+    '''Tests for checkpoints.collect_garbage().'''
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='u1', password='Abc123')
+
+    @override_settings(QUIZ_CHECKPOINT_TTL_SEC=3600)
+    def test_expired_and_succeeded(self):
+        '''Expired checkpoints lose their audio file; active jobs keep fresh ones.'''
+
+        path = audio_file()
+        self.addCleanup(pathlib.Path(path).unlink, missing_ok=True)
+        failed = QuizJob.objects.create(owner=self.owner, video_url=URL, status=QuizJob.STATUS_FAILED)
+        done = QuizJob.objects.create(owner=self.owner, video_url=URL, status=QuizJob.STATUS_SUCCEEDED)
+        running = QuizJob.objects.create(owner=self.owner, video_url=URL, status=QuizJob.STATUS_RUNNING)
+        checkpoints.JobCheckpoints(failed).save('audio', {'path': path})
+        JobCheckpoint.objects.filter(job=failed).update(created_at=timezone.now() - timedelta(hours=2))
+        checkpoints.JobCheckpoints(done).save('transcript', {'text': 't'})
+        checkpoints.JobCheckpoints(running).save('transcript', {'text': 't'})
+
+        self.assertIsNone(checkpoints.JobCheckpoints(failed).load('audio'))
+        self.assertEqual(checkpoints.collect_garbage(), 2)
+        self.assertFalse(pathlib.Path(path).exists())
+        self.assertEqual(list(JobCheckpoint.objects.values_list('job_id', flat=True)), [running.pk])
@@ -1,8 +1,8 @@
 '''API tests for creating a quiz from a YouTube URL.
 
 Covers:
-- Happy path: POST /api/createQuiz/ returns 201 and the serialized quiz,
-  with nested questions. The expensive pipeline is mocked.
+- Happy path (sync mode): POST /api/createQuiz/ returns 201 and the
+  serialized quiz, with nested questions. The expensive pipeline is mocked.
 - Validation: Missing 'url' in request body -> 400 Bad Request.
 
 Notes:
@@ -12,6 +12,7 @@ Notes:
 '''
 
 from django.contrib.auth.models import User
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -28,6 +29,7 @@ class CreateQuizTests(APITestCase):
         self.client.force_authenticate(self.user)
         self.url = reverse('api-create-quiz')
 
+    @override_settings(QUIZ_ASYNC_JOBS=False)
     @patch('quiz_app.api.views.create_quiz_from_youtube')
     def test_create_quiz_success(self, mock_create):
         '''Successful creation returns 201 and includes nested questions.'''
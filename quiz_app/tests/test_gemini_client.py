@@ -0,0 +1,109 @@
+'''Tests for the pooled Gemini client.
+
+Covers:
+- One client per API key is created and reused across calls.
+- The client is configured with keep-alive connection limits.
+- agenerate_quiz_with_gemini() never exceeds QUIZ_GEMINI_CONCURRENCY
+  concurrent calls.
+- Each event loop gets its own async client; the background loop behind
+  generate_quiz_with_gemini() uses the shared client's.
+- A missing GEMINI_API_KEY raises ValueError.
+'''
+
+import asyncio, json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from quiz_app.api import gemini, services
+
+QUIZ = {
+    'title': 'T', 'description': 'D',
+    'questions': [{'question_title': 'Q', 'question_options': ['a', 'b', 'c', 'd'], 'answer': 'a'}],
+}
+
+class GeminiClientTests(SimpleTestCase):
+    '''Tests for quiz_app.api.gemini and the Gemini service calls.'''
+
+    def setUp(self):
+        gemini.reset_clients()
+        self.addCleanup(gemini.reset_clients)
+
+    @patch('google.genai.Client')
+    def test_client_is_reused(self, mock_client):
+        '''The client is built once per key.'''
+
+        mock_client.side_effect = lambda **kwargs: MagicMock()
+        first = gemini.get_client('k1')
+        self.assertIs(gemini.get_client('k1'), first)
+        self.assertIsNot(gemini.get_client('k2'), first)
+        self.assertEqual(mock_client.call_count, 2)
+
+    @override_settings(QUIZ_GEMINI_MAX_CONNECTIONS=3, QUIZ_GEMINI_KEEPALIVE_SEC=30)
+    def test_keepalive_limits(self):
+        '''Sync and async transports share the configured pool limits.'''
+
+        options = gemini._http_options()
+        limits = options.client_args['limits']
+        self.assertEqual(limits.max_keepalive_connections, 3)
+        self.assertEqual(limits.keepalive_expiry, 30)
+        self.assertIs(options.async_client_args['limits'], limits)
+
+    @override_settings(GEMINI_API_KEY='')
+    def test_missing_key(self):
+        '''No key means a user-facing ValueError before any request.'''
+
+        with self.assertRaisesMessage(ValueError, 'GEMINI_API_KEY'):
+            services.generate_quiz_with_gemini('text', num_questions=1)
+
+    @override_settings(GEMINI_API_KEY='k', QUIZ_GEMINI_CONCURRENCY=2)
+    def test_async_concurrency_limit(self):
+        '''Concurrent async calls are capped by the semaphore.'''
+
+        active = peak = 0
+
+        async def generate_content(**kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return SimpleNamespace(text=json.dumps(QUIZ))
+
+        client = MagicMock()
+        client.aio.models.generate_content = generate_content
+
+        async def run():
+            return await asyncio.gather(*(services.agenerate_quiz_with_gemini('t', 1) for _ in range(5)))
+
+        with patch('quiz_app.api.gemini.get_async_client', return_value=client.aio):
+            results = asyncio.run(run())
+        self.assertEqual(results, [QUIZ] * 5)
+        self.assertEqual(peak, 2)
+
+    @patch('google.genai.Client')
+    def test_async_client_per_loop(self, mock_client):
+        '''Loops never share an async client; gemini.run() uses the shared client's.'''
+
+        mock_client.side_effect = lambda **kwargs: MagicMock()
+
+        async def aio():
+            return gemini.get_async_client('k1'), gemini.get_async_client('k1')
+
+        first, again = asyncio.run(aio())
+        self.assertIs(first, again)
+        second, _ = asyncio.run(aio())
+        self.assertIsNot(second, first)
+        self.assertIs(gemini.run(aio())[0], gemini.get_client('k1').aio)
+
+    @override_settings(GEMINI_API_KEY='k', QUIZ_GEMINI_HEDGE=False)
+    def test_sync_calls_use_async_client(self):
+        '''generate_quiz_with_gemini() makes its call through the async interface.'''
+
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock(return_value=SimpleNamespace(text=json.dumps(QUIZ)))
+        with patch('quiz_app.api.gemini.get_client', return_value=client):
+            self.assertEqual(services.generate_quiz_with_gemini('t', 1), QUIZ)
+        client.aio.models.generate_content.assert_awaited_once()
+        client.models.generate_content.assert_not_called()
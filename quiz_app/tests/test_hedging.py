@@ -0,0 +1,130 @@
+'''Tests for hedged Gemini requests.
+
+Covers:
+- LatencyTracker percentiles over its rolling window and the sample minimum.
+- The per-minute hedge budget.
+- generate_quiz_with_gemini() with QUIZ_GEMINI_HEDGE: a slow first request
+  is hedged, the first valid answer wins and the other request is cancelled
+  (a cancelled first request still records its elapsed time);
+  an invalid fast answer loses to a valid slow one; no hedge is sent
+  without enough latency samples or beyond the budget.
+
+Notes:
+- The async Gemini client is faked: each call pops a (delay, payload) pair.
+'''
+
+import asyncio, json, time
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from quiz_app.api import hedging, services
+
+QUIZ = {
+    'title': 'T',
+    'description': 'D',
+    'questions': [{'question_title': 'Q1', 'question_options': ['A', 'B', 'C', 'D'], 'answer': 'A'}],
+}
+SLOW_QUIZ = {**QUIZ, 'title': 'slow'}
+INVALID = {**QUIZ, 'questions': []}
+
+class FakeClient:
+    '''Gemini client whose async calls answer after scripted delays.'''
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+        self.cancelled = 0
+        self.aio = MagicMock()
+        self.aio.models.generate_content = self._generate
+        self.models = MagicMock()
+
+    async def _generate(self, **kwargs):
+        delay, payload = self.replies[self.calls]
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return MagicMock(text=json.dumps(payload))
+
+class LatencyTrackerTests(SimpleTestCase):
+    '''Tests for hedging.LatencyTracker and the hedge budget.'''
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_percentile(self):
+        '''Nearest-rank percentile over the most recent samples only.'''
+
+        tracker = hedging.LatencyTracker(size=100)
+        self.assertIsNone(tracker.percentile(95))
+        for value in range(1, 201):
+            tracker.observe(float(value))
+        self.assertEqual(tracker.percentile(50), 150.0)
+        self.assertEqual(tracker.percentile(95), 195.0)
+        self.assertEqual(tracker.percentile(100), 200.0)
+        self.assertIsNone(tracker.percentile(95, min_samples=101))
+
+    @override_settings(QUIZ_GEMINI_HEDGE_MAX_PER_MIN=2)
+    def test_budget(self):
+        '''Only QUIZ_GEMINI_HEDGE_MAX_PER_MIN hedges per minute.'''
+
+        self.assertEqual([hedging.acquire_hedge() for _ in range(3)], [True, True, False])
+        with patch('quiz_app.api.hedging.time.time', return_value=time.time() + 60):
+            self.assertTrue(hedging.acquire_hedge())
+
+@override_settings(QUIZ_GEMINI_HEDGE=True, QUIZ_GEMINI_HEDGE_PERCENTILE=95, QUIZ_GEMINI_HEDGE_MIN_SAMPLES=5,
+                   QUIZ_GEMINI_HEDGE_MAX_PER_MIN=10, QUIZ_REPAIR_ATTEMPTS=0, GEMINI_API_KEY='k')
+class HedgedGenerationTests(SimpleTestCase):
+    '''Tests for generate_quiz_with_gemini() with hedging enabled.'''
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        hedging.tracker.clear()
+        self.addCleanup(hedging.tracker.clear)
+
+    def _generate(self, client, samples: int = 5):
+        for _ in range(samples):
+            hedging.tracker.observe(0.05)
+        with patch('quiz_app.api.gemini.get_client', return_value=client):
+            start = time.monotonic()
+            quiz = services.generate_quiz_with_gemini('hello world', num_questions=1)
+        return quiz, time.monotonic() - start
+
+    def test_hedge_wins(self):
+        '''A stuck first request is overtaken by the hedge and cancelled.'''
+
+        client = FakeClient((5.0, SLOW_QUIZ), (0.0, QUIZ))
+        quiz, elapsed = self._generate(client)
+        self.assertEqual(quiz['title'], 'T')
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(client.calls, 2)
+        time.sleep(0.1)
+        self.assertEqual(client.cancelled, 1)
+        self.assertEqual(len(hedging.tracker), 7)
+        self.assertGreater(hedging.tracker.percentile(100), 0.05)
+
+    def test_invalid_answer_does_not_win(self):
+        '''A fast hedge that fails validation loses to the valid first answer.'''
+
+        client = FakeClient((0.3, SLOW_QUIZ), (0.0, INVALID))
+        quiz, _ = self._generate(client)
+        self.assertEqual(quiz['title'], 'slow')
+        self.assertEqual(client.calls, 2)
+
+    def test_no_hedge_without_samples_or_budget(self):
+        '''Too few observed latencies, or an exhausted budget, mean a single request.'''
+
+        client = FakeClient((0.3, SLOW_QUIZ))
+        self.assertEqual(self._generate(client, samples=4)[0]['title'], 'slow')
+        self.assertEqual(client.calls, 1)
+
+        client = FakeClient((0.3, SLOW_QUIZ))
+        with override_settings(QUIZ_GEMINI_HEDGE_MAX_PER_MIN=0):
+            self.assertEqual(self._generate(client)[0]['title'], 'slow')
+        self.assertEqual(client.calls, 1)
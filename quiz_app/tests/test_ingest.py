@@ -0,0 +1,142 @@
+'''Tests for bulk ingestion (`manage.py ingest_videos`).
+
+Covers:
+- Input parsing: comments, ids and URLs become unique canonical URLs;
+  playlists are expanded through yt-dlp.
+- The staged pipeline creates quizzes, skips videos that already have one
+  for the owner (resume), reports failures per video and only runs Whisper
+  when there is no cached transcript or captions.
+- Stages share the request pipeline's steps: concurrent runs of one video
+  transcribe it once, and QUIZ_STREAMING_AUDIO streams instead of
+  downloading.
+- The command prints per-video lines and a throughput summary.
+
+Notes:
+- Network, Whisper and Gemini are patched. TransactionTestCase is used
+  because the stage workers are threads with their own DB connections.
+'''
+
+import tempfile, time
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from quiz_app.api import ingest
+from quiz_app.models import Quiz
+
+QUIZ = {
+    'title': 'T', 'description': 'D',
+    'questions': [{'question_title': 'Q', 'question_options': ['a', 'b', 'c', 'd'], 'answer': 'a'}],
+}
+
+def watch(vid: str) -> str:
+    return f"https://www.youtube.com/watch?v={vid}"
+
+class SourceTests(SimpleTestCase):
+    '''Tests for read_sources() and expand_sources().'''
+
+    def test_read_and_expand(self):
+        '''Comments and blanks are ignored, duplicates collapsed.'''
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('# course\nAAAAAAAAAAA\n\nhttps://youtu.be/AAAAAAAAAAA  # again\nhttps://www.youtube.com/watch?v=BBBBBBBBBBB\n')
+        self.assertEqual(ingest.expand_sources(ingest.read_sources(f.name)), [watch('AAAAAAAAAAA'), watch('BBBBBBBBBBB')])
+
+    @patch('quiz_app.api.ingest.yt_dlp.YoutubeDL')
+    def test_playlist_expanded(self, mock_ydl):
+        '''Playlist ids are resolved to their videos without downloading.'''
+
+        ydl = mock_ydl.return_value.__enter__.return_value
+        ydl.extract_info.return_value = {'entries': [{'id': 'CCCCCCCCCCC'}, None, {'id': 'DDDDDDDDDDD'}]}
+        urls = ingest.expand_sources(['PLabcdefghijklmnop'])
+        self.assertEqual(urls, [watch('CCCCCCCCCCC'), watch('DDDDDDDDDDD')])
+        self.assertEqual(mock_ydl.call_args.args[0]['extract_flat'], 'in_playlist')
+
+@patch('quiz_app.api.services.generate_quiz_with_gemini', return_value=QUIZ)
+@patch('quiz_app.api.services.whisper_transcript', return_value='whisper text')
+@patch('quiz_app.api.services.download_audio', return_value='/tmp/none.m4a')
+@patch('quiz_app.api.stages.caption_transcript', return_value=None)
+@patch('quiz_app.api.stages.lookup_transcript', return_value=None)
+@patch('quiz_app.api.services.ensure_video_available', return_value={'duration': 600})
+class RunIngestTests(TransactionTestCase):
+    '''Tests for run_ingest() and the management command.'''
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='Abc123', email='o@x.com')
+
+    def test_pipeline_and_resume(self, _probe, mock_lookup, _captions, mock_download, mock_whisper, mock_gemini):
+        '''Quizzes are created once; a rerun skips finished videos.'''
+
+        mock_lookup.side_effect = lambda vid: 'cached text' if vid == 'BBBBBBBBBBB' else None
+        urls = [watch('AAAAAAAAAAA'), watch('BBBBBBBBBBB'), watch('CCCCCCCCCCC')]
+        workers = {'prepare': 2, 'transcribe': 1, 'generate': 2}
+
+        report = ingest.run_ingest(urls, self.owner, num_questions=1, workers=workers, queue_size=1,
+                                   whisper_processes=False)
+        self.assertEqual(report.count(ingest.STATUS_OK), 3)
+        self.assertEqual(Quiz.objects.filter(owner=self.owner).count(), 3)
+        self.assertEqual(mock_whisper.call_count, 2)
+        self.assertIn('3 created', ingest.summary(report))
+
+        report = ingest.run_ingest(urls, self.owner, num_questions=1, workers=workers, whisper_processes=False)
+        self.assertEqual(report.count(ingest.STATUS_SKIPPED), 3)
+        self.assertEqual(mock_gemini.call_count, 3)
+
+    @override_settings(QUIZ_SINGLE_FLIGHT=True)
+    def test_same_video_transcribed_once(self, _probe, _lookup, _captions, _download, mock_whisper, mock_gemini):
+        '''Two runs of one video in the transcribe stage at once share one Whisper call.'''
+
+        mock_whisper.side_effect = lambda *args, **kwargs: time.sleep(0.5) or 'whisper text'
+        report = ingest.run_ingest([watch('AAAAAAAAAAA')] * 2, self.owner, num_questions=1,
+                                   workers={'prepare': 2, 'transcribe': 2, 'generate': 2}, whisper_processes=False)
+        self.assertEqual(report.count(ingest.STATUS_OK), 2)
+        self.assertEqual(mock_whisper.call_count, 1)
+
+    @override_settings(QUIZ_STREAMING_AUDIO=True)
+    @patch('quiz_app.api.services.store_whisper_transcript')
+    @patch('quiz_app.api.services.transcribe_stream', return_value='streamed text')
+    @patch('quiz_app.api.services.select_audio_stream', return_value={'url': 'https://example.com/a.m4a'})
+    def test_streamed_audio(self, _select, mock_stream, _store, _probe, _lookup, _captions, mock_download,
+                            mock_whisper, mock_gemini):
+        '''With a streamable format nothing is downloaded; the stream goes to Whisper.'''
+
+        report = ingest.run_ingest([watch('AAAAAAAAAAA')], self.owner, num_questions=1, whisper_processes=False)
+        self.assertEqual(report.count(ingest.STATUS_OK), 1)
+        mock_download.assert_not_called()
+        mock_whisper.assert_not_called()
+        self.assertEqual(mock_stream.call_count, 1)
+        self.assertEqual(mock_gemini.call_args.args[0], 'streamed text')
+
+    def test_failures_are_per_video(self, _probe, _lookup, _captions, _download, _whisper, mock_gemini):
+        '''A failing video is reported and does not stop the others.'''
+
+        mock_gemini.side_effect = [ValueError('bad json'), QUIZ]
+        report = ingest.run_ingest([watch('AAAAAAAAAAA'), watch('BBBBBBBBBBB')], self.owner, num_questions=1,
+                                   whisper_processes=False)
+        failed = [task for task in report.tasks if task.status == ingest.STATUS_FAILED]
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0].error, 'bad json')
+        self.assertEqual(report.count(ingest.STATUS_OK), 1)
+
+    def test_stop_marks_remaining(self, *_):
+        '''After a stop request no new video is started.'''
+
+        report = ingest.run_ingest([watch('AAAAAAAAAAA'), watch('BBBBBBBBBBB')], self.owner, num_questions=1,
+                                   should_stop=lambda: True, whisper_processes=False)
+        self.assertEqual(report.count(ingest.STATUS_INTERRUPTED), 2)
+        self.assertFalse(Quiz.objects.exists())
+
+    @patch('quiz_app.management.commands.ingest_videos.signal.signal')
+    def test_command(self, _signal, *_):
+        '''The command prints one line per video and the summary.'''
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('AAAAAAAAAAA\n')
+        out = StringIO()
+        call_command('ingest_videos', f.name, '--owner', 'owner', '--num-questions', '1', '--no-whisper-processes',
+                     stdout=out)
+        self.assertIn('[ok] https://www.youtube.com/watch?v=AAAAAAAAAAA', out.getvalue())
+        self.assertIn('videos/hour', out.getvalue())
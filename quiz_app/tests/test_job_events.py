@@ -0,0 +1,188 @@
+'''Tests for the job progress stream and fine-grained progress reporting.
+
+Covers:
+- GET /api/jobs/<id>/events/: 403 for non-owners, 404 for unknown ids; a
+  finished job yields the retry hint and a final 'succeeded' event;
+  `Last-Event-ID` resumes after that event.
+- iter_job_events() streams the job's event log: every reported event (also
+  several between two polls), named by stage change, detail event and status,
+  with its id; a resumed stream replays only the newer events.
+- JobReporter stores detail and never throttles LLM events; the downloaded
+  byte count stays on the job after later stages.
+- Old events are pruned after QUIZ_JOB_EVENTS_TTL_SEC.
+- whisper_progress() turns Whisper's progress-bar frames into seconds.
+'''
+
+import importlib
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from quiz_app.api.events import iter_job_events, prune_events
+from quiz_app.api.jobs import JobReporter, _record_outcome
+from quiz_app.api.transcription import whisper_progress
+from quiz_app.models import QuizJob, QuizJobEvent
+
+URL = 'https://www.youtube.com/watch?v=AAAAAAAAAAA'
+
+class JobEventsApiTests(APITestCase):
+    '''Tests for GET /api/jobs/<id>/events/.'''
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='u1', password='Abc123', email='u1@x.com')
+        self.other = User.objects.create_user(username='u2', password='Abc123', email='u2@x.com')
+
+    def test_permissions(self):
+        '''Only the owner can follow a job; unknown ids are 404.'''
+
+        job = QuizJob.objects.create(owner=self.owner, video_url=URL)
+        self.client.force_authenticate(self.other)
+        resp = self.client.get(reverse('api-job-events', kwargs={'id': job.id}), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        resp = self.client.get(reverse('api-job-events', kwargs={'id': 999}), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_finished_job_stream(self):
+        '''A finished job is reported once and the stream ends.'''
+
+        job = QuizJob.objects.create(owner=self.owner, video_url=URL, status=QuizJob.STATUS_SUCCEEDED,
+                                     stage='done', progress=1.0)
+        self.client.force_authenticate(self.owner)
+        resp = self.client.get(reverse('api-job-events', kwargs={'id': job.id}), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        body = b''.join(resp.streaming_content).decode()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn('event: succeeded\n', body)
+        self.assertIn('"progress": 1.0', body)
+
+    def test_last_event_id_resumes(self):
+        '''Events up to Last-Event-ID are not sent again.'''
+
+        job = QuizJob.objects.create(owner=self.owner, video_url=URL, status=QuizJob.STATUS_RUNNING, lease_owner='w1')
+        report = JobReporter(job, 'w1', min_interval=0)
+        report('probe')
+        seen = QuizJobEvent.objects.get().pk
+        report('probe', 0.5)
+        _record_outcome(job, 'w1', error=ValueError('boom'))
+        self.client.force_authenticate(self.owner)
+        resp = self.client.get(reverse('api-job-events', kwargs={'id': job.id}), HTTP_ACCEPT='text/event-stream',
+                               HTTP_LAST_EVENT_ID=str(seen))
+        body = b''.join(resp.streaming_content).decode()
+        self.assertNotIn('event: stage\n', body)
+        self.assertIn('event: progress\n', body)
+        self.assertIn('event: failed\n', body)
+
+class JobEventsStreamTests(TestCase):
+    '''Tests for iter_job_events().'''
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='u1', password='Abc123', email='u1@x.com')
+        self.job = QuizJob.objects.create(owner=self.owner, video_url=URL, status=QuizJob.STATUS_RUNNING, stage='download',
+                                          lease_owner='w1')
+        self.report = JobReporter(self.job, 'w1', min_interval=0)
+
+    def _events(self, messages):
+        return [line.split(': ', 1)[1] for m in messages for line in m.split('\n') if line.startswith('event: ')]
+
+    @override_settings(QUIZ_SSE_MAX_SEC=60)
+    def test_events_follow_job(self):
+        '''A snapshot, then every logged event, including several written between two polls.'''
+
+        updates = iter([
+            lambda: self.report('download', 0.5, downloaded_bytes=10, total_bytes=20),
+            lambda: (self.report('transcribe', 1.0, event='vad', skipped_fraction=0.3),
+                     self.report('generate', 0.0, event='llm_started'),
+                     self.report('generate', 1.0, event='llm_done')),
+            lambda: _record_outcome(self.job, 'w1', error=ValueError('boom')),
+        ])
+
+        events = self._events(iter_job_events(self.job.pk, sleep=lambda _seconds: next(updates)()))
+        self.assertEqual(events, ['stage', 'progress', 'vad', 'llm_started', 'llm_done', 'failed'])
+
+    def test_resume_replays_newer_events(self):
+        '''With a last event id only later events are sent, each with its id.'''
+
+        self.report('download', 0.5)
+        first = QuizJobEvent.objects.get().pk
+        self.report('transcribe', 0.5)
+        _record_outcome(self.job, 'w1', error=ValueError('boom'))
+        messages = list(iter_job_events(self.job.pk, last_event_id=first, sleep=lambda s: None))
+        self.assertEqual(self._events(messages), ['stage', 'failed'])
+        ids = [int(line[4:]) for m in messages for line in m.split('\n') if line.startswith('id: ')]
+        self.assertEqual(ids, list(QuizJobEvent.objects.filter(pk__gt=first).order_by('pk').values_list('pk', flat=True)))
+
+    @override_settings(QUIZ_JOB_EVENTS_TTL_SEC=60)
+    def test_prune(self):
+        '''Only events older than the TTL are deleted.'''
+
+        self.report('download', 0.5)
+        self.report('transcribe', 0.5)
+        QuizJobEvent.objects.filter(pk=QuizJobEvent.objects.earliest('pk').pk).update(
+            created_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(prune_events(), 1)
+        self.assertEqual(QuizJobEvent.objects.count(), 1)
+
+    @override_settings(QUIZ_SSE_MAX_SEC=0)
+    def test_stream_times_out(self):
+        '''An unfinished job ends the stream after QUIZ_SSE_MAX_SEC.'''
+
+        messages = list(iter_job_events(self.job.pk, sleep=lambda s: None))
+        self.assertEqual(len(messages), 2)
+
+class JobReporterDetailTests(TestCase):
+    '''Tests for JobReporter with fine-grained detail.'''
+
+    def setUp(self):
+        owner = User.objects.create_user(username='u1', password='Abc123', email='u1@x.com')
+        self.job = QuizJob.objects.create(owner=owner, video_url=URL, status=QuizJob.STATUS_RUNNING, lease_owner='w1')
+
+    def test_detail_and_events(self):
+        '''Detail is stored; throttled updates are skipped but events are not.'''
+
+        report = JobReporter(self.job, 'w1', min_interval=60)
+        report('generate', 0.0, event='llm_started')
+        report('generate', 0.5, tokens=1)
+        report('generate', 1.0, event='llm_done')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.detail, {'event': 'llm_done'})
+        self.assertEqual(self.job.progress, 0.95)
+
+    def test_downloaded_bytes_kept(self):
+        '''Later stages overwrite detail but not downloaded_bytes.'''
+
+        report = JobReporter(self.job, 'w1', min_interval=60)
+        report('download', 1.0, event='downloaded', downloaded_bytes=1234)
+        report('transcribe', 0.0)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.downloaded_bytes, 1234)
+        self.assertNotIn('downloaded_bytes', self.job.detail)
+
+class WhisperProgressTests(SimpleTestCase):
+    '''Tests for the Whisper progress-bar shim.'''
+
+    def test_frames_reported_as_seconds(self):
+        '''Frame updates inside whisper.transcribe reach the thread's callback.'''
+
+        calls = []
+        module = importlib.import_module('whisper.transcribe')
+        with whisper_progress(lambda done, total: calls.append((done, total))):
+            with module.tqdm.tqdm(total=3000, unit='frames', disable=True) as bar:
+                bar.update(1000)
+                bar.update(2000)
+        self.assertEqual(calls, [(10.0, 30.0), (30.0, 30.0)])
+
+    def test_without_callback_uses_tqdm(self):
+        '''Outside whisper_progress() the shim behaves like a normal bar.'''
+
+        with whisper_progress(lambda done, total: None):
+            pass
+        module = importlib.import_module('whisper.transcribe')
+        with module.tqdm.tqdm(total=10, disable=True) as bar:
+            bar.update(5)
+        self.assertEqual(bar.n, 5)
@@ -0,0 +1,127 @@
+'''Tests for token-budgeted map-reduce quiz generation.
+
+Covers:
+- split_by_tokens() keeps chunks within the budget, prefers sentence
+  boundaries and splits unpunctuated text by words.
+- dedupe_questions(), interleave() and select_questions() helpers.
+- generate_quiz_with_gemini() uses a single prompt below the budget and the
+  map-reduce path above it; invalid and failed map results are dropped.
+
+Notes:
+- Token counting is forced onto the length-based fallback, so no tiktoken
+  encoding file is downloaded.
+'''
+
+import json, threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from quiz_app.api import mapreduce, services
+
+def question(title: str, answer: str = 'a') -> dict:
+    return {'question_title': title, 'question_options': ['a', 'b', 'c', 'd'], 'answer': answer}
+
+@patch('quiz_app.api.mapreduce._encoding', return_value=None)
+class TokenSplitTests(SimpleTestCase):
+    '''Tests for token counting and chunking.'''
+
+    def test_chunks_within_budget(self, _enc):
+        '''Sentences are packed into chunks that stay under the budget.'''
+
+        text = ' '.join(f"Sentence number {i} is here." for i in range(100))
+        chunks = mapreduce.split_by_tokens(text, 50)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(mapreduce.count_tokens(c) <= 50 for c in chunks))
+        self.assertTrue(all(c.endswith('.') for c in chunks))
+        self.assertEqual(' '.join(chunks), text)
+
+    def test_unpunctuated_text(self, _enc):
+        '''Caption-style text without sentence ends is split by words.'''
+
+        text = ' '.join(['word'] * 1000)
+        chunks = mapreduce.split_by_tokens(text, 100)
+        self.assertGreater(len(chunks), 5)
+        self.assertEqual(sum(len(c.split()) for c in chunks), 1000)
+
+class HelperTests(SimpleTestCase):
+    '''Tests for candidate dedupe and selection.'''
+
+    def test_dedupe(self):
+        '''Near-identical titles are dropped, distinct ones kept.'''
+
+        kept = mapreduce.dedupe_questions([
+            question('What is the capital of France?'),
+            question('what is the capital of France'),
+            question('Who wrote Hamlet?'),
+        ])
+        self.assertEqual([q['question_title'] for q in kept], ['What is the capital of France?', 'Who wrote Hamlet?'])
+
+    def test_interleave(self):
+        '''Candidates alternate between chunks.'''
+
+        self.assertEqual(mapreduce.interleave([[1, 2, 3], [4], [5, 6]]), [1, 4, 5, 2, 6, 3])
+
+    def test_select_fills_invalid_choice(self):
+        '''Bad or duplicate indices are ignored and the rest is filled in order.'''
+
+        candidates = [question(f"Q{i}") for i in range(5)]
+        chosen = mapreduce.select_questions(candidates, [3, 3, 99, 'x'], 3)
+        self.assertEqual([q['question_title'] for q in chosen], ['Q3', 'Q0', 'Q1'])
+
+@override_settings(GEMINI_API_KEY='k', QUIZ_PROMPT_TOKEN_BUDGET=100, QUIZ_MAP_CHUNK_TOKENS=60, QUIZ_MAP_CONCURRENCY=3)
+@patch('quiz_app.api.mapreduce._encoding', return_value=None)
+class MapReduceGenerationTests(SimpleTestCase):
+    '''Tests for the dispatch and the map-reduce orchestration.'''
+
+    def fake_client(self, handler):
+        client = MagicMock()
+        client.models.generate_content.side_effect = lambda model, contents, **kwargs: SimpleNamespace(text=json.dumps(handler(contents)))
+        client.aio.models.generate_content = AsyncMock(side_effect=lambda **kwargs: client.models.generate_content(**kwargs))
+        return client
+
+    def test_short_transcript_single_prompt(self, _enc):
+        '''Below the budget the original single prompt is used.'''
+
+        quiz = {'title': 'T', 'description': 'D', 'questions': [question('Q')]}
+        client = self.fake_client(lambda prompt: quiz)
+        with patch('quiz_app.api.gemini.get_client', return_value=client):
+            self.assertEqual(services.generate_quiz_with_gemini('short text.', num_questions=1), quiz)
+        self.assertEqual(client.models.generate_content.call_count, 1)
+
+    def test_long_transcript_map_reduce(self, _enc):
+        '''Chunks are mapped in parallel and the reduce call picks the questions.'''
+
+        lock, counter = threading.Lock(), [0]
+
+        def handler(prompt):
+            if prompt.startswith('Below are numbered'):
+                return {'title': 'Long', 'description': 'Summary', 'selected': [2, 0]}
+            with lock:
+                counter[0] += 1
+                n = counter[0]
+            if n == 1:
+                raise RuntimeError('map failed')
+            return {'questions': [question(f"Distinct topic {n} alpha"), question(f"Distinct subject {n} beta"),
+                                  {'question_title': 'broken'}]}
+
+        transcript = ' '.join(f"This is sentence {i} of the lecture." for i in range(60))
+        client = self.fake_client(handler)
+        with patch('quiz_app.api.gemini.get_client', return_value=client):
+            quiz = services.generate_quiz_with_gemini(transcript, num_questions=2)
+        self.assertEqual(quiz['title'], 'Long')
+        self.assertEqual(len(quiz['questions']), 2)
+        prompts = [c.kwargs['contents'] for c in client.models.generate_content.call_args_list]
+        self.assertGreater(len(prompts), 3)
+        self.assertTrue(prompts[-1].startswith('Below are numbered'))
+        self.assertNotIn('broken', prompts[-1])
+
+    def test_too_few_candidates(self, _enc):
+        '''If the map pass yields fewer valid questions than needed, a ValueError is raised.'''
+
+        client = self.fake_client(lambda prompt: {'questions': []})
+        transcript = ' '.join(f"This is sentence {i} of the lecture." for i in range(60))
+        with patch('quiz_app.api.gemini.get_client', return_value=client):
+            with self.assertRaisesMessage(ValueError, 'valid questions'):
+                services.generate_quiz_with_gemini(transcript, num_questions=5)
@@ -0,0 +1,99 @@
+'''Tests for pipeline metrics and the Prometheus endpoint.
+
+Covers:
+- stage_timer() records a duration histogram and an outcome counter, also
+  when the stage raises.
+- render_prometheus() emits HELP/TYPE lines, cumulative buckets, +Inf, _sum
+  and _count.
+- Worker snapshots stored in MetricsSnapshot are merged into collect().
+- GET /api/metrics/: 401 unauthenticated, 403 for regular users, 200 for staff.
+'''
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from quiz_app.api import metrics
+from quiz_app.models import MetricsSnapshot
+
+class MetricsRegistryTests(TestCase):
+    '''Tests for the in-process registry and exposition format.'''
+
+    def setUp(self):
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.reset()
+
+    def test_stage_timer_records_outcome(self):
+        '''Successful and failing stages are counted separately.'''
+
+        with metrics.stage_timer('probe'):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.stage_timer('probe'):
+                raise ValueError('boom')
+        counters = metrics.snapshot()['counters']['quiz_stage_total']
+        self.assertEqual(counters['{"outcome":"ok","stage":"probe"}'], 1)
+        self.assertEqual(counters['{"outcome":"error","stage":"probe"}'], 1)
+
+    def test_render_histogram(self):
+        '''Buckets are cumulative and end with +Inf, _sum and _count.'''
+
+        metrics.observe('quiz_whisper_rtf', 0.15, model='base')
+        metrics.observe('quiz_whisper_rtf', 3.0, model='base')
+        text = metrics.render_prometheus(metrics.collect(include_snapshots=False))
+        self.assertIn('# TYPE quiz_whisper_rtf histogram', text)
+        self.assertIn('quiz_whisper_rtf_bucket{model="base",le="0.1"} 0', text)
+        self.assertIn('quiz_whisper_rtf_bucket{model="base",le="0.2"} 1', text)
+        self.assertIn('quiz_whisper_rtf_bucket{model="base",le="+Inf"} 2', text)
+        self.assertIn('quiz_whisper_rtf_count{model="base"} 2', text)
+        self.assertIn('quiz_whisper_rtf_sum{model="base"} 3.15', text)
+
+    def test_snapshots_are_merged(self):
+        '''Counters published by another process are added to local ones.'''
+
+        metrics.inc('quiz_download_bytes_total', 100)
+        MetricsSnapshot.objects.create(process_id='worker-1', payload={
+            'counters': {'quiz_download_bytes_total': {'{}': 50}}, 'histograms': {},
+        })
+        text = metrics.render_prometheus(metrics.collect())
+        self.assertIn('quiz_download_bytes_total 150', text)
+
+    def test_publish_snapshot_replaces_row(self):
+        '''Each process keeps a single, up-to-date snapshot row.'''
+
+        metrics.inc('quiz_retries_total', operation='job')
+        metrics.publish_snapshot('worker-1')
+        metrics.inc('quiz_retries_total', operation='job')
+        metrics.publish_snapshot('worker-1')
+        snap = MetricsSnapshot.objects.get()
+        self.assertEqual(snap.payload['counters']['quiz_retries_total']['{"operation":"job"}'], 2)
+
+class MetricsApiTests(APITestCase):
+    '''Tests for GET /api/metrics/.'''
+
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(username='u1', password='Abc123', email='u1@x.com')
+        self.admin = User.objects.create_user(username='admin', password='Abc123', email='a@x.com', is_staff=True)
+
+    def test_requires_staff(self):
+        '''Anonymous users get 401, regular users 403.'''
+
+        url = reverse('api-metrics')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_staff_gets_exposition(self):
+        '''Staff receive the text exposition format.'''
+
+        metrics.inc('quiz_audio_seconds_total', 12.5, model='base')
+        self.client.force_authenticate(self.admin)
+        resp = self.client.get(reverse('api-metrics'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'quiz_audio_seconds_total{model="base"} 12.5', resp.content)
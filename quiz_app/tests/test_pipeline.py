@@ -0,0 +1,144 @@
+'''Tests for the staged pipeline executor and pipelined job workers.
+
+Covers:
+- Items pass through every stage in order; Skip and exceptions finish an
+  item early with 'skipped' / 'failed'; a stop request interrupts the rest.
+- Bounded queues apply backpressure: a blocked stage stops the source from
+  being consumed.
+- Process stages run the selected arguments in a child process and merge
+  the result back into the item; a dead child breaks the pool, which is
+  rebuilt and the task retried once.
+- work_pipelined() runs queued jobs through the stages, records successes
+  and ValueError failures, and releases jobs interrupted by a stop request.
+
+Notes:
+- Network, Whisper and Gemini are patched; the job tests use
+  TransactionTestCase because stage workers are threads with their own DB
+  connections.
+'''
+
+import operator, tempfile, threading, time
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TransactionTestCase
+
+from quiz_app.api import pipeline
+from quiz_app.api.jobs import work_pipelined
+from quiz_app.api.stages import build_stages
+from quiz_app.models import QuizJob
+
+QUIZ = {
+    'title': 'T', 'description': 'D',
+    'questions': [{'question_title': 'Q', 'question_options': ['a', 'b', 'c', 'd'], 'answer': 'a'}],
+}
+
+class PipelineTests(SimpleTestCase):
+    '''Tests for pipeline.Pipeline.'''
+
+    def test_outcomes(self):
+        '''Each item ends ok, skipped or failed; stage timings are recorded.'''
+
+        def first(item):
+            if item == 2:
+                raise pipeline.Skip('done before')
+            return item * 10
+
+        def second(item):
+            if item == 30:
+                raise ValueError('bad')
+            return item + 1
+
+        stages = [pipeline.Stage('first', first, 2), pipeline.Stage('second', second, 2)]
+        report = pipeline.Pipeline(stages, queue_size=1).run([1, 2, 3, 4])
+        outcomes = {task.item: task.status for task in report.tasks}
+        self.assertEqual(outcomes, {11: 'ok', 2: 'skipped', 30: 'failed', 41: 'ok'})
+        failed = next(task for task in report.tasks if task.status == pipeline.STATUS_FAILED)
+        self.assertIsInstance(failed.exception, ValueError)
+        self.assertIn('second', failed.timings)
+        self.assertEqual(report.count(pipeline.STATUS_OK), 2)
+
+    def test_backpressure(self):
+        '''While the last stage is blocked, only a bounded number of items is taken.'''
+
+        release = threading.Event()
+        taken = []
+
+        def source():
+            for i in range(50):
+                taken.append(i)
+                yield i
+
+        stages = [pipeline.Stage('fast', lambda item: item), pipeline.Stage('slow', lambda item: release.wait(5) and item)]
+        runner = threading.Thread(target=lambda: pipeline.Pipeline(stages, queue_size=1).run(source()))
+        runner.start()
+        time.sleep(0.5)
+        self.assertLessEqual(len(taken), 5)
+        release.set()
+        runner.join(10)
+        self.assertEqual(len(taken), 50)
+
+    def test_stop_interrupts(self):
+        '''After a stop request no further item is started.'''
+
+        report = pipeline.Pipeline([pipeline.Stage('only', lambda item: item)]).run([1, 2], should_stop=lambda: True)
+        self.assertEqual(report.count(pipeline.STATUS_INTERRUPTED), 1)
+
+    def test_process_stage(self):
+        '''Selected arguments run in a child process and are merged back.'''
+
+        stage = pipeline.Stage(
+            'multiply', operator.mul, processes=True,
+            select=lambda item: (item['n'], 3) if item['n'] else None,
+            merge=lambda item, result: item.update(n=result),
+        )
+        report = pipeline.Pipeline([stage]).run([{'n': 2}, {'n': 0}])
+        self.assertEqual(sorted(task.item['n'] for task in report.tasks), [0, 6])
+
+    def test_broken_pool_is_rebuilt(self):
+        '''A task whose child dies once succeeds on a new pool; one that always kills it fails alone.'''
+
+        marker = Path(tempfile.mkdtemp()) / 'crashed'
+        crash_once = f"import os, pathlib\np = pathlib.Path({str(marker)!r})\nif not p.exists():\n    p.touch()\n    os._exit(1)"
+        code = {'once': crash_once, 'always': 'import os\nos._exit(1)', 'fine': 'pass'}
+        stage = pipeline.Stage('crashy', exec, processes=True, select=lambda item: (code[item],))
+        report = pipeline.Pipeline([stage]).run(['once', 'always', 'fine'])
+        outcomes = {task.item: task.status for task in report.tasks}
+        self.assertEqual(outcomes, {'once': 'ok', 'always': 'failed', 'fine': 'ok'})
+        self.assertTrue(marker.exists())
+
+@patch('quiz_app.api.services.generate_quiz_with_gemini', return_value=QUIZ)
+@patch('quiz_app.api.stages.caption_transcript', return_value=None)
+@patch('quiz_app.api.stages.lookup_transcript', return_value='cached text')
+@patch('quiz_app.api.services.ensure_video_available', return_value={'duration': 60})
+class PipelinedWorkerTests(TransactionTestCase):
+    '''Tests for jobs.work_pipelined().'''
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='u1', password='Abc123', email='u1@x.com')
+        self.jobs = [
+            QuizJob.objects.create(owner=self.owner, video_url=f"https://www.youtube.com/watch?v={vid * 11}",
+                                   num_questions=1)
+            for vid in 'AB'
+        ]
+
+    def test_jobs_succeed_and_fail(self, _probe, _lookup, _captions, mock_gemini):
+        '''Successful jobs get their quiz; ValueErrors fail the job.'''
+
+        mock_gemini.side_effect = [QUIZ, ValueError('bad json')]
+        processed = work_pipelined('w1', once=True, stages=build_stages(whisper_processes=False))
+        self.assertEqual(processed, 2)
+        statuses = sorted(QuizJob.objects.values_list('status', flat=True))
+        self.assertEqual(statuses, [QuizJob.STATUS_FAILED, QuizJob.STATUS_SUCCEEDED])
+        done = QuizJob.objects.get(status=QuizJob.STATUS_SUCCEEDED)
+        self.assertEqual((done.stage, done.progress, done.quiz.owner), ('done', 1.0, self.owner))
+
+    def test_stop_releases_jobs(self, *_):
+        '''Jobs leased but not started are returned to the queue without using an attempt.'''
+
+        processed = work_pipelined('w1', once=True, should_stop=lambda: QuizJob.objects.filter(attempts=1).exists(),
+                                   stages=build_stages(whisper_processes=False))
+        self.assertEqual(processed, 0)
+        job = QuizJob.objects.get(pk=self.jobs[0].pk)
+        self.assertEqual((job.status, job.attempts, job.lease_owner), (QuizJob.STATUS_QUEUED, 0, ''))
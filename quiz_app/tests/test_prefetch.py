@@ -0,0 +1,197 @@
+'''Tests for prefetching transcripts before quiz creation.
+
+Covers:
+- POST /api/prefetch/ queues a prefetch job (202), returns the active one
+  for a repeated URL (200), rejects invalid URLs (400) and enforces
+  QUIZ_PREFETCH_MAX_ACTIVE (429).
+- DELETE /api/prefetch/<id>/ cancels queued jobs (204, never leased),
+  answers 409 for finished ones and 404 for quiz jobs.
+- Workers lease quiz jobs before prefetch jobs, run prefetches without
+  creating a quiz, and stop a running prefetch once it is cancelled.
+- prefetch_transcript() probes and transcribes without calling Gemini.
+- Cancelling a prefetch that leads a coalesced transcription (even inside
+  Whisper) does not fail the job waiting on it: the follower transcribes.
+'''
+
+import threading, time
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from quiz_app.api import services, whisper_models
+from quiz_app.api.jobs import JobCancelled, cancel_job, lease_next_job, run_job
+from quiz_app.models import Quiz, QuizJob
+
+URL_A = 'https://youtu.be/AAAAAAAAAAA'
+URL_B = 'https://youtu.be/BBBBBBBBBBB'
+
+class PrefetchApiTests(APITestCase):
+    '''Tests for POST /api/prefetch/ and DELETE /api/prefetch/<id>/.'''
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='Abc123')
+        self.client.force_authenticate(self.user)
+
+    def test_queue_and_dedupe(self):
+        '''A repeated prefetch of the same video returns the active job.'''
+
+        first = self.client.post(reverse('api-prefetch'), {'url': URL_A}, format='json')
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(first.data['kind'], 'prefetch')
+        self.assertEqual(first['Location'], reverse('api-prefetch-detail', kwargs={'id': first.data['id']}))
+        again = self.client.post(reverse('api-prefetch'), {'url': 'https://www.youtube.com/watch?v=AAAAAAAAAAA'},
+                                 format='json')
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(again.data['id'], first.data['id'])
+
+    def test_invalid_url(self):
+        '''Unsupported URLs are rejected before a job is created.'''
+
+        resp = self.client.post(reverse('api-prefetch'), {'url': 'https://example.com/'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(QuizJob.objects.exists())
+
+    @override_settings(QUIZ_PREFETCH_MAX_ACTIVE=1)
+    def test_limit(self):
+        '''Active prefetches are capped per user; finished ones do not count.'''
+
+        self.client.post(reverse('api-prefetch'), {'url': URL_A}, format='json')
+        resp = self.client.post(reverse('api-prefetch'), {'url': URL_B}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        QuizJob.objects.update(status=QuizJob.STATUS_SUCCEEDED)
+        resp = self.client.post(reverse('api-prefetch'), {'url': URL_B}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_cancel(self):
+        '''A cancelled prefetch is never leased; finished ones cannot be cancelled.'''
+
+        job_id = self.client.post(reverse('api-prefetch'), {'url': URL_A}, format='json').data['id']
+        url = reverse('api-prefetch-detail', kwargs={'id': job_id})
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(QuizJob.objects.get(pk=job_id).status, QuizJob.STATUS_CANCELLED)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertIsNone(lease_next_job('w1'))
+
+        QuizJob.objects.filter(pk=job_id).update(status=QuizJob.STATUS_SUCCEEDED)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_409_CONFLICT)
+
+    def test_cancel_permissions(self):
+        '''Quiz jobs are not prefetches; other users' prefetches are forbidden.'''
+
+        quiz_job = QuizJob.objects.create(owner=self.user, video_url=URL_A)
+        self.assertEqual(self.client.delete(reverse('api-prefetch-detail', kwargs={'id': quiz_job.id})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        other = User.objects.create_user(username='u2', password='Abc123')
+        theirs = QuizJob.objects.create(owner=other, kind=QuizJob.KIND_PREFETCH, video_url=URL_A)
+        self.assertEqual(self.client.delete(reverse('api-prefetch-detail', kwargs={'id': theirs.id})).status_code,
+                         status.HTTP_403_FORBIDDEN)
+
+class PrefetchWorkerTests(TestCase):
+    '''Tests for running prefetch jobs.'''
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='u1', password='Abc123')
+
+    def test_quiz_jobs_first(self):
+        '''An older prefetch waits behind a newer quiz job.'''
+
+        QuizJob.objects.create(owner=self.owner, kind=QuizJob.KIND_PREFETCH, video_url=URL_A)
+        quiz_job = QuizJob.objects.create(owner=self.owner, video_url=URL_B)
+        self.assertEqual(lease_next_job('w1').pk, quiz_job.pk)
+
+    @patch('quiz_app.api.jobs.create_quiz_from_youtube')
+    @patch('quiz_app.api.jobs.prefetch_transcript', return_value='text')
+    def test_prefetch_job_succeeds_without_quiz(self, mock_prefetch, mock_create):
+        '''The transcript is fetched with the job's preset and no quiz is created.'''
+
+        QuizJob.objects.create(owner=self.owner, kind=QuizJob.KIND_PREFETCH, video_url=URL_A, preset='fast')
+        job = run_job(lease_next_job('w1'), 'w1')
+        self.assertEqual(job.status, QuizJob.STATUS_SUCCEEDED)
+        self.assertIsNone(job.quiz)
+        self.assertEqual(mock_prefetch.call_args.kwargs['preset'], 'fast')
+        mock_create.assert_not_called()
+        self.assertFalse(Quiz.objects.exists())
+
+    @patch('quiz_app.api.jobs.prefetch_transcript')
+    def test_running_prefetch_stops_on_cancel(self, mock_prefetch):
+        '''The next progress report after a cancel aborts the run; the job stays cancelled.'''
+
+        reached = []
+
+        def prefetch(url, progress, preset):
+            progress('probe')
+            cancel_job(QuizJob.objects.get())
+            progress('download')
+            reached.append('after cancel')
+        mock_prefetch.side_effect = prefetch
+
+        QuizJob.objects.create(owner=self.owner, kind=QuizJob.KIND_PREFETCH, video_url=URL_A)
+        job = run_job(lease_next_job('w1'), 'w1')
+        self.assertEqual(job.status, QuizJob.STATUS_CANCELLED)
+        self.assertEqual(reached, [])
+
+class PrefetchServiceTests(SimpleTestCase):
+    '''Tests for services.prefetch_transcript().'''
+
+    @patch('quiz_app.api.services.generate_quiz_with_gemini')
+    @patch('quiz_app.api.services.obtain_transcript', return_value='hello world')
+    @patch('quiz_app.api.services.ensure_video_available', return_value={'id': 'AAAAAAAAAAA', 'duration': 60})
+    def test_transcript_only(self, _probe, mock_obtain, mock_gemini):
+        '''Only probe and transcript; Gemini is not called.'''
+
+        self.assertEqual(services.prefetch_transcript(URL_A), 'hello world')
+        self.assertEqual(mock_obtain.call_args.args[0], 'https://www.youtube.com/watch?v=AAAAAAAAAAA')
+        mock_gemini.assert_not_called()
+
+@override_settings(QUIZ_SINGLE_FLIGHT=True, QUIZ_CAPTIONS_FIRST=False, QUIZ_STREAMING_AUDIO=False, QUIZ_VAD=True,
+                   WHISPER_MODEL='tiny', WHISPER_BACKEND='openai', WHISPER_WORKERS=1)
+@patch('quiz_app.api.singleflight._run_locked', side_effect=lambda key, compute, lookup, on_wait=None: compute())
+@patch('quiz_app.api.services.store_transcript')
+@patch('quiz_app.api.services.lookup_transcript', return_value=None)
+@patch('quiz_app.api.services.download_audio', return_value='a.m4a')
+@patch('quiz_app.api.services._require_ffmpeg')
+@patch('whisper.load_audio', return_value=np.random.default_rng(0).uniform(-0.5, 0.5, 16000 * 5).astype(np.float32))
+@patch('whisper.load_model')
+class CancelledLeaderTests(SimpleTestCase):
+    '''Tests for cancelling the leader of a coalesced transcription.'''
+
+    def setUp(self):
+        whisper_models.clear()
+        self.addCleanup(whisper_models.clear)
+
+    def test_follower_transcribes_after_leader_cancel(self, mock_load, *_):
+        '''The cancelled prefetch stops with JobCancelled; the waiting job gets a transcript.'''
+
+        model = MagicMock()
+        model.transcribe.return_value = {'text': 'hello'}
+        mock_load.return_value = model
+        info = {'id': 'AAAAAAAAAAA', 'duration': 5}
+        url = services.YOUTUBE_CANONICAL.format(vid='AAAAAAAAAAA')
+        follower_started, outcome = threading.Event(), {}
+
+        def cancelled(stage, fraction=0.0, **detail):
+            if detail.get('event') == 'vad':
+                follower_started.wait(2)
+                time.sleep(0.2)
+                raise JobCancelled('Job #1 was cancelled.')
+
+        def lead():
+            try:
+                services.obtain_transcript(url, info, cancelled)
+            except Exception as e:
+                outcome['leader'] = e
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        time.sleep(0.1)
+        follower_started.set()
+        self.assertEqual(services.obtain_transcript(url, info, MagicMock()), 'hello')
+        leader.join(5)
+        self.assertIsInstance(outcome['leader'], JobCancelled)
+        self.assertEqual(model.transcribe.call_count, 1)
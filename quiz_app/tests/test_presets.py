@@ -0,0 +1,135 @@
+'''Tests for transcription presets.
+
+Covers:
+- Each preset picks its model tier by video duration.
+- 'auto' picks the most accurate preset that fits QUIZ_LATENCY_TARGET_SEC,
+  using observed real-time factors once enough runs were recorded.
+- preset_for(): the requested preset wins over the user's group default,
+  which wins over QUIZ_DEFAULT_PRESET.
+- POST /api/createQuiz/ rejects unknown presets with 400 and stores the
+  chosen preset on the queued job.
+- transcribe_audio() uses the active preset's model and decoding options.
+
+Notes:
+- whisper.load_model is patched; no checkpoint is ever downloaded.
+'''
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from django.contrib.auth.models import Group, User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from quiz_app.api import metrics, presets, services, whisper_models
+from quiz_app.models import QuizJob
+
+class ResolveTests(SimpleTestCase):
+    '''Tests for presets.resolve().'''
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_tiers_by_duration(self):
+        '''Longer videos get the smaller model of a preset.'''
+
+        self.assertEqual(presets.resolve('fast', 300).model, 'base')
+        self.assertEqual(presets.resolve('fast', 3600).model, 'tiny')
+        accurate = presets.resolve('accurate', 600)
+        self.assertEqual(accurate.model, 'medium')
+        self.assertEqual(accurate.options['beam_size'], 5)
+        self.assertFalse(accurate.options['fp16'])
+        self.assertIsNone(presets.resolve('', 600))
+
+    def test_unknown_preset(self):
+        '''Typos are reported as ValueError.'''
+
+        with self.assertRaises(ValueError):
+            presets.resolve('fastest', 60)
+
+    @override_settings(QUIZ_LATENCY_TARGET_SEC=300)
+    def test_auto_fits_latency_target(self):
+        '''auto degrades from accurate to fast as the video gets longer.'''
+
+        self.assertEqual(presets.resolve('auto', 300).preset, 'accurate')   # medium: 300 × 0.8
+        self.assertEqual(presets.resolve('auto', 900).preset, 'balanced')   # small: 900 × 0.3
+        self.assertEqual(presets.resolve('auto', 2400).preset, 'balanced')  # base: 2400 × 0.1
+        self.assertEqual(presets.resolve('auto', 4000).preset, 'fast')      # base: 4000 × 0.1 > 300 → tiny
+        self.assertEqual(presets.resolve('auto', 100000).preset, 'fast')
+
+    @override_settings(QUIZ_LATENCY_TARGET_SEC=300)
+    def test_auto_uses_observed_rtf(self):
+        '''A slow host measured at RTF 1.2 for medium falls back to balanced.'''
+
+        for _ in range(5):
+            metrics.observe('quiz_whisper_rtf', 1.2, model='medium', backend='openai')
+        self.assertEqual(presets.resolve('auto', 300).preset, 'balanced')
+
+class PresetForTests(TestCase):
+    '''Tests for presets.preset_for().'''
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='Abc123')
+        self.user.groups.add(Group.objects.create(name='premium'))
+
+    @override_settings(QUIZ_GROUP_PRESETS={'premium': 'accurate'}, QUIZ_DEFAULT_PRESET='fast')
+    def test_precedence(self):
+        '''Request > group > default.'''
+
+        self.assertEqual(presets.preset_for(self.user, 'balanced'), 'balanced')
+        self.assertEqual(presets.preset_for(self.user), 'accurate')
+        other = User.objects.create_user(username='u2', password='Abc123')
+        self.assertEqual(presets.preset_for(other), 'fast')
+
+@override_settings(QUIZ_ASYNC_JOBS=True)
+class PresetApiTests(APITestCase):
+    '''Tests for the 'preset' field of POST /api/createQuiz/.'''
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='u1', password='Abc123')
+        self.client.force_authenticate(self.user)
+
+    def test_unknown_preset_400(self):
+        '''No job is queued for an unknown preset.'''
+
+        resp = self.client.post(reverse('api-create-quiz'),
+                                {'url': 'https://youtu.be/AAAAAAAAAAA', 'preset': 'turbo'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(QuizJob.objects.exists())
+
+    def test_job_stores_preset(self):
+        '''The worker later runs the job with the requested preset.'''
+
+        resp = self.client.post(reverse('api-create-quiz'),
+                                {'url': 'https://youtu.be/AAAAAAAAAAA', 'preset': 'Fast'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resp.data['preset'], 'fast')
+        self.assertEqual(QuizJob.objects.get().preset, 'fast')
+
+class PresetTranscriptionTests(SimpleTestCase):
+    '''Tests for transcription under an active preset.'''
+
+    def setUp(self):
+        whisper_models.clear()
+        self.addCleanup(whisper_models.clear)
+
+    @override_settings(WHISPER_MODEL='small', WHISPER_BACKEND='openai')
+    @patch('quiz_app.api.services._require_ffmpeg')
+    @patch('whisper.load_audio', return_value=np.zeros(16000, dtype=np.float32))
+    @patch('whisper.load_model')
+    def test_transcribe_uses_preset(self, mock_load, _load_audio, _ffmpeg):
+        '''The preset's model is loaded and its options reach model.transcribe().'''
+
+        model = MagicMock()
+        model.transcribe.return_value = {'text': ' hi '}
+        mock_load.return_value = model
+        with presets.use_decoding(presets.resolve('fast', 3600)):
+            self.assertEqual(services.transcribe_audio('a.m4a', services.whisper_options()), 'hi')
+        mock_load.assert_called_once_with('tiny')
+        options = model.transcribe.call_args.kwargs
+        self.assertEqual(options['temperature'], 0.0)
+        self.assertFalse(options['condition_on_previous_text'])
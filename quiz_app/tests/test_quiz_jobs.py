@@ -0,0 +1,156 @@
+'''API and worker tests for asynchronous quiz-creation jobs.
+
+Covers:
+- POST /api/createQuiz/ in async mode returns 202 with a job id and a
+  Location header, and rejects invalid URLs with 400.
+- GET /api/jobs/<id>/: 401 unauthenticated, 403 for non-owners, 404 for
+  unknown ids, 200 with stage/progress for the owner.
+- The worker leases a job, runs the (mocked) pipeline and records the quiz;
+  ValueErrors fail the job, unexpected errors are retried; jobs of crashed
+  workers are picked up again after their lease expires.
+- The lease heartbeat keeps a job that reports no progress for longer than
+  its lease from being leased by a second worker.
+'''
+
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from quiz_app.api.jobs import lease_next_job, run_job, work
+from quiz_app.models import Quiz, QuizJob
+
+@override_settings(QUIZ_ASYNC_JOBS=True)
+class QuizJobApiTests(APITestCase):
+    '''Tests for POST /api/createQuiz/ (async) and GET /api/jobs/<id>/.'''
+
+    def setUp(self):
+        '''Create an owner and another user.'''
+
+        self.owner = User.objects.create_user(username='u1', password='Abc123', email='u1@x.com')
+        self.other = User.objects.create_user(username='u2', password='Abc123', email='u2@x.com')
+
+    @patch('quiz_app.api.views.create_quiz_from_youtube')
+    def test_create_returns_202_with_job(self, mock_create):
+        '''The request only queues a job; the pipeline is not run in-process.'''
+
+        self.client.force_authenticate(self.owner)
+        resp = self.client.post(reverse('api-create-quiz'), {'url': 'https://youtu.be/AAAAAAAAAAA'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resp.data['status'], 'queued')
+        self.assertEqual(resp['Location'], reverse('api-job-detail', kwargs={'id': resp.data['id']}))
+        self.assertEqual(QuizJob.objects.get().video_url, 'https://www.youtube.com/watch?v=AAAAAAAAAAA')
+        mock_create.assert_not_called()
+
+    def test_create_invalid_url(self):
+        '''Unsupported URLs are rejected before a job is created.'''
+
+        self.client.force_authenticate(self.owner)
+        resp = self.client.post(reverse('api-create-quiz'), {'url': 'https://example.com/'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(QuizJob.objects.exists())
+
+    def test_job_detail_permissions(self):
+        '''Only the owner can read a job; unknown ids are 404.'''
+
+        job = QuizJob.objects.create(owner=self.owner, video_url='https://www.youtube.com/watch?v=AAAAAAAAAAA')
+        url = reverse('api-job-detail', kwargs={'id': job.id})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.owner)
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['stage'], 'queued')
+        self.assertIsNone(resp.data['quiz_id'])
+        self.assertEqual(self.client.get(reverse('api-job-detail', kwargs={'id': 9999})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+@override_settings(QUIZ_JOB_MAX_ATTEMPTS=2, QUIZ_JOB_LEASE_SEC=60)
+class QuizWorkerTests(TestCase):
+    '''Tests for leasing and running jobs.'''
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='u1', password='Abc123', email='u1@x.com')
+        self.job = QuizJob.objects.create(owner=self.owner, video_url='https://www.youtube.com/watch?v=AAAAAAAAAAA')
+
+    @patch('quiz_app.api.jobs.create_quiz_from_youtube')
+    def test_worker_runs_job(self, mock_create):
+        '''A successful run stores the quiz and marks the job done.'''
+
+        def pipeline(url, owner, num_questions, progress, **options):
+            progress('probe')
+            progress('transcribe', 0.5)
+            return Quiz.objects.create(owner=owner, title='T', description='D', video_url=url)
+        mock_create.side_effect = pipeline
+
+        self.assertEqual(work('w1', once=True), 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, QuizJob.STATUS_SUCCEEDED)
+        self.assertEqual(self.job.progress, 1.0)
+        self.assertEqual(self.job.quiz.title, 'T')
+        self.assertEqual(self.job.lease_owner, '')
+
+    @patch('quiz_app.api.jobs.create_quiz_from_youtube', side_effect=ValueError('Video too long.'))
+    def test_value_error_fails_job(self, _create):
+        '''Expected pipeline errors fail the job without retry.'''
+
+        run_job(lease_next_job('w1'), 'w1')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, QuizJob.STATUS_FAILED)
+        self.assertEqual(self.job.error, 'Video too long.')
+
+    @patch('quiz_app.api.jobs.create_quiz_from_youtube', side_effect=RuntimeError('boom'))
+    def test_unexpected_error_retried_then_failed(self, _create):
+        '''Unexpected errors requeue the job until attempts are exhausted.'''
+
+        run_job(lease_next_job('w1'), 'w1')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, QuizJob.STATUS_QUEUED)
+        run_job(lease_next_job('w1'), 'w1')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, QuizJob.STATUS_FAILED)
+        self.assertEqual(self.job.attempts, 2)
+
+    def test_expired_lease_is_reclaimed(self):
+        '''A job held by a dead worker is leased again once its lease expires.'''
+
+        self.assertIsNotNone(lease_next_job('dead'))
+        self.assertIsNone(lease_next_job('w2'))
+        QuizJob.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        job = lease_next_job('w2')
+        self.assertEqual(job.lease_owner, 'w2')
+        self.assertEqual(job.attempts, 2)
+
+@override_settings(QUIZ_JOB_LEASE_SEC=1)
+class LeaseHeartbeatTests(TransactionTestCase):
+    '''Tests for renewing leases during silent phases.'''
+
+    @patch('quiz_app.api.jobs.create_quiz_from_youtube')
+    def test_silent_phase_keeps_lease(self, mock_create):
+        '''A run that outlives its lease without reporting is not handed to another worker.'''
+
+        owner = User.objects.create_user(username='u1', password='Abc123')
+        QuizJob.objects.create(owner=owner, video_url='https://www.youtube.com/watch?v=AAAAAAAAAAA')
+        stolen = []
+
+        def pipeline(url, owner, num_questions, progress, **options):
+            progress('generate')
+            time.sleep(2.5)
+            stolen.append(lease_next_job('w2'))
+            return Quiz.objects.create(owner=owner, title='T', description='D', video_url=url)
+        mock_create.side_effect = pipeline
+
+        job = run_job(lease_next_job('w1'), 'w1')
+        self.assertEqual(stolen, [None])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (QuizJob.STATUS_SUCCEEDED, 1))
+        self.assertEqual(Quiz.objects.count(), 1)
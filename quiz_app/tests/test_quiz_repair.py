@@ -0,0 +1,80 @@
+'''Tests for structured-output Gemini calls and targeted question repair.
+
+Covers:
+- Calls are made in JSON mode with a schema requiring exactly
+  `num_questions` questions of four options.
+- One invalid question is regenerated by a small follow-up call; the valid
+  questions are kept unchanged.
+- With repair disabled (or still invalid afterwards) a ValueError is raised.
+- Non-JSON responses raise a ValueError.
+'''
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from quiz_app.api import gemini, services
+from quiz_app.api.schemas import quiz_schema
+
+def question(title: str, answer: str = 'a') -> dict:
+    return {'question_title': title, 'question_options': ['a', 'b', 'c', 'd'], 'answer': answer}
+
+def responses(*payloads):
+    client = MagicMock()
+    client.models.generate_content.side_effect = [
+        SimpleNamespace(text=p if isinstance(p, str) else json.dumps(p)) for p in payloads
+    ]
+    client.aio.models.generate_content = AsyncMock(side_effect=lambda **kwargs: client.models.generate_content(**kwargs))
+    return client
+
+@override_settings(GEMINI_API_KEY='k', QUIZ_REPAIR_ATTEMPTS=1)
+@patch('quiz_app.api.mapreduce._encoding', return_value=None)
+class QuizRepairTests(SimpleTestCase):
+    '''Tests for generate_quiz_with_gemini() with JSON mode and repair.'''
+
+    def test_schema_config(self, _enc):
+        '''The schema mirrors validate_quiz_dict() and is sent with the call.'''
+
+        schema = quiz_schema(3)
+        self.assertEqual(schema['properties']['questions']['min_items'], 3)
+        self.assertEqual(schema['properties']['questions']['items']['properties']['question_options']['max_items'], 4)
+        config = gemini.json_config(schema)
+        self.assertEqual(config.response_mime_type, 'application/json')
+
+        quiz = {'title': 'T', 'description': 'D', 'questions': [question('Q1')]}
+        client = responses(quiz)
+        with patch('quiz_app.api.gemini.get_client', return_value=client):
+            self.assertEqual(services.generate_quiz_with_gemini('text.', num_questions=1), quiz)
+        sent = client.models.generate_content.call_args.kwargs['config']
+        self.assertEqual(sent.response_mime_type, 'application/json')
+
+    def test_only_invalid_question_regenerated(self, _enc):
+        '''A bad answer triggers one repair call for exactly one question.'''
+
+        quiz = {'title': 'T', 'description': 'D', 'questions': [question('Q1'), question('Q2', answer='z')]}
+        client = responses(quiz, {'questions': [question('Q3')]})
+        with patch('quiz_app.api.gemini.get_client', return_value=client):
+            result = services.generate_quiz_with_gemini('text.', num_questions=2)
+        self.assertEqual([q['question_title'] for q in result['questions']], ['Q1', 'Q3'])
+        repair_prompt = client.models.generate_content.call_args.kwargs['contents']
+        self.assertIn('exactly 1 more', repair_prompt)
+        self.assertIn('- Q1', repair_prompt)
+        self.assertIn('Answer must be one of question_options.', repair_prompt)
+
+    @override_settings(QUIZ_REPAIR_ATTEMPTS=0)
+    def test_repair_disabled(self, _enc):
+        '''Without repair attempts an invalid quiz is rejected.'''
+
+        quiz = {'title': 'T', 'description': 'D', 'questions': [question('Q1', answer='z')]}
+        with patch('quiz_app.api.gemini.get_client', return_value=responses(quiz)):
+            with self.assertRaisesMessage(ValueError, 'exactly 1 questions'):
+                services.generate_quiz_with_gemini('text.', num_questions=1)
+
+    def test_invalid_json(self, _enc):
+        '''A non-JSON body is reported as a ValueError.'''
+
+        with patch('quiz_app.api.gemini.get_client', return_value=responses('not json')):
+            with self.assertRaisesMessage(ValueError, 'invalid JSON'):
+                services.generate_quiz_with_gemini('text.', num_questions=1)
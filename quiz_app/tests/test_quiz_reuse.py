@@ -0,0 +1,80 @@
+'''Tests for reusing generated quiz payloads across owners.
+
+Covers:
+- With QUIZ_REUSE_GENERATED on, a second request for the same video and
+  question count clones the stored payload without calling Gemini.
+- A changed prompt version or decoding preset is a cache miss.
+- With the mode off, Gemini is called every time.
+
+Notes:
+- Availability checks, transcription and Gemini are patched out.
+'''
+
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from quiz_app.api import services
+from quiz_app.models import Quiz
+
+QUIZ = {
+    'title': 'T',
+    'description': 'D',
+    'questions': [
+        {'question_title': 'Q1', 'question_options': ['A', 'B', 'C', 'D'], 'answer': 'A'},
+        {'question_title': 'Q2', 'question_options': ['A', 'B', 'C', 'D'], 'answer': 'B'},
+    ],
+}
+
+@patch('quiz_app.api.services.obtain_transcript', return_value='transcript')
+@patch('quiz_app.api.services.ensure_video_available', return_value={})
+class QuizReuseTests(TestCase):
+    '''Tests for the QUIZ_REUSE_GENERATED mode of create_quiz_from_youtube().'''
+
+    def setUp(self):
+        self.u1 = User.objects.create_user(username='u1', password='Abc123', email='u1@x.com')
+        self.u2 = User.objects.create_user(username='u2', password='Abc123', email='u2@x.com')
+
+    @override_settings(QUIZ_REUSE_GENERATED=True)
+    @patch('quiz_app.api.services.generate_quiz_with_gemini', return_value=QUIZ)
+    def test_second_request_is_cloned(self, mock_gemini, *_):
+        '''The second owner gets an independent copy without a Gemini call.'''
+
+        first = services.create_quiz_from_youtube('https://youtu.be/AAAAAAAAAAA', owner=self.u1, num_questions=2)
+        second = services.create_quiz_from_youtube('https://youtu.be/AAAAAAAAAAA', owner=self.u2, num_questions=2)
+        mock_gemini.assert_called_once()
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(second.owner, self.u2)
+        self.assertEqual(second.questions.count(), 2)
+
+    @override_settings(QUIZ_REUSE_GENERATED=True)
+    @patch('quiz_app.api.services.generate_quiz_with_gemini', return_value=QUIZ)
+    def test_prompt_change_invalidates(self, mock_gemini, *_):
+        '''Payloads stored under another prompt version are not reused.'''
+
+        services.create_quiz_from_youtube('https://youtu.be/AAAAAAAAAAA', owner=self.u1, num_questions=2)
+        with patch('quiz_app.api.services.prompt_version', return_value='changed'):
+            services.create_quiz_from_youtube('https://youtu.be/AAAAAAAAAAA', owner=self.u2, num_questions=2)
+        self.assertEqual(mock_gemini.call_count, 2)
+
+    @override_settings(QUIZ_REUSE_GENERATED=True)
+    @patch('quiz_app.api.services.generate_quiz_with_gemini', return_value=QUIZ)
+    def test_preset_change_invalidates(self, mock_gemini, *_):
+        '''Payloads built from another preset's transcript are not reused.'''
+
+        services.create_quiz_from_youtube('https://youtu.be/AAAAAAAAAAA', owner=self.u1, num_questions=2, preset='fast')
+        services.create_quiz_from_youtube('https://youtu.be/AAAAAAAAAAA', owner=self.u2, num_questions=2,
+                                          preset='accurate')
+        services.create_quiz_from_youtube('https://youtu.be/AAAAAAAAAAA', owner=self.u2, num_questions=2, preset='fast')
+        self.assertEqual(mock_gemini.call_count, 2)
+
+    @override_settings(QUIZ_REUSE_GENERATED=False)
+    @patch('quiz_app.api.services.generate_quiz_with_gemini', return_value=QUIZ)
+    def test_disabled_by_default(self, mock_gemini, *_):
+        '''Without the mode every request calls Gemini.'''
+
+        services.create_quiz_from_youtube('https://youtu.be/AAAAAAAAAAA', owner=self.u1, num_questions=2)
+        services.create_quiz_from_youtube('https://youtu.be/AAAAAAAAAAA', owner=self.u2, num_questions=2)
+        self.assertEqual(mock_gemini.call_count, 2)
+        self.assertEqual(Quiz.objects.count(), 2)
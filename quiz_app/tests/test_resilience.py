@@ -0,0 +1,202 @@
+'''Tests for retries and circuit breakers around Gemini and YouTube.
+
+Covers:
+- Transient errors (Gemini 503, yt-dlp transport errors wrapped in
+  DownloadError) are retried; permanent ones (4xx, unavailable video) are not.
+- Exhausted retries raise DependencyUnavailable; enough failures open the
+  breaker, which then fails fast without calling the dependency.
+- After the cooldown one trial call goes through and closes the breaker on
+  success or reopens it on failure. Errors that are not an answer of the
+  dependency (a cancelled job, a bug) leave it as it is.
+- POST /api/createQuiz/ (sync mode) answers DependencyUnavailable with 503
+  and a Retry-After header.
+- A job hit by an outage is requeued without using up an attempt and is not
+  leased again before its not_before time.
+
+Notes:
+- Backoff is set to zero; breaker state lives in the local-memory cache and
+  is cleared before each test.
+'''
+
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from google.genai import errors as genai_errors
+from rest_framework import status
+from rest_framework.test import APITestCase
+from yt_dlp.networking.exceptions import TransportError
+from yt_dlp.utils import DownloadError, ExtractorError
+
+from quiz_app.api import resilience, services
+from quiz_app.api.jobs import enqueue_quiz_job, lease_next_job, run_job
+from quiz_app.api.resilience import CircuitBreaker, DependencyUnavailable
+from quiz_app.models import QuizJob
+
+URL = 'https://youtu.be/AAAAAAAAAAA'
+
+def gemini_error(code: int) -> genai_errors.APIError:
+    return genai_errors.APIError(code, {'error': {'message': 'upstream', 'status': 'UNAVAILABLE'}})
+
+def youtube_network_error() -> DownloadError:
+    cause = TransportError('Connection reset by peer')
+    return DownloadError('ERROR: Unable to download webpage', exc_info=(type(cause), cause, None))
+
+FAST = dict(QUIZ_RETRY_ATTEMPTS=3, QUIZ_RETRY_BACKOFF_SEC=0, QUIZ_RETRY_MAX_WAIT_SEC=0,
+            QUIZ_BREAKER_FAILURES=2, QUIZ_BREAKER_WINDOW_SEC=60, QUIZ_BREAKER_COOLDOWN_SEC=30)
+
+class ResilienceCase(SimpleTestCase):
+    '''Clears breaker state around each test.'''
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+@override_settings(**FAST)
+class RetryTests(ResilienceCase):
+    '''Tests for resilience.call().'''
+
+    def test_transient_errors_are_retried(self):
+        '''A Gemini 503 and a dropped YouTube connection succeed on the next attempt.'''
+
+        for dependency, error in (('gemini', gemini_error(503)), ('youtube', youtube_network_error())):
+            fn = MagicMock(side_effect=[error, 'ok'])
+            self.assertEqual(resilience.call(dependency, fn, 1, key='v'), 'ok')
+            self.assertEqual(fn.call_count, 2)
+            fn.assert_called_with(1, key='v')
+
+    def test_permanent_errors_are_not(self):
+        '''Client errors and unavailable videos are raised unchanged after one call.'''
+
+        unavailable = ExtractorError('Video unavailable', expected=True)
+        for dependency, error in (('gemini', gemini_error(400)),
+                                  ('youtube', DownloadError('Video unavailable', (ExtractorError, unavailable, None)))):
+            fn = MagicMock(side_effect=error)
+            with self.assertRaises(type(error)):
+                resilience.call(dependency, fn)
+            self.assertEqual(fn.call_count, 1)
+        self.assertFalse(CircuitBreaker('gemini').is_open())
+
+    def test_exhausted_retries(self):
+        '''Persistent transient errors end in DependencyUnavailable; the breaker counts them.'''
+
+        fn = MagicMock(side_effect=TimeoutError('read timed out'))
+        with self.assertRaises(DependencyUnavailable) as ctx:
+            resilience.call('gemini', fn)
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(ctx.exception.retry_after, 30)
+        self.assertIn('Gemini is temporarily unavailable', str(ctx.exception))
+        self.assertFalse(CircuitBreaker('gemini').is_open())
+
+@override_settings(**FAST)
+class BreakerTests(ResilienceCase):
+    '''Tests for the open / half-open / closed cycle.'''
+
+    def _trip(self, dependency='gemini'):
+        for _ in range(2):
+            with self.assertRaises(DependencyUnavailable):
+                resilience.call(dependency, MagicMock(side_effect=gemini_error(503)))
+
+    def test_open_fails_fast(self):
+        '''Once open, the dependency is not called at all; other dependencies are unaffected.'''
+
+        self._trip()
+        fn = MagicMock(return_value='ok')
+        with self.assertRaises(DependencyUnavailable) as ctx:
+            resilience.call('gemini', fn)
+        fn.assert_not_called()
+        self.assertGreater(ctx.exception.retry_after, 25)
+        self.assertEqual(resilience.call('youtube', fn), 'ok')
+
+    def test_trial_call_after_cooldown(self):
+        '''One trial call at a time; its success closes the breaker, its failure reopens it.'''
+
+        self._trip()
+        with patch('quiz_app.api.resilience.time.time', return_value=resilience.time.time() + 31):
+            breaker = CircuitBreaker('gemini')
+            breaker.before_call()
+            with self.assertRaises(DependencyUnavailable):
+                breaker.before_call()
+            breaker.record_failure()
+            self.assertTrue(breaker.is_open())
+
+        with patch('quiz_app.api.resilience.time.time', return_value=resilience.time.time() + 62):
+            self.assertEqual(resilience.call('gemini', MagicMock(return_value='ok')), 'ok')
+        self.assertFalse(CircuitBreaker('gemini').is_open())
+        self.assertEqual(resilience.call('gemini', MagicMock(return_value='ok')), 'ok')
+
+    def test_errors_without_response(self):
+        '''Our own errors neither count as failures nor close a half-open breaker.'''
+
+        with self.assertRaises(DependencyUnavailable):
+            resilience.call('gemini', MagicMock(side_effect=gemini_error(503)))
+        with self.assertRaises(KeyError):
+            resilience.call('gemini', MagicMock(side_effect=KeyError('bug')))
+        with self.assertRaises(DependencyUnavailable):
+            resilience.call('gemini', MagicMock(side_effect=gemini_error(503)))
+        self.assertTrue(CircuitBreaker('gemini').is_open())
+
+        with patch('quiz_app.api.resilience.time.time', return_value=resilience.time.time() + 31):
+            with self.assertRaises(ValueError):
+                resilience.call('gemini', MagicMock(side_effect=ValueError('Job #1 was cancelled.')))
+            self.assertIsNotNone(cache.get('quiz:breaker:gemini:open_until'))
+            with self.assertRaises(genai_errors.APIError):
+                resilience.call('gemini', MagicMock(side_effect=gemini_error(400)))
+        self.assertFalse(CircuitBreaker('gemini').is_open())
+
+    @override_settings(GEMINI_API_KEY='k')
+    @patch('quiz_app.api.gemini.get_client')
+    def test_gemini_requests_fail_fast(self, mock_client):
+        '''Quiz calls keep DependencyUnavailable instead of "Gemini request failed".'''
+
+        generate = mock_client.return_value.aio.models.generate_content = AsyncMock(side_effect=gemini_error(503))
+        with self.assertRaises(DependencyUnavailable):
+            services.generate_quiz_with_gemini('hello world', num_questions=2)
+        with self.assertRaises(DependencyUnavailable):
+            services.generate_quiz_with_gemini('hello world', num_questions=2)
+        calls = generate.call_count
+        with self.assertRaises(DependencyUnavailable):
+            services.generate_quiz_with_gemini('hello world', num_questions=2)
+        self.assertEqual(generate.call_count, calls)
+
+@override_settings(QUIZ_ASYNC_JOBS=False, **FAST)
+class CreateQuizUnavailableTests(APITestCase):
+    '''Tests for the 503 response.'''
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_authenticate(User.objects.create_user(username='u1', password='Abc123'))
+
+    @patch('quiz_app.api.views.create_quiz_from_youtube', side_effect=DependencyUnavailable('gemini', 12))
+    def test_service_unavailable(self, _create):
+        '''The response carries the message and a Retry-After header.'''
+
+        resp = self.client.post(reverse('api-create-quiz'), {'url': URL}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(resp['Retry-After'], '12')
+        self.assertIn('Gemini', resp.data['detail'])
+
+@override_settings(QUIZ_JOB_MAX_ATTEMPTS=1)
+class DeferredJobTests(TestCase):
+    '''Tests for requeueing jobs during an outage.'''
+
+    @patch('quiz_app.api.jobs.create_quiz_from_youtube', side_effect=DependencyUnavailable('youtube', 30))
+    def test_requeued_until_not_before(self, _create):
+        '''The job waits for the cooldown and keeps its single attempt.'''
+
+        owner = User.objects.create_user(username='u1', password='Abc123')
+        enqueue_quiz_job(URL, owner, num_questions=2)
+        run_job(lease_next_job('w1'), 'w1')
+        job = QuizJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (QuizJob.STATUS_QUEUED, 0))
+        self.assertIn('YouTube is temporarily unavailable', job.error)
+        self.assertGreater(job.not_before, timezone.now() + timedelta(seconds=25))
+        self.assertIsNone(lease_next_job('w1'))
+
+        QuizJob.objects.update(not_before=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(lease_next_job('w1').pk, job.pk)
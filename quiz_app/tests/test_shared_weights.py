@@ -0,0 +1,109 @@
+'''Tests for sharing preloaded Whisper weights between forked workers.
+
+Covers:
+- process_memory() reports RSS (and PSS/shared/private where /proc has
+  smaps_rollup); format_memory() renders MiB.
+- freeze_for_fork() moves objects into the permanent generation.
+- preload_configured() preloads the model when WHISPER_SHARE_WEIGHTS is
+  set and moves it into shared memory for 'shm'; web processes skip it
+  while jobs run in background workers.
+- QuizAppConfig.ready() rejects unknown modes and loads nothing.
+- run_quiz_worker preloads before it starts working.
+
+Notes:
+- whisper.load_model is patched; no checkpoint is ever downloaded.
+'''
+
+import gc, os
+from unittest.mock import MagicMock, patch
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from quiz_app.api import memory, whisper_models
+
+class MemoryTests(SimpleTestCase):
+    '''Tests for quiz_app.api.memory.'''
+
+    def test_process_memory(self):
+        '''RSS is always reported; PSS splits shared pages where available.'''
+
+        figures = memory.process_memory()
+        self.assertGreater(figures['rss'], 0)
+        if os.path.exists('/proc/self/smaps_rollup'):
+            self.assertLessEqual(figures['pss'], figures['rss'])
+            self.assertEqual(set(figures), {'rss', 'pss', 'shared', 'private'})
+        self.assertEqual(memory.format_memory({'rss': 3 * 2 ** 20}), 'rss=3.0MiB')
+
+    def test_freeze_for_fork(self):
+        '''Surviving objects are excluded from later collections.'''
+
+        self.addCleanup(gc.unfreeze)
+        memory.freeze_for_fork()
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+class SharedPreloadTests(SimpleTestCase):
+    '''Tests for whisper_models.preload_configured() and QuizAppConfig.ready().'''
+
+    def setUp(self):
+        whisper_models.clear()
+        self.addCleanup(whisper_models.clear)
+
+    @override_settings(WHISPER_SHARE_WEIGHTS='shm', WHISPER_PRELOAD=False, WHISPER_MODEL='tiny', WHISPER_BACKEND='openai')
+    @patch('whisper.load_model')
+    def test_shm_preloads_and_shares(self, mock_load):
+        '''The model is loaded at boot and its tensors moved to shared memory.'''
+
+        model = MagicMock()
+        mock_load.return_value = model
+        with self.assertLogs('quiz_app.api.memory', 'INFO') as logs:
+            self.assertEqual(whisper_models.preload_configured('Preloaded:'), ['tiny'])
+        self.assertEqual(whisper_models.loaded_models(), ['tiny'])
+        model.share_memory.assert_called_once_with()
+        self.assertIn('rss=', logs.output[0])
+
+    @override_settings(WHISPER_SHARE_WEIGHTS='fork', WHISPER_PRELOAD=False, WHISPER_MODEL='tiny', WHISPER_BACKEND='openai')
+    @patch('whisper.load_model')
+    def test_fork_preloads_only(self, mock_load):
+        '''Copy-on-write mode preloads without copying weights to shared memory.'''
+
+        model = MagicMock()
+        mock_load.return_value = model
+        whisper_models.preload_configured('Preloaded:')
+        self.assertEqual(whisper_models.loaded_models(), ['tiny'])
+        model.share_memory.assert_not_called()
+
+    @override_settings(WHISPER_SHARE_WEIGHTS='fork', WHISPER_PRELOAD=True, WHISPER_MODEL='tiny', WHISPER_BACKEND='openai')
+    @patch('whisper.load_model')
+    def test_only_transcribing_processes_preload(self, mock_load):
+        '''App setup and web processes with background jobs load nothing.'''
+
+        apps.get_app_config('quiz_app').ready()
+        with override_settings(QUIZ_ASYNC_JOBS=True):
+            self.assertEqual(whisper_models.preload_configured('Preloaded:', web=True), [])
+        mock_load.assert_not_called()
+        with override_settings(QUIZ_ASYNC_JOBS=False):
+            self.assertEqual(whisper_models.preload_configured('Preloaded:', web=True), ['tiny'])
+
+    @override_settings(WHISPER_SHARE_WEIGHTS='fork', WHISPER_MODEL='tiny', WHISPER_BACKEND='openai')
+    @patch('whisper.load_model')
+    def test_worker_preloads(self, mock_load):
+        '''run_quiz_worker loads the model before its first job.'''
+
+        def work(worker_id, **kwargs):
+            self.assertEqual(whisper_models.loaded_models(), ['tiny'])
+            return 0
+
+        with patch('quiz_app.management.commands.run_quiz_worker.work', side_effect=work) as mock_work, \
+             patch('quiz_app.management.commands.run_quiz_worker.signal.signal'):
+            call_command('run_quiz_worker', '--once', '--processes', '1', stdout=MagicMock())
+        mock_work.assert_called_once()
+
+    @override_settings(WHISPER_SHARE_WEIGHTS='mmap')
+    def test_unknown_mode(self):
+        '''Typos fail loudly at startup.'''
+
+        with self.assertRaises(ImproperlyConfigured):
+            apps.get_app_config('quiz_app').ready()
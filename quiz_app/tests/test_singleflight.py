@@ -0,0 +1,148 @@
+'''Tests for single-flight coalescing of duplicate pipeline work.
+
+Covers:
+- Concurrent callers in one process share a single compute() call and its
+  result (or exception).
+- Waiting followers call on_wait() while the leader computes, and take
+  over instead of failing when the leader is Abandoned.
+- The cross-process lock table: exclusive acquisition, release by owner
+  only, renewal, and stealing an expired lock.
+- The leader keeps renewing its lock while compute() outlives the lock
+  lifetime.
+- A stored result short-circuits compute() entirely.
+'''
+
+import threading, time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from quiz_app.api.singleflight import Abandoned, _run_locked, acquire_lock, coalesce, release_lock, renew_lock
+from quiz_app.models import PipelineLock
+
+def _run_direct(key, compute, lookup, on_wait=None):
+    return compute()
+
+@override_settings(QUIZ_SINGLE_FLIGHT=True)
+@patch('quiz_app.api.singleflight._run_locked', side_effect=_run_direct)
+class InProcessCoalesceTests(SimpleTestCase):
+    '''Tests for coalesce() within a single process.'''
+
+    def _concurrent(self, compute, n=5, lookup=lambda: None):
+        results, errors = [], []
+        def call():
+            try:
+                results.append(coalesce('k', compute, lookup))
+            except (ValueError, Abandoned) as e:
+                errors.append(e)
+        threads = [threading.Thread(target=call) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        return results, errors
+
+    def test_concurrent_callers_share_result(self, _locked):
+        '''Only the leader computes; followers get the same value.'''
+
+        gate, calls = threading.Event(), []
+        def compute():
+            calls.append(1)
+            gate.wait(2)
+            return 'payload'
+        threading.Timer(0.2, gate.set).start()
+        results, _ = self._concurrent(compute)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['payload'] * 5)
+
+    def test_followers_receive_leader_error(self, _locked):
+        '''A failure of the leader is raised in every waiting caller.'''
+
+        gate = threading.Event()
+        def compute():
+            gate.wait(2)
+            raise ValueError('Video too long.')
+        threading.Timer(0.2, gate.set).start()
+        results, errors = self._concurrent(compute)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 5)
+
+    def test_followers_report_waiting(self, _locked):
+        '''Followers call on_wait() about once a second until the leader finishes.'''
+
+        gate, waits = threading.Event(), []
+        threading.Timer(1.5, gate.set).start()
+        leader = threading.Thread(target=coalesce, args=('k', lambda: gate.wait(3), lambda: None))
+        leader.start()
+        time.sleep(0.1)
+        self.assertTrue(coalesce('k', self.fail, lambda: None, on_wait=lambda: waits.append(1)))
+        leader.join(5)
+        self.assertEqual(len(waits), 1)
+
+    def test_abandoned_leader_hands_over(self, _locked):
+        '''When the leader is abandoned, one follower computes and the others share its result.'''
+
+        gate, calls, stored = threading.Event(), [], {}
+        def compute():
+            calls.append(1)
+            if len(calls) == 1:
+                gate.wait(2)
+                raise Abandoned('cancelled')
+            stored['k'] = 'payload'
+            return 'payload'
+        threading.Timer(0.2, gate.set).start()
+        results, errors = self._concurrent(compute, lookup=lambda: stored.get('k'))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(results, ['payload'] * 4)
+        self.assertEqual([type(e) for e in errors], [Abandoned])
+
+    def test_lookup_hit_skips_compute(self, _locked):
+        '''A stored result is returned without computing.'''
+
+        self.assertEqual(coalesce('k', lambda: self.fail('computed'), lambda: 'cached'), 'cached')
+
+class PipelineLockTests(TestCase):
+    '''Tests for the cross-process lock table.'''
+
+    def test_lock_is_exclusive_until_released(self):
+        '''A held lock cannot be taken; only its owner can release it.'''
+
+        self.assertTrue(acquire_lock('quiz:AAAAAAAAAAA', 'a'))
+        self.assertFalse(acquire_lock('quiz:AAAAAAAAAAA', 'b'))
+        release_lock('quiz:AAAAAAAAAAA', 'b')
+        self.assertFalse(acquire_lock('quiz:AAAAAAAAAAA', 'b'))
+        release_lock('quiz:AAAAAAAAAAA', 'a')
+        self.assertTrue(acquire_lock('quiz:AAAAAAAAAAA', 'b'))
+
+    def test_renew_extends_owned_lock_only(self):
+        '''Renewal pushes expires_at out for the owner and reports a lost lock.'''
+
+        acquire_lock('quiz:AAAAAAAAAAA', 'a')
+        PipelineLock.objects.update(expires_at=timezone.now() + timedelta(seconds=1))
+        self.assertFalse(renew_lock('quiz:AAAAAAAAAAA', 'b'))
+        self.assertTrue(renew_lock('quiz:AAAAAAAAAAA', 'a'))
+        self.assertGreater(PipelineLock.objects.get().expires_at, timezone.now() + timedelta(seconds=60))
+
+    def test_expired_lock_is_stolen(self):
+        '''A lock left behind by a crashed process expires.'''
+
+        acquire_lock('quiz:AAAAAAAAAAA', 'a')
+        PipelineLock.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(acquire_lock('quiz:AAAAAAAAAAA', 'b'))
+        self.assertEqual(PipelineLock.objects.get().owner, 'b')
+
+@override_settings(QUIZ_SINGLE_FLIGHT_LOCK_SEC=1)
+class LockRenewalTests(TransactionTestCase):
+    '''Tests for the leader's lock renewal.'''
+
+    def test_lock_outlives_its_lifetime_while_computing(self):
+        '''A leader running past QUIZ_SINGLE_FLIGHT_LOCK_SEC keeps its lock until it returns.'''
+
+        def compute():
+            time.sleep(2.5)
+            return acquire_lock('quiz:AAAAAAAAAAA', 'other')
+
+        self.assertFalse(_run_locked('quiz:AAAAAAAAAAA', compute, lambda: None))
+        self.assertFalse(PipelineLock.objects.exists())
@@ -0,0 +1,83 @@
+'''Tests for the shared transcript cache.
+
+Covers:
+- Entries are keyed by video id, model name and transcription options.
+- Age- and size-based eviction.
+- obtain_transcript() serves a cached transcript without downloading, and
+  stores a fresh Whisper transcript for the next request.
+- Whisper transcripts of another backend or VAD setting are not served.
+'''
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from quiz_app.api import services
+from quiz_app.api.caching import evict_transcripts, get_cached_transcript, store_transcript
+from quiz_app.models import Transcript
+
+VIDEO_URL = 'https://www.youtube.com/watch?v=AAAAAAAAAAA'
+
+class TranscriptCacheTests(TestCase):
+    '''Tests for quiz_app.api.caching transcript helpers.'''
+
+    def test_key_includes_model_and_options(self):
+        '''A different model or options set is a cache miss.'''
+
+        store_transcript('AAAAAAAAAAA', 'small', 'text', {'beam_size': 5})
+        self.assertEqual(get_cached_transcript('AAAAAAAAAAA', 'small', {'beam_size': 5}), 'text')
+        self.assertIsNone(get_cached_transcript('AAAAAAAAAAA', 'base', {'beam_size': 5}))
+        self.assertIsNone(get_cached_transcript('AAAAAAAAAAA', 'small', {}))
+
+    @override_settings(QUIZ_TRANSCRIPT_CACHE_MAX_AGE_SEC=60)
+    def test_expired_entries_evicted(self):
+        '''Entries older than the max age are neither served nor kept.'''
+
+        store_transcript('AAAAAAAAAAA', 'small', 'old')
+        Transcript.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertIsNone(get_cached_transcript('AAAAAAAAAAA', 'small'))
+        evict_transcripts()
+        self.assertFalse(Transcript.objects.exists())
+
+    @override_settings(QUIZ_TRANSCRIPT_CACHE_MAX_CHARS=10)
+    def test_size_eviction_drops_least_recently_used(self):
+        '''Once over budget, the least recently used entries go first.'''
+
+        store_transcript('AAAAAAAAAAA', 'small', 'x' * 6)
+        Transcript.objects.update(last_used_at=timezone.now() - timedelta(minutes=1))
+        store_transcript('BBBBBBBBBBB', 'small', 'y' * 6)
+        self.assertEqual(list(Transcript.objects.values_list('video_id', flat=True)), ['BBBBBBBBBBB'])
+
+@override_settings(QUIZ_CAPTIONS_FIRST=False, WHISPER_MODEL='small')
+class ObtainTranscriptCacheTests(TestCase):
+    '''Tests for the cache integration in services.obtain_transcript().'''
+
+    @patch('quiz_app.api.services.download_audio')
+    def test_cache_hit_skips_download(self, mock_download):
+        '''A cached transcript is returned without touching yt-dlp.'''
+
+        store_transcript('AAAAAAAAAAA', 'small', 'cached text', services.whisper_cache_options())
+        self.assertEqual(services.obtain_transcript(VIDEO_URL, {}), 'cached text')
+        mock_download.assert_not_called()
+
+    def test_backend_and_vad_in_key(self):
+        '''An int8 or unfiltered transcript is a miss for the default setup, and the other way round.'''
+
+        store_transcript('AAAAAAAAAAA', 'small', 'fp32 text', services.whisper_cache_options())
+        self.assertEqual(services.lookup_transcript('AAAAAAAAAAA'), 'fp32 text')
+        with override_settings(WHISPER_BACKEND='int8'):
+            self.assertIsNone(services.lookup_transcript('AAAAAAAAAAA'))
+        with override_settings(QUIZ_VAD=False):
+            self.assertIsNone(services.lookup_transcript('AAAAAAAAAAA'))
+
+    @patch('quiz_app.api.services.transcribe_audio', return_value='fresh text')
+    @patch('quiz_app.api.services.download_audio', return_value='/nonexistent/audio.m4a')
+    def test_miss_populates_cache(self, mock_download, _transcribe):
+        '''A Whisper transcript is stored and reused by the next call.'''
+
+        services.obtain_transcript(VIDEO_URL, {})
+        services.obtain_transcript(VIDEO_URL, {})
+        mock_download.assert_called_once()
+        self.assertEqual(get_cached_transcript('AAAAAAAAAAA', 'small', services.whisper_cache_options()), 'fresh text')
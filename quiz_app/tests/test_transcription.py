@@ -0,0 +1,172 @@
+'''Tests for chunked Whisper transcription helpers.
+
+Covers:
+- split_on_silence() covers the whole input with overlapping ranges and
+  moves boundaries onto silent stretches.
+- iter_chunks() cuts a block stream incrementally with the same rules.
+- stitch() removes words duplicated across chunk overlaps.
+- Pool workers keep at most `cache_size` models, least recently used first out.
+- get_pool() shares one pool between models with the same worker settings.
+- transcribe_chunks() rebuilds a pool whose worker died and resubmits the
+  unfinished chunks once; a second failure propagates.
+'''
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from quiz_app.api import transcription
+from quiz_app.api.transcription import SAMPLE_RATE, iter_chunks, split_on_silence, stitch
+
+class SplitOnSilenceTests(SimpleTestCase):
+    '''Tests for split_on_silence().'''
+
+    def test_short_audio_is_single_chunk(self):
+        '''Audio shorter than one chunk is not split.'''
+
+        audio = np.ones(SAMPLE_RATE * 5, dtype=np.float32)
+        self.assertEqual(split_on_silence(audio, chunk_sec=10, overlap_sec=1), [(0, len(audio))])
+
+    def test_ranges_overlap_and_cover_input(self):
+        '''Consecutive ranges overlap and the last one ends at the input end.'''
+
+        audio = np.random.default_rng(0).uniform(-1, 1, SAMPLE_RATE * 95).astype(np.float32)
+        ranges = split_on_silence(audio, chunk_sec=30, overlap_sec=2)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(audio))
+        for (_, prev_end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertLess(start, prev_end)
+
+    def test_boundary_snaps_to_silence(self):
+        '''The first cut lands inside a silent gap just before the nominal boundary.'''
+
+        audio = np.random.default_rng(1).uniform(-1, 1, SAMPLE_RATE * 60).astype(np.float32)
+        audio[SAMPLE_RATE * 27:SAMPLE_RATE * 28] = 0
+        (_, end), *_ = split_on_silence(audio, chunk_sec=30, overlap_sec=1, search_sec=5)
+        self.assertGreaterEqual(end, SAMPLE_RATE * 27)
+        self.assertLessEqual(end, SAMPLE_RATE * 28)
+
+class IterChunksTests(SimpleTestCase):
+    '''Tests for iter_chunks().'''
+
+    def test_matches_split_on_silence(self):
+        '''Streaming chunks equal the ranges computed on the full array.'''
+
+        audio = np.random.default_rng(2).uniform(-1, 1, SAMPLE_RATE * 95).astype(np.float32)
+        blocks = np.array_split(audio, 17)
+        chunks = list(iter_chunks(blocks, chunk_sec=30, overlap_sec=2))
+        ranges = split_on_silence(audio, chunk_sec=30, overlap_sec=2)
+        self.assertEqual([len(c) for c in chunks], [e - s for s, e in ranges])
+        np.testing.assert_array_equal(chunks[-1], audio[ranges[-1][0]:])
+
+    def test_first_chunk_before_stream_ends(self):
+        '''A chunk is produced before the last block has been consumed.'''
+
+        consumed = []
+        def blocks():
+            for i in range(10):
+                consumed.append(i)
+                yield np.ones(SAMPLE_RATE * 10, dtype=np.float32)
+        next(iter_chunks(blocks(), chunk_sec=30, overlap_sec=1))
+        self.assertLess(len(consumed), 10)
+
+class StitchTests(SimpleTestCase):
+    '''Tests for stitch().'''
+
+    def test_overlap_removed(self):
+        '''Words repeated at the seam are kept only once.'''
+
+        text = stitch(['the quick brown fox jumps', 'Fox jumps over the lazy dog.'])
+        self.assertEqual(text, 'the quick brown fox jumps over the lazy dog.')
+
+    def test_no_overlap(self):
+        '''Texts without a shared seam are simply joined.'''
+
+        self.assertEqual(stitch(['hello there', 'general kenobi']), 'hello there general kenobi')
+
+class WorkerModelTests(SimpleTestCase):
+    '''Tests for the model cache of pool workers.'''
+
+    def setUp(self):
+        for name in ('_worker_model_name', '_worker_models', '_worker_cache_size', '_worker_backend'):
+            self.addCleanup(setattr, transcription, name, getattr(transcription, name))
+        transcription._worker_models = OrderedDict()
+
+    @patch('quiz_app.api.transcription.configure_torch_threads')
+    @patch('quiz_app.api.transcription.get_backend')
+    def test_lru_bound(self, mock_backend, _threads):
+        '''A worker holds at most `cache_size` models; the preloaded one is the default.'''
+
+        backend = MagicMock()
+        backend.load.side_effect = lambda name: f"model-{name}"
+        mock_backend.return_value = backend
+        transcription.init_worker('small', 1, cache_size=2)
+        self.assertEqual(transcription._worker_model('tiny'), 'model-tiny')
+        self.assertEqual(transcription._worker_model(), 'model-small')
+        transcription._worker_model('base')
+        self.assertEqual(list(transcription._worker_models), ['small', 'base'])
+        self.assertEqual(transcription._worker_model('tiny'), 'model-tiny')
+        self.assertEqual(list(transcription._worker_models), ['base', 'tiny'])
+        self.assertEqual(backend.load.call_count, 4)
+
+
+class _FakePool:
+    '''Pool stand-in whose futures resolve at submit time.'''
+
+    def __init__(self, broken: bool):
+        self.broken = broken
+        self.submitted = 0
+
+    def submit(self, fn, chunk, options, model_name):
+        self.submitted += 1
+        future = Future()
+        if self.broken:
+            future.set_exception(BrokenProcessPool('worker died'))
+        else:
+            future.set_result(f"words{len(chunk)}")
+        return future
+
+
+class GetPoolTests(SimpleTestCase):
+    '''Tests for the chunk pool cache.'''
+
+    @patch('quiz_app.api.transcription.ProcessPoolExecutor')
+    def test_one_pool_for_all_models(self, mock_executor):
+        '''Models differ per task, so presets do not spawn extra pools.'''
+
+        self.addCleanup(transcription._pools.clear)
+        mock_executor.side_effect = lambda **kwargs: MagicMock()
+        pool = transcription.get_pool('small', 2, cache_size=2)
+        self.assertIs(transcription.get_pool('large-v3', 2, cache_size=2), pool)
+        self.assertIsNot(transcription.get_pool('small', 3, cache_size=2), pool)
+        self.assertEqual(mock_executor.call_args_list[0].kwargs['initargs'][-1], 2)
+
+
+class BrokenPoolTests(SimpleTestCase):
+    '''Tests for recovering from dead pool workers.'''
+
+    @patch('quiz_app.api.transcription.discard_pool')
+    @patch('quiz_app.api.transcription.get_pool')
+    def test_rebuilds_pool_once(self, mock_get_pool, mock_discard):
+        '''Chunks lost with a dead worker are resubmitted to a fresh pool.'''
+
+        broken, fresh = _FakePool(broken=True), _FakePool(broken=False)
+        mock_get_pool.side_effect = [broken, fresh, fresh]
+        chunks = [np.zeros(SAMPLE_RATE, dtype=np.float32), np.zeros(2 * SAMPLE_RATE, dtype=np.float32)]
+        text = transcription.transcribe_chunks(chunks, 'base', 2)
+        self.assertEqual(text, f"words{SAMPLE_RATE} words{2 * SAMPLE_RATE}")
+        mock_discard.assert_called_once_with(broken)
+        self.assertEqual(fresh.submitted, 2)
+
+    @patch('quiz_app.api.transcription.discard_pool')
+    @patch('quiz_app.api.transcription.get_pool')
+    def test_second_failure_propagates(self, mock_get_pool, _discard):
+        '''A pool that breaks again after the rebuild raises BrokenProcessPool.'''
+
+        mock_get_pool.side_effect = lambda *args: _FakePool(broken=True)
+        with self.assertRaises(BrokenProcessPool):
+            transcription.transcribe_chunks([np.zeros(SAMPLE_RATE, dtype=np.float32)], 'base', 1)
@@ -0,0 +1,137 @@
+'''Tests for dropping non-speech audio before transcription.
+
+Covers:
+- trim_silence() removes long pauses but keeps short ones, pads speech
+  regions and reports the skipped share.
+- Audio without pauses, and audio without anything above the floor, is
+  kept whole.
+- StreamTrimmer trims block streams window by window and drops windows
+  that are entirely silent.
+- transcribe_audio() hands Whisper the trimmed audio and reports a 'vad'
+  event; QUIZ_VAD=False disables it.
+- JobReporter keeps the skipped share on the job.
+
+Notes:
+- "Speech" is a 220 Hz tone with a syllable-rate envelope over low noise.
+'''
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from quiz_app.api import services, whisper_models
+from quiz_app.api.jobs import JobReporter
+from quiz_app.api.vad import SAMPLE_RATE, StreamTrimmer, trim_silence
+from quiz_app.models import QuizJob
+
+_rng = np.random.default_rng(0)
+
+def speech(sec: float) -> np.ndarray:
+    t = np.arange(int(sec * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.2 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))).astype(np.float32)
+
+def silence(sec: float) -> np.ndarray:
+    return (0.001 * _rng.standard_normal(int(sec * SAMPLE_RATE))).astype(np.float32)
+
+def lecture() -> np.ndarray:
+    '''10 s intro silence, 5 s speech, 0.5 s pause, 5 s speech, 20 s dead air, 3 s speech.'''
+
+    return np.concatenate([silence(10), speech(5), silence(0.5), speech(5), silence(20), speech(3)])
+
+class TrimSilenceTests(SimpleTestCase):
+    '''Tests for quiz_app.api.vad.'''
+
+    def test_drops_long_pauses(self):
+        '''Intro and dead air go, the short pause stays.'''
+
+        result = trim_silence(lecture())
+        self.assertEqual(len(result.regions), 2)
+        self.assertAlmostEqual(result.audio_sec, 43.5)
+        self.assertGreater(result.speech_sec, 13.5)
+        self.assertLess(result.speech_sec, 14.5)
+        self.assertAlmostEqual(result.skipped_fraction, 1 - result.speech_sec / 43.5)
+
+    def test_keeps_audio_without_pauses(self):
+        '''Continuous speech and inaudible recordings are passed through unchanged.'''
+
+        for audio in (speech(10), np.zeros(SAMPLE_RATE, dtype=np.float32)):
+            result = trim_silence(audio)
+            self.assertIs(result.audio, audio)
+            self.assertEqual(result.skipped_fraction, 0.0)
+
+    def test_stream_trimmer(self):
+        '''Windowed trimming of a block stream drops the same silence.'''
+
+        audio = lecture()
+        trimmer = StreamTrimmer(window_sec=30)
+        kept = np.concatenate(list(trimmer.trim(np.array_split(audio, 7))))
+        self.assertEqual(trimmer.total_samples, len(audio))
+        self.assertEqual(trimmer.kept_samples, len(kept))
+        self.assertGreater(trimmer.skipped_fraction, 0.6)
+
+    def test_stream_drops_silent_windows(self):
+        '''Windows of digital silence or low noise are dropped, not passed through.'''
+
+        audio = np.concatenate([speech(30), np.zeros(30 * SAMPLE_RATE, dtype=np.float32), silence(30), speech(30)])
+        trimmer = StreamTrimmer(window_sec=30)
+        kept = list(trimmer.trim(np.array_split(audio, 9)))
+        self.assertEqual([len(k) for k in kept[1:3]], [0, 0])
+        self.assertAlmostEqual(trimmer.skipped_fraction, 0.5, delta=0.02)
+
+@override_settings(WHISPER_MODEL='tiny', WHISPER_BACKEND='openai', WHISPER_WORKERS=1)
+@patch('quiz_app.api.services._require_ffmpeg')
+@patch('whisper.load_model')
+class TranscribeWithVadTests(SimpleTestCase):
+    '''Tests for VAD inside transcribe_audio().'''
+
+    def setUp(self):
+        whisper_models.clear()
+        self.addCleanup(whisper_models.clear)
+
+    def _model(self, mock_load):
+        model = MagicMock()
+        model.transcribe.return_value = {'text': 'hello'}
+        mock_load.return_value = model
+        return model
+
+    @override_settings(QUIZ_VAD=True)
+    def test_whisper_gets_speech_only(self, mock_load, _ffmpeg):
+        '''The model sees the trimmed audio and the job hears about the skipped share.'''
+
+        model = self._model(mock_load)
+        progress = MagicMock()
+        self.assertEqual(services.transcribe_audio(lecture(), progress=progress), 'hello')
+        audio = model.transcribe.call_args.args[0]
+        self.assertLess(len(audio) / SAMPLE_RATE, 15)
+        vad_calls = [c for c in progress.call_args_list if c.kwargs.get('event') == 'vad']
+        self.assertEqual(len(vad_calls), 1)
+        self.assertGreater(vad_calls[0].kwargs['skipped_fraction'], 0.6)
+        self.assertEqual(vad_calls[0].kwargs['audio_sec'], 43.5)
+
+    @override_settings(QUIZ_VAD=False)
+    def test_disabled(self, mock_load, _ffmpeg):
+        '''QUIZ_VAD=False transcribes everything.'''
+
+        model = self._model(mock_load)
+        audio = lecture()
+        services.transcribe_audio(audio)
+        self.assertIs(model.transcribe.call_args.args[0], audio)
+
+class JobReporterVadTests(TestCase):
+    '''Tests for storing the skipped share on the job.'''
+
+    def test_skipped_fraction_kept(self):
+        '''Later stages overwrite detail but not skipped_audio_fraction.'''
+
+        owner = User.objects.create_user(username='u1', password='Abc123')
+        job = QuizJob.objects.create(owner=owner, video_url='https://www.youtube.com/watch?v=AAAAAAAAAAA',
+                                     lease_owner='w1')
+        reporter = JobReporter(job, 'w1')
+        reporter('transcribe', 0.0, event='vad', audio_sec=100.0, speech_sec=60.0, skipped_fraction=0.4)
+        reporter('generate', 0.0)
+        job.refresh_from_db()
+        self.assertEqual(job.skipped_audio_fraction, 0.4)
+        self.assertNotIn('skipped_fraction', job.detail)
@@ -0,0 +1,110 @@
+'''Tests for the single yt-dlp probe and the video metadata cache.
+
+Covers:
+- Repeat availability checks for the same video hit the metadata cache.
+- Concurrent probes of one video make a single request; the per-video lock
+  is dropped once nobody uses it, also after a failed probe.
+- download_audio() reuses a probed info dict via process_ie_result()
+  instead of extracting the page again, and reports the final byte count
+  even when yt-dlp knows no total size.
+'''
+
+import tempfile, threading, time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from quiz_app.api import services
+
+VIDEO_URL = 'https://www.youtube.com/watch?v=AAAAAAAAAAA'
+
+@override_settings(QUIZ_METADATA_CACHE_TTL_SEC=60)
+class VideoProbeTests(SimpleTestCase):
+    '''Tests for probe_video(), ensure_video_available() and download_audio().'''
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @patch('quiz_app.api.services.yt_dlp.YoutubeDL')
+    def test_probe_is_cached(self, mock_ydl_cls):
+        '''Only the first availability check performs a network probe.'''
+
+        ydl = mock_ydl_cls.return_value.__enter__.return_value
+        ydl.extract_info.return_value = {'id': 'AAAAAAAAAAA', 'duration': 10}
+        ydl.sanitize_info.side_effect = lambda info: info
+
+        services.ensure_video_available(VIDEO_URL)
+        info = services.ensure_video_available(VIDEO_URL)
+        self.assertEqual(info['duration'], 10)
+        ydl.extract_info.assert_called_once()
+
+    @patch('quiz_app.api.services.yt_dlp.YoutubeDL')
+    def test_concurrent_probes(self, mock_ydl_cls):
+        '''Callers arriving during a probe wait for it instead of probing again.'''
+
+        ydl = mock_ydl_cls.return_value.__enter__.return_value
+        ydl.extract_info.side_effect = lambda *args, **kwargs: time.sleep(0.2) or {'id': 'AAAAAAAAAAA'}
+        ydl.sanitize_info.side_effect = lambda info: info
+
+        threads = [threading.Thread(target=services.probe_video, args=(VIDEO_URL,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+        ydl.extract_info.assert_called_once()
+        self.assertEqual(services._probe_locks, {})
+
+    @override_settings(QUIZ_RETRY_ATTEMPTS=1)
+    @patch('quiz_app.api.services.yt_dlp.YoutubeDL')
+    def test_failed_probe_releases_lock(self, mock_ydl_cls):
+        '''A probe error does not leave the per-video lock behind.'''
+
+        mock_ydl_cls.return_value.__enter__.return_value.extract_info.side_effect = KeyError('boom')
+        with self.assertRaises(KeyError):
+            services.probe_video(VIDEO_URL)
+        self.assertEqual(services._probe_locks, {})
+
+    @patch('quiz_app.api.services.yt_dlp.YoutubeDL')
+    def test_download_reuses_info(self, mock_ydl_cls):
+        '''Passing the probed info dict skips a second extract_info().'''
+
+        with tempfile.TemporaryDirectory() as tmp:
+            audio = Path(tmp) / 'AAAAAAAAAAA.webm'
+            audio.write_bytes(b'x')
+            ydl = mock_ydl_cls.return_value.__enter__.return_value
+            ydl.process_ie_result.return_value = {'id': 'AAAAAAAAAAA'}
+            ydl.prepare_filename.return_value = str(audio)
+
+            with override_settings(QUIZ_TMP_DIR=Path(tmp)):
+                path = services.download_audio(VIDEO_URL, info={'id': 'AAAAAAAAAAA'})
+
+        self.assertEqual(path, str(audio))
+        ydl.process_ie_result.assert_called_once()
+        ydl.extract_info.assert_not_called()
+
+    @patch('quiz_app.api.services.yt_dlp.YoutubeDL')
+    def test_download_reports_bytes(self, mock_ydl_cls):
+        '''The byte count is reported once the download is done, without a known total.'''
+
+        progress = MagicMock()
+        with tempfile.TemporaryDirectory() as tmp:
+            audio = Path(tmp) / 'AAAAAAAAAAA.webm'
+            audio.write_bytes(b'x')
+            ydl = mock_ydl_cls.return_value.__enter__.return_value
+
+            def download(info, download):
+                hook = mock_ydl_cls.call_args.args[0]['progress_hooks'][0]
+                hook({'status': 'downloading', 'filename': str(audio), 'downloaded_bytes': 500})
+                hook({'status': 'finished', 'filename': str(audio), 'downloaded_bytes': 800})
+                return info
+
+            ydl.process_ie_result.side_effect = download
+            ydl.prepare_filename.return_value = str(audio)
+            with override_settings(QUIZ_TMP_DIR=Path(tmp)):
+                services.download_audio(VIDEO_URL, info={'id': 'AAAAAAAAAAA'}, progress=progress)
+
+        progress.assert_called_once_with('download', 1.0, event='downloaded', downloaded_bytes=800)
@@ -0,0 +1,105 @@
+'''Tests for Whisper inference backends and the benchmark command.
+
+Covers:
+- Backends are looked up by name; unknown names raise ValueError.
+- The int8 backend quantizes Whisper's Linear layers and decodes in fp32.
+- The model registry caches models per backend.
+- word_error_rate() ignores case and punctuation and counts edits.
+- `manage.py benchmark_whisper` prints RTF and WER per backend.
+
+Notes:
+- whisper.load_model is patched; quantization runs on a tiny randomly
+  initialized model, so no checkpoint is ever downloaded.
+'''
+
+import tempfile, wave
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from quiz_app.api import whisper_backends, whisper_models
+from quiz_app.api.transcription import word_error_rate
+
+def tiny_whisper():
+    from whisper.model import ModelDimensions, Whisper
+    return Whisper(ModelDimensions(
+        n_mels=80, n_audio_ctx=16, n_audio_state=8, n_audio_head=1, n_audio_layer=1,
+        n_vocab=64, n_text_ctx=8, n_text_state=8, n_text_head=1, n_text_layer=1,
+    ))
+
+class BackendTests(SimpleTestCase):
+    '''Tests for quiz_app.api.whisper_backends.'''
+
+    def setUp(self):
+        whisper_models.clear()
+        self.addCleanup(whisper_models.clear)
+
+    def test_unknown_backend(self):
+        '''Only registered backend names are accepted.'''
+
+        self.assertIs(whisper_backends.get_backend('int8'), whisper_backends.BACKENDS['int8'])
+        with self.assertRaises(ValueError):
+            whisper_backends.get_backend('tensorrt')
+
+    def test_int8_quantizes_linear_layers(self):
+        '''All projections become dynamically quantized int8 layers.'''
+
+        import torch
+        from whisper.model import Linear
+
+        model = whisper_backends.quantize_int8(tiny_whisper())
+        types = {type(module) for module in model.modules()}
+        self.assertIn(torch.ao.nn.quantized.dynamic.Linear, types)
+        self.assertNotIn(Linear, types)
+        self.assertEqual(whisper_backends.get_backend('int8').decode_options({'language': 'en'}),
+                         {'language': 'en', 'fp16': False})
+
+    @override_settings(WHISPER_BACKEND='int8')
+    @patch('quiz_app.api.whisper_backends.quantize_int8', side_effect=lambda model: model)
+    @patch('whisper.load_model')
+    def test_registry_key_includes_backend(self, mock_load, mock_quantize):
+        '''Quantized models are cached separately from fp32 ones.'''
+
+        mock_load.side_effect = lambda name, **kwargs: MagicMock(name=name)
+        whisper_models.get_model('tiny')
+        whisper_models.get_model('tiny', whisper_backends.get_backend('openai'))
+        self.assertEqual(whisper_models.loaded_models(), ['tiny:int8', 'tiny'])
+        mock_quantize.assert_called_once()
+
+    def test_word_error_rate(self):
+        '''Substitutions, insertions and deletions count against reference length.'''
+
+        self.assertEqual(word_error_rate('Hello, world!', 'hello world'), 0.0)
+        self.assertAlmostEqual(word_error_rate('the cat sat', 'the bat sat down'), 2 / 3)
+        self.assertEqual(word_error_rate('', ''), 0.0)
+
+    @patch('quiz_app.management.commands.benchmark_whisper.configure_torch_threads')
+    @patch('quiz_app.api.whisper_backends.quantize_int8', side_effect=lambda model: model)
+    @patch('whisper.load_model')
+    def test_benchmark_command(self, mock_load, _quantize, _threads):
+        '''One row per backend and thread count, with RTF and WER.'''
+
+        model = MagicMock()
+        model.transcribe.return_value = {'text': ' hello world '}
+        mock_load.return_value = model
+        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as clip:
+            with wave.open(clip.name, 'wb') as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(16000)
+                w.writeframes(np.zeros(32000, dtype=np.int16).tobytes())
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as ref:
+            ref.write('Hello big world.')
+
+        out = StringIO()
+        call_command('benchmark_whisper', clip.name, '--reference', ref.name, '--model', 'tiny',
+                     '--threads', '1', '--threads', '2', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('Clip: 2.0s, model tiny', lines[0])
+        rows = [line.split() for line in lines[2:]]
+        self.assertEqual([(r[0], r[1]) for r in rows], [('openai', '1'), ('openai', '2'), ('int8', '1'), ('int8', '2')])
+        self.assertTrue(all(r[-1] == '33.3%' for r in rows))
+        self.assertEqual(model.transcribe.call_args.kwargs, {'fp16': False})
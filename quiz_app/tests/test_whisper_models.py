@@ -0,0 +1,61 @@
+'''Tests for the process-wide Whisper model registry.
+
+Covers:
+- A model is loaded once and reused by subsequent lookups.
+- The registry is bounded and evicts the least recently used model.
+- transcribe_audio() goes through the registry instead of whisper.load_model.
+
+Notes:
+- whisper.load_model is patched; no checkpoint is ever downloaded.
+'''
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from django.test import SimpleTestCase, override_settings
+
+from quiz_app.api import services, whisper_models
+
+class WhisperRegistryTests(SimpleTestCase):
+    '''Tests for quiz_app.api.whisper_models.'''
+
+    def setUp(self):
+        whisper_models.clear()
+        self.addCleanup(whisper_models.clear)
+
+    @patch('whisper.load_model')
+    def test_model_loaded_once(self, mock_load):
+        '''Repeated lookups return the same instance without reloading.'''
+
+        mock_load.side_effect = lambda name: MagicMock(name=name)
+        first = whisper_models.get_model('tiny')
+        second = whisper_models.get_model('tiny')
+        self.assertIs(first, second)
+        mock_load.assert_called_once_with('tiny')
+
+    @override_settings(WHISPER_MODEL_CACHE_SIZE=2)
+    @patch('whisper.load_model')
+    def test_lru_eviction(self, mock_load):
+        '''Only the most recently used models are kept.'''
+
+        mock_load.side_effect = lambda name: MagicMock(name=name)
+        whisper_models.get_model('tiny')
+        whisper_models.get_model('base')
+        whisper_models.get_model('tiny')
+        whisper_models.get_model('small')
+        self.assertEqual(whisper_models.loaded_models(), ['tiny', 'small'])
+
+    @override_settings(WHISPER_MODEL='tiny')
+    @patch('quiz_app.api.services._require_ffmpeg')
+    @patch('whisper.load_audio', return_value=np.zeros(16000, dtype=np.float32))
+    @patch('whisper.load_model')
+    def test_transcribe_uses_registry(self, mock_load, _load_audio, _ffmpeg):
+        '''Two transcriptions share one loaded model.'''
+
+        model = MagicMock()
+        model.transcribe.return_value = {'text': ' hello '}
+        mock_load.return_value = model
+        self.assertEqual(services.transcribe_audio('a.m4a'), 'hello')
+        self.assertEqual(services.transcribe_audio('b.m4a'), 'hello')
+        mock_load.assert_called_once_with('tiny')
@@ -44,6 +44,73 @@ CSRF_TRUSTED_ORIGINS = [o for o in os.getenv('CSRF_TRUSTED_ORIGINS', '').split('
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
 WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'small')
+WHISPER_MODEL_CACHE_SIZE = int(os.getenv('WHISPER_MODEL_CACHE_SIZE', '2'))
+WHISPER_PRELOAD = os.getenv('WHISPER_PRELOAD', 'False').lower() == 'true'
+WHISPER_SHARE_WEIGHTS = os.getenv('WHISPER_SHARE_WEIGHTS', '').lower()
+WHISPER_WORKERS = int(os.getenv('WHISPER_WORKERS', '1'))
+WHISPER_CHUNK_SEC = float(os.getenv('WHISPER_CHUNK_SEC', '300'))
+WHISPER_CHUNK_OVERLAP_SEC = float(os.getenv('WHISPER_CHUNK_OVERLAP_SEC', '2'))
+WHISPER_BACKEND = os.getenv('WHISPER_BACKEND', 'openai')
+WHISPER_TORCH_THREADS = int(os.getenv('WHISPER_TORCH_THREADS', '0'))
+WHISPER_TORCH_INTEROP_THREADS = int(os.getenv('WHISPER_TORCH_INTEROP_THREADS', '0'))
+QUIZ_CAPTIONS_FIRST = os.getenv('QUIZ_CAPTIONS_FIRST', 'True').lower() == 'true'
+QUIZ_CAPTION_LANGUAGES = [l for l in os.getenv('QUIZ_CAPTION_LANGUAGES', 'en').split(',') if l]
+QUIZ_CAPTION_MIN_WORDS = int(os.getenv('QUIZ_CAPTION_MIN_WORDS', '50'))
+QUIZ_TRANSCRIPT_CACHE_MAX_AGE_SEC = int(os.getenv('QUIZ_TRANSCRIPT_CACHE_MAX_AGE_SEC', str(30 * 24 * 3600)))
+QUIZ_TRANSCRIPT_CACHE_MAX_CHARS = int(os.getenv('QUIZ_TRANSCRIPT_CACHE_MAX_CHARS', '200000000'))
+QUIZ_REUSE_GENERATED = os.getenv('QUIZ_REUSE_GENERATED', 'False').lower() == 'true'
+QUIZ_REUSE_TTL_SEC = int(os.getenv('QUIZ_REUSE_TTL_SEC', str(7 * 24 * 3600)))
+QUIZ_METADATA_CACHE_TTL_SEC = int(os.getenv('QUIZ_METADATA_CACHE_TTL_SEC', '300'))
+QUIZ_STREAMING_AUDIO = os.getenv('QUIZ_STREAMING_AUDIO', 'False').lower() == 'true'
+QUIZ_AUDIO_MIN_ABR = float(os.getenv('QUIZ_AUDIO_MIN_ABR', '48'))
+QUIZ_DOWNLOAD_FRAGMENT_CONCURRENCY = int(os.getenv('QUIZ_DOWNLOAD_FRAGMENT_CONCURRENCY', '4'))
+QUIZ_ASYNC_JOBS = os.getenv('QUIZ_ASYNC_JOBS', 'True').lower() == 'true'
+QUIZ_JOB_LEASE_SEC = int(os.getenv('QUIZ_JOB_LEASE_SEC', '120'))
+QUIZ_JOB_MAX_ATTEMPTS = int(os.getenv('QUIZ_JOB_MAX_ATTEMPTS', '3'))
+QUIZ_SINGLE_FLIGHT = os.getenv('QUIZ_SINGLE_FLIGHT', 'True').lower() == 'true'
+QUIZ_SINGLE_FLIGHT_LOCK_SEC = int(os.getenv('QUIZ_SINGLE_FLIGHT_LOCK_SEC', '900'))
+QUIZ_SINGLE_FLIGHT_WAIT_SEC = int(os.getenv('QUIZ_SINGLE_FLIGHT_WAIT_SEC', '1800'))
+QUIZ_GEMINI_MAX_CONNECTIONS = int(os.getenv('QUIZ_GEMINI_MAX_CONNECTIONS', '10'))
+QUIZ_GEMINI_KEEPALIVE_SEC = float(os.getenv('QUIZ_GEMINI_KEEPALIVE_SEC', '60'))
+QUIZ_GEMINI_CONCURRENCY = int(os.getenv('QUIZ_GEMINI_CONCURRENCY', '8'))
+QUIZ_PROMPT_TOKEN_BUDGET = int(os.getenv('QUIZ_PROMPT_TOKEN_BUDGET', '12000'))
+QUIZ_MAP_CHUNK_TOKENS = int(os.getenv('QUIZ_MAP_CHUNK_TOKENS', '6000'))
+QUIZ_MAP_CONCURRENCY = int(os.getenv('QUIZ_MAP_CONCURRENCY', '4'))
+QUIZ_TOKEN_ENCODING = os.getenv('QUIZ_TOKEN_ENCODING', 'cl100k_base')
+QUIZ_REPAIR_ATTEMPTS = int(os.getenv('QUIZ_REPAIR_ATTEMPTS', '1'))
+QUIZ_WORKER_PIPELINED = os.getenv('QUIZ_WORKER_PIPELINED', 'False').lower() == 'true'
+QUIZ_WORKER_PROCESSES = int(os.getenv('QUIZ_WORKER_PROCESSES', '1'))
+QUIZ_STAGE_PREPARE_WORKERS = int(os.getenv('QUIZ_STAGE_PREPARE_WORKERS', '2'))
+QUIZ_STAGE_TRANSCRIBE_WORKERS = int(os.getenv('QUIZ_STAGE_TRANSCRIBE_WORKERS', '1'))
+QUIZ_STAGE_GENERATE_WORKERS = int(os.getenv('QUIZ_STAGE_GENERATE_WORKERS', '4'))
+QUIZ_STAGE_QUEUE_SIZE = int(os.getenv('QUIZ_STAGE_QUEUE_SIZE', '2'))
+QUIZ_STAGE_WHISPER_PROCESSES = os.getenv('QUIZ_STAGE_WHISPER_PROCESSES', 'True').lower() == 'true'
+QUIZ_DEFAULT_PRESET = os.getenv('QUIZ_DEFAULT_PRESET', '').lower()
+QUIZ_GROUP_PRESETS = dict(
+    item.split('=', 1) for item in os.getenv('QUIZ_GROUP_PRESETS', '').split(',') if '=' in item
+)
+QUIZ_LATENCY_TARGET_SEC = float(os.getenv('QUIZ_LATENCY_TARGET_SEC', '300'))
+QUIZ_GEMINI_HEDGE = os.getenv('QUIZ_GEMINI_HEDGE', 'False').lower() == 'true'
+QUIZ_GEMINI_HEDGE_PERCENTILE = float(os.getenv('QUIZ_GEMINI_HEDGE_PERCENTILE', '95'))
+QUIZ_GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv('QUIZ_GEMINI_HEDGE_MIN_SAMPLES', '20'))
+QUIZ_GEMINI_HEDGE_WINDOW = int(os.getenv('QUIZ_GEMINI_HEDGE_WINDOW', '200'))
+QUIZ_GEMINI_HEDGE_MAX_PER_MIN = int(os.getenv('QUIZ_GEMINI_HEDGE_MAX_PER_MIN', '10'))
+QUIZ_RETRY_ATTEMPTS = int(os.getenv('QUIZ_RETRY_ATTEMPTS', '3'))
+QUIZ_RETRY_BACKOFF_SEC = float(os.getenv('QUIZ_RETRY_BACKOFF_SEC', '1.0'))
+QUIZ_RETRY_MAX_WAIT_SEC = float(os.getenv('QUIZ_RETRY_MAX_WAIT_SEC', '10'))
+QUIZ_BREAKER_FAILURES = int(os.getenv('QUIZ_BREAKER_FAILURES', '5'))
+QUIZ_BREAKER_WINDOW_SEC = float(os.getenv('QUIZ_BREAKER_WINDOW_SEC', '60'))
+QUIZ_BREAKER_COOLDOWN_SEC = float(os.getenv('QUIZ_BREAKER_COOLDOWN_SEC', '30'))
+QUIZ_CHECKPOINT_TTL_SEC = int(os.getenv('QUIZ_CHECKPOINT_TTL_SEC', str(3 * 3600)))
+QUIZ_PREFETCH_MAX_ACTIVE = int(os.getenv('QUIZ_PREFETCH_MAX_ACTIVE', '3'))
+QUIZ_VAD = os.getenv('QUIZ_VAD', 'True').lower() == 'true'
+QUIZ_VAD_MARGIN_DB = float(os.getenv('QUIZ_VAD_MARGIN_DB', '12'))
+QUIZ_VAD_MIN_SILENCE_SEC = float(os.getenv('QUIZ_VAD_MIN_SILENCE_SEC', '1.0'))
+QUIZ_VAD_PAD_SEC = float(os.getenv('QUIZ_VAD_PAD_SEC', '0.2'))
+QUIZ_SSE_POLL_SEC = float(os.getenv('QUIZ_SSE_POLL_SEC', '0.5'))
+QUIZ_SSE_KEEPALIVE_SEC = float(os.getenv('QUIZ_SSE_KEEPALIVE_SEC', '15'))
+QUIZ_SSE_MAX_SEC = float(os.getenv('QUIZ_SSE_MAX_SEC', '300'))
+QUIZ_JOB_EVENTS_TTL_SEC = int(os.getenv('QUIZ_JOB_EVENTS_TTL_SEC', str(24 * 3600)))
 FFMPEG_DIR = os.getenv('FFMPEG_DIR', r"C:\ffmpeg\bin")
 if FFMPEG_DIR and FFMPEG_DIR not in os.environ.get('PATH', ''):
     os.environ['PATH'] = FFMPEG_DIR + os.pathsep + os.environ.get('PATH', '')
@@ -189,4 +256,15 @@ SIMPLE_JWT = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 QUIZ_TMP_DIR = BASE_DIR / 'tmp'
-QUIZ_TMP_DIR.mkdir(exist_ok=True) if hasattr(QUIZ_TMP_DIR, 'mkdir') else None
\ No newline at end of file
+QUIZ_TMP_DIR.mkdir(exist_ok=True) if hasattr(QUIZ_TMP_DIR, 'mkdir') else None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'quiz_app': {'handlers': ['console'], 'level': os.getenv('QUIZ_LOG_LEVEL', 'INFO')},
+    },
+}
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quizly_core.settings')
 
 application = get_wsgi_application()
+
+from quiz_app.api.whisper_models import preload_configured  # noqa: E402  (needs the app registry)
+
+preload_configured('Whisper model preloaded:', web=True)